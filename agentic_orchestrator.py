@@ -62,6 +62,19 @@ class AgenticOrchestrator:
         logger.info(f"Task planned: {task_type.value}")
         return plan
     
+    def determine_task_type(self, user_query: str, input_metadata: Dict) -> TaskType:
+        """
+        Classify a query without planning it (used for LLM routing).
+        
+        Args:
+            user_query: User's query
+            input_metadata: Metadata from input processing
+            
+        Returns:
+            TaskType of the query
+        """
+        return self._determine_task_type(user_query, input_metadata)
+    
     def _determine_task_type(self, query: str, metadata: Dict) -> TaskType:
         """Determine the type of task based on query and metadata."""
         input_type = metadata.get("input_type", "general")
@@ -1,5 +1,5 @@
 import streamlit as st
-import time
+import itertools
 import os
 from datetime import datetime
 import logging
@@ -1005,6 +1005,13 @@ def generate_medical_response(complaint):
         }
     return rag_service.process_query(complaint)
 
+def stream_medical_response(complaint):
+    """Stream medical response events (tokens, then the final result) from the RAG service."""
+    if not rag_service:
+        yield {"type": "result", "result": generate_medical_response(complaint)}
+        return
+    yield from rag_service.process_query_stream(complaint)
+
 # ==================== SESSION STATE ====================
 if "page" not in st.session_state:
     st.session_state.page = "Welcome"
@@ -1311,27 +1318,33 @@ elif page == "Chat":
         
         # Generate response
         with st.chat_message("assistant", avatar="🤖"):
+            response_placeholder = st.empty()
+            events = stream_medical_response(user_input)
             with st.spinner("🔄 Processing through RAG pipeline..."):
-                result = generate_medical_response(user_input)
-                
-                if isinstance(result, dict):
-                    response_text = result["response"]
-                    sources = result.get("sources", [])
-                    metadata = result.get("metadata", {})
-                    graphrag_info = result.get("graphrag_info", {})
-                else:
-                    response_text = result
-                    sources = []
-                    metadata = {}
-                    graphrag_info = {}
+                # Retrieval runs until the first token (or result) arrives
+                first_event = next(events, None)
             
-            # Display response with typing effect
-            response_placeholder = st.empty()
+            # Display tokens as they arrive from the LLM
             typed = ""
-            for word in response_text.split():
-                typed += word + " "
-                response_placeholder.markdown(typed)
-                time.sleep(0.02)
+            result = None
+            for event in itertools.chain([first_event] if first_event else [], events):
+                if event.get("type") == "token":
+                    typed += event["content"]
+                    response_placeholder.markdown(typed + "▌")
+                elif event.get("type") == "result":
+                    result = event["result"]
+            
+            if isinstance(result, dict):
+                response_text = result["response"]
+                sources = result.get("sources", [])
+                metadata = result.get("metadata", {})
+                graphrag_info = result.get("graphrag_info", {})
+            else:
+                response_text = typed
+                sources = []
+                metadata = {}
+                graphrag_info = {}
+            response_placeholder.markdown(response_text)
             
             # Show metadata
             llm_used = metadata.get("llm_used", "unknown")
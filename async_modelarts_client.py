@@ -0,0 +1,298 @@
+"""
+Async LLM API Client for DeepSeek v3.1 and Qwen3-32B
+asyncio-native counterpart of ModelArtsClient for the async RAG pipeline.
+Uses httpx.AsyncClient when available; otherwise offloads the blocking
+client to a worker thread.
+"""
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import Optional, Dict, Any
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+    logging.warning("httpx not available. Async LLM calls will run in worker threads.")
+
+from config import (
+    LLM_TEMPERATURE, LLM_MAX_TOKENS,
+    LLM_POOL_SIZE, LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, ASYNC_LLM_MAX_CONNECTIONS,
+    LLM_RETRY_MAX_ATTEMPTS, LLM_REQUEST_DEADLINE
+)
+from modelarts_client import ModelArtsClient, LLMDeadlineExceeded, RETRYABLE_STATUS_CODES
+from llm_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncModelArtsClient:
+    """
+    Async client for Huawei ModelArts / DeepSeek LLM APIs.
+    Shares endpoint, model names, payload format and fallback policy with
+    the wrapped ModelArtsClient.
+    """
+    
+    def __init__(self, client: ModelArtsClient = None):
+        """
+        Initialize async client.
+        
+        Args:
+            client: Synchronous client to take configuration from (created if omitted)
+        """
+        self.client = client or ModelArtsClient()
+        # One pooled AsyncClient per event loop (connections cannot be shared across loops)
+        self._clients = weakref.WeakKeyDictionary()
+        self._clients_lock = threading.Lock()
+    
+    def _get_http(self) -> "httpx.AsyncClient":
+        """Return the pooled AsyncClient bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            # Pools of closed loops are unusable; drop them instead of keeping them alive
+            for stale in [other for other in self._clients if other.is_closed()]:
+                del self._clients[stale]
+            http = self._clients.get(loop)
+            if http is None or http.is_closed:
+                http = httpx.AsyncClient(
+                    headers={
+                        "Content-Type": "application/json",
+                        self.client.auth_header: f"{self.client.auth_prefix}{self.client.api_key}"
+                    },
+                    timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=ASYNC_LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_POOL_SIZE
+                    )
+                )
+                self._clients[loop] = http
+        return http
+    
+    async def invoke_deepseek(
+        self,
+        prompt: str,
+        temperature: float = None,
+        max_tokens: int = None,
+        system_prompt: str = None,
+        timeout: float = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Invoke primary model (DeepSeek v3.1), falling back to Qwen3-32B if configured.
+        
+        Args:
+            prompt: User prompt/question
+            temperature: Sampling temperature (default: from config)
+            max_tokens: Maximum tokens to generate (default: from config)
+            system_prompt: Optional system prompt
+            timeout: Seconds allowed including retries and fallback (default: LLM_REQUEST_DEADLINE)
+        
+        Returns:
+            API response dictionary or None if error
+        """
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(
+                self.client.invoke_deepseek, prompt, temperature, max_tokens, system_prompt, timeout
+            )
+        
+        cache_key, cached = self._cache_lookup(self.client.model_name, prompt, temperature, max_tokens, system_prompt)
+        if cached is not None:
+            return cached
+        
+        # One deadline covers retries and the fallback call
+        deadline = self.client._deadline(timeout)
+        result = await self._post_chat(self.client.model_name, prompt, temperature, max_tokens, system_prompt, deadline)
+        if result is None and self.client.qwen_use_as_fallback:
+            logger.info("Attempting Qwen3-32B fallback...")
+            result = await self._post_chat(
+                self.client.qwen_model_name, prompt, temperature, max_tokens, system_prompt, deadline, fallback=True
+            )
+            # Cache a fallback answer under Qwen, never under the primary model
+            cache_key = self._cache_key(self.client.qwen_model_name, prompt, temperature, max_tokens, system_prompt)
+        self._cache_store(cache_key, result)
+        return result
+    
+    async def invoke_qwen(
+        self,
+        prompt: str,
+        temperature: float = None,
+        max_tokens: int = None,
+        system_prompt: str = None,
+        timeout: float = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Explicitly invoke Qwen3-32B model.
+        
+        Args:
+            prompt: User prompt/question
+            temperature: Sampling temperature (default: from config)
+            max_tokens: Maximum tokens to generate (default: from config)
+            system_prompt: Optional system prompt
+            timeout: Seconds allowed including retries (default: LLM_REQUEST_DEADLINE)
+        
+        Returns:
+            API response dictionary or None if error
+        """
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(
+                self.client.invoke_qwen, prompt, temperature, max_tokens, system_prompt, timeout
+            )
+        cache_key, cached = self._cache_lookup(self.client.qwen_model_name, prompt, temperature, max_tokens, system_prompt)
+        if cached is not None:
+            return cached
+        
+        result = await self._post_chat(
+            self.client.qwen_model_name, prompt, temperature, max_tokens, system_prompt, self.client._deadline(timeout)
+        )
+        self._cache_store(cache_key, result)
+        return result
+    
+    def _cache_key(self, model, prompt, temperature, max_tokens, system_prompt) -> Optional[str]:
+        """Response cache key for a call (None when the cache is disabled)."""
+        if self.client.response_cache is None:
+            return None
+        temp = temperature if temperature is not None else LLM_TEMPERATURE
+        max_toks = max_tokens if max_tokens is not None else LLM_MAX_TOKENS
+        return ResponseCache.make_key(model, prompt, system_prompt, temp, max_toks)
+    
+    def _cache_lookup(self, model, prompt, temperature, max_tokens, system_prompt):
+        """Look up the shared response cache; returns (key, cached response or None)."""
+        key = self._cache_key(model, prompt, temperature, max_tokens, system_prompt)
+        if key is None:
+            return None, None
+        cached = self.client.response_cache.get(key)
+        if cached is not None:
+            logger.info(f"✅ LLM cache hit for {model}")
+            return key, {**cached, "cached": True}
+        return key, None
+    
+    def _cache_store(self, key: Optional[str], result: Optional[Dict[str, Any]]):
+        """Store a successful response in the shared response cache."""
+        if key and result and self.client.extract_response_text(result):
+            self.client.response_cache.put(key, result)
+    
+    async def _post_chat(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = None,
+        max_tokens: int = None,
+        system_prompt: str = None,
+        deadline: float = None,
+        fallback: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Send one chat completion request without blocking the event loop.
+        
+        Applies the shared rate limiter and the same retry policy as the sync
+        client (backoff with jitter, Retry-After, overall deadline).
+        """
+        if not self.client.enabled:
+            logger.error("LLM API client not enabled")
+            return None
+        
+        if not self.client._allow(model):
+            logger.warning(f"Circuit open for {model}, skipping call")
+            return None
+        
+        temp = temperature if temperature is not None else LLM_TEMPERATURE
+        max_toks = max_tokens if max_tokens is not None else LLM_MAX_TOKENS
+        payload = self.client._build_payload(model, prompt, temp, max_toks, system_prompt)
+        
+        deadline = deadline or time.monotonic() + LLM_REQUEST_DEADLINE
+        try:
+            logger.info(f"Calling API (async): {self.client.endpoint}")
+            logger.info(f"Model: {model}")
+            
+            call_started = time.perf_counter()
+            try:
+                result = await self._send(model, payload, deadline)
+            except Exception:
+                self.client._meter(model, call_started, fallback=fallback, success=False)
+                raise
+            self.client._meter(model, call_started, result, fallback=fallback)
+            
+            if "usage" in result:
+                self.client._log_usage(result)
+            logger.info(f"✅ {model} async API call successful")
+            return result
+        
+        except httpx.HTTPStatusError as e:
+            logger.error(f"{model} API request error: {e}")
+            logger.error(f"Response status: {e.response.status_code}")
+            logger.error(f"Response body: {e.response.text}")
+            return None
+        except Exception as e:
+            logger.error(f"{model} API error: {e}")
+            return None
+    
+    async def _send(self, model: str, payload: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+        """
+        POST with rate limiting and retries; returns the parsed response body.
+        
+        The circuit breaker sees one outcome per call (the final result), not one per attempt.
+        """
+        attempts = max(1, LLM_RETRY_MAX_ATTEMPTS)
+        limiter = self.client.rate_limiter
+        started = None
+        try:
+            for attempt in range(attempts):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (limiter is not None and not await limiter.acquire_async(model, timeout=remaining)):
+                    raise LLMDeadlineExceeded(f"Rate-limit wait for {model} would exceed the request deadline")
+                
+                remaining = max(0.1, deadline - time.monotonic())
+                started = time.perf_counter()
+                try:
+                    response = await self._get_http().post(
+                        self.client.endpoint,
+                        json=payload,
+                        timeout=httpx.Timeout(min(LLM_READ_TIMEOUT, remaining), connect=min(LLM_CONNECT_TIMEOUT, remaining))
+                    )
+                    response.raise_for_status()
+                    result = response.json()
+                except Exception as e:
+                    if attempt + 1 >= attempts or not self._is_retryable(e):
+                        raise
+                    delay = self.client._retry_delay(model, e, attempt)
+                    if time.monotonic() + delay >= deadline or self.client._circuit_open(model):
+                        raise
+                    logger.warning(f"{model} request failed ({e}), retrying in {delay:.2f}s (attempt {attempt + 2}/{attempts})")
+                    await asyncio.sleep(delay)
+                    continue
+                self.client._record_outcome(model, started)
+                return result
+        except asyncio.CancelledError:
+            self.client._record_cancelled(model)
+            raise
+        except Exception as e:
+            if started is None:
+                self.client._record_cancelled(model)  # Nothing was sent
+            else:
+                self.client._record_outcome(model, started, e)
+            raise
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Throttling/overload statuses and transport errors (incl. timeouts) are retried."""
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, httpx.TransportError)
+    
+    def extract_response_text(self, api_response: Dict[str, Any]) -> str:
+        """Extract text response from API response."""
+        return self.client.extract_response_text(api_response)
+    
+    async def aclose(self):
+        """Close pooled connections of every event loop (other running loops close theirs asynchronously)."""
+        current = asyncio.get_running_loop()
+        with self._clients_lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for loop, http in clients:
+            if loop is current:
+                await http.aclose()
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(http.aclose(), loop)
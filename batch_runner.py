@@ -0,0 +1,169 @@
+"""
+Batch Runner Module
+Bounded-concurrency execution of many independent requests with per-item
+retries, ordered results and resumable JSONL progress.
+Used for offline evaluation replays through the LLM client and RAG pipeline.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def item_key(item: Any) -> str:
+    """Stable fingerprint of a batch item (used to match progress on resume)."""
+    material = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+class BatchRunner:
+    """
+    Runs a worker over a list of items with a bounded thread pool.
+    
+    Results come back in input order. When a progress file is given, every
+    finished item is appended to it as one JSON line, and items already
+    recorded as successful are skipped on the next run with the same inputs.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_retries: int = 2,
+        retry_backoff: float = 2.0,
+        progress_path: Optional[str] = None,
+        log_every: int = 100
+    ):
+        """
+        Initialize batch runner.
+        
+        Args:
+            max_concurrency: Maximum items processed at the same time
+            max_retries: Retries per item after the first attempt
+            retry_backoff: Base retry delay in seconds (doubled per retry, with jitter)
+            progress_path: JSONL file for resumable progress (None disables it)
+            log_every: Log progress every N completed items
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.progress_path = progress_path
+        self.log_every = max(1, log_every)
+        self._lock = threading.Lock()
+    
+    def run(
+        self,
+        items: List[Any],
+        worker: Callable[[Any], Any],
+        is_success: Callable[[Any], bool] = None
+    ) -> List[Any]:
+        """
+        Process all items and return their results in input order.
+        
+        Args:
+            items: Inputs (must be JSON-serializable for resumable progress)
+            worker: Function called as worker(item); exceptions count as failures
+            is_success: Predicate on the worker result (default: result is not None)
+        
+        Returns:
+            List of results aligned with items; an item that failed every
+            attempt yields its last result (None if it raised)
+        """
+        is_success = is_success or (lambda result: result is not None)
+        if self.progress_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.progress_path)), exist_ok=True)
+        keys = [item_key(item) for item in items]
+        results: List[Any] = [None] * len(items)
+        
+        done = self._load_progress(keys)
+        for index, result in done.items():
+            results[index] = result
+        pending = [index for index in range(len(items)) if index not in done]
+        if done:
+            logger.info(f"Batch: resuming, {len(done)}/{len(items)} items already done")
+        
+        started = time.perf_counter()
+        counters = {"completed": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="batch") as executor:
+            futures = {
+                executor.submit(self._run_item, worker, is_success, items[index]): index
+                for index in pending
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                result, ok, attempts = future.result()
+                results[index] = result
+                self._append_progress(index, keys[index], result, ok, attempts)
+                
+                counters["completed"] += 1
+                if not ok:
+                    counters["failed"] += 1
+                if counters["completed"] % self.log_every == 0 or counters["completed"] == len(pending):
+                    elapsed = time.perf_counter() - started
+                    rate = counters["completed"] / elapsed if elapsed else 0.0
+                    logger.info(
+                        f"Batch: {counters['completed']}/{len(pending)} done "
+                        f"({counters['failed']} failed, {rate:.1f} items/s)"
+                    )
+        
+        logger.info(f"✅ Batch finished: {len(items)} items, {counters['failed']} failed")
+        return results
+    
+    def _run_item(self, worker: Callable[[Any], Any], is_success: Callable[[Any], bool], item: Any):
+        """Run one item with retries; returns (result, succeeded, attempts)."""
+        result = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self.retry_backoff * (2 ** (attempt - 1))
+                time.sleep(delay * random.uniform(0.5, 1.5))
+            try:
+                result = worker(item)
+            except Exception as e:
+                logger.warning(f"Batch item failed (attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+                result = None
+                continue
+            if is_success(result):
+                return result, True, attempt + 1
+        return result, False, self.max_retries + 1
+    
+    def _load_progress(self, keys: List[str]) -> Dict[int, Any]:
+        """Read successful results for items whose index and fingerprint still match."""
+        done = {}
+        if not self.progress_path or not os.path.exists(self.progress_path):
+            return done
+        with open(self.progress_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Partial line from an interrupted run
+                index = record.get("index")
+                if (
+                    record.get("ok")
+                    and isinstance(index, int)
+                    and 0 <= index < len(keys)
+                    and record.get("key") == keys[index]
+                ):
+                    done[index] = record.get("result")
+        return done
+    
+    def _append_progress(self, index: int, key: str, result: Any, ok: bool, attempts: int):
+        if not self.progress_path:
+            return
+        line = json.dumps({
+            "index": index,
+            "key": key,
+            "ok": ok,
+            "attempts": attempts,
+            "result": result
+        }, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.progress_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
@@ -0,0 +1,180 @@
+"""
+Circuit Breaker Module
+Per-model circuit breakers with rolling error-rate and latency windows.
+Part of the Intelligence Layer client (ModelArts).
+"""
+import logging
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    """States of a circuit breaker."""
+    CLOSED = "closed"        # Healthy, all calls allowed
+    OPEN = "open"            # Unhealthy, calls rejected until the cool-down ends
+    HALF_OPEN = "half_open"  # Cool-down over, a limited number of probe calls allowed
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one model.
+    
+    Opens when, over the rolling window, either the error rate or the
+    slow-call rate exceeds its threshold. After the cool-down it lets
+    probe calls through (half-open); a successful probe closes it again,
+    a failed probe re-opens it.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 60.0,
+        slow_call_rate_threshold: float = 0.8,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        """
+        Initialize circuit breaker.
+        
+        Args:
+            name: Name of the protected model
+            failure_rate_threshold: Error rate (0-1) in the window that opens the circuit
+            slow_call_seconds: Calls slower than this count as slow
+            slow_call_rate_threshold: Slow-call rate (0-1) in the window that opens the circuit
+            window_seconds: Length of the rolling window
+            min_calls: Minimum calls in the window before rates are evaluated
+            open_seconds: Cool-down before probing an open circuit
+            half_open_probes: Concurrent probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_started = 0.0
+        self._calls = deque()  # (timestamp, success, latency)
+        self._transitions = deque(maxlen=50)
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> CircuitState:
+        """Current state (an expired OPEN circuit reports HALF_OPEN)."""
+        with self._lock:
+            self._refresh_state()
+            return self._state
+    
+    def allow_request(self) -> bool:
+        """Check whether a call may go through, reserving a probe slot when half-open."""
+        with self._lock:
+            self._refresh_state()
+            if self._state == CircuitState.CLOSED:
+                return True
+            if self._state == CircuitState.HALF_OPEN:
+                # A probe that never reported back must not block the circuit forever
+                if time.time() - self._probe_started > self.open_seconds:
+                    self._probes_in_flight = 0
+                if self._probes_in_flight < self.half_open_probes:
+                    self._probes_in_flight += 1
+                    self._probe_started = time.time()
+                    return True
+            return False
+    
+    def record_success(self, latency: float):
+        """Record a successful call and its latency in seconds."""
+        self._record(True, latency)
+    
+    def record_failure(self, latency: float):
+        """Record a failed call and its latency in seconds."""
+        self._record(False, latency)
+    
+    def record_cancelled(self):
+        """Release the probe slot of a call abandoned before its outcome was known (neither success nor failure)."""
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+    
+    def _record(self, success: bool, latency: float):
+        now = time.time()
+        with self._lock:
+            self._calls.append((now, success, latency))
+            self._trim(now)
+            
+            if self._state == CircuitState.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if success and latency < self.slow_call_seconds:
+                    self._calls.clear()
+                    self._transition(CircuitState.CLOSED, "probe succeeded")
+                else:
+                    self._open("probe failed" if not success else "probe too slow")
+                return
+            
+            if self._state == CircuitState.CLOSED and len(self._calls) >= self.min_calls:
+                failure_rate, slow_rate = self._rates()
+                if failure_rate >= self.failure_rate_threshold:
+                    self._open(f"error rate {failure_rate:.0%}")
+                elif slow_rate >= self.slow_call_rate_threshold:
+                    self._open(f"slow-call rate {slow_rate:.0%}")
+    
+    def _rates(self):
+        total = len(self._calls)
+        failures = sum(1 for _, success, _ in self._calls if not success)
+        slow = sum(1 for _, _, latency in self._calls if latency >= self.slow_call_seconds)
+        return failures / total, slow / total
+    
+    def _trim(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+    
+    def _refresh_state(self):
+        if self._state == CircuitState.OPEN and time.time() - self._opened_at >= self.open_seconds:
+            self._probes_in_flight = 0
+            self._transition(CircuitState.HALF_OPEN, "cool-down elapsed")
+    
+    def _open(self, reason: str):
+        self._opened_at = time.time()
+        self._transition(CircuitState.OPEN, reason)
+    
+    def _transition(self, new_state: CircuitState, reason: str):
+        if new_state == self._state and new_state != CircuitState.OPEN:
+            return
+        self._transitions.append({
+            "timestamp": time.time(),
+            "from": self._state.value,
+            "to": new_state.value,
+            "reason": reason
+        })
+        logger.warning(f"Circuit for {self.name}: {self._state.value} -> {new_state.value} ({reason})")
+        self._state = new_state
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Return state, window statistics and recent transitions for monitoring."""
+        with self._lock:
+            self._refresh_state()
+            self._trim(time.time())
+            calls = len(self._calls)
+            failure_rate, slow_rate = self._rates() if calls else (0.0, 0.0)
+            latencies = [latency for _, _, latency in self._calls]
+            return {
+                "model": self.name,
+                "state": self._state.value,
+                "window_calls": calls,
+                "error_rate": round(failure_rate, 3),
+                "slow_call_rate": round(slow_rate, 3),
+                "avg_latency": round(sum(latencies) / calls, 3) if calls else None,
+                "transitions": list(self._transitions)
+            }
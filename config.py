@@ -40,11 +40,12 @@ MILVUS_USER = os.getenv("MILVUS_USER", "")
 MILVUS_PASSWORD = os.getenv("MILVUS_PASSWORD", "")
 MILVUS_COLLECTION_NAME = os.getenv("MILVUS_COLLECTION_NAME", "medical_knowledge_base")
 MILVUS_USE_CLOUD = os.getenv("MILVUS_USE_CLOUD", "true").lower() == "true"  # Default to true for cloud deployment
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "milvus").lower()  # milvus or numpy (in-process brute force from NUMPY_STORE_DIR)
 
 # Validate Milvus configuration
-if MILVUS_USE_CLOUD and not MILVUS_HOST:
+if VECTOR_STORE_BACKEND == "milvus" and MILVUS_USE_CLOUD and not MILVUS_HOST:
     logger.warning("MILVUS_USE_CLOUD is true but MILVUS_HOST is not set")
-if MILVUS_USE_CLOUD and not MILVUS_API_KEY and not (MILVUS_USER and MILVUS_PASSWORD):
+if VECTOR_STORE_BACKEND == "milvus" and MILVUS_USE_CLOUD and not MILVUS_API_KEY and not (MILVUS_USER and MILVUS_PASSWORD):
     logger.warning("MILVUS_USE_CLOUD is true but no authentication credentials provided")
 
 # ------------------ OBS (Object Storage Service) Configuration ------------------
@@ -82,16 +83,134 @@ EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "auto")  # auto, cuda, cpu
 LLM_MODEL = os.getenv("LLM_MODEL", "deepseek-chat")  # DeepSeek or Qwen via ModelArts
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.2"))
 LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "2048"))
+# HTTP transport: keep-alive connection pool shared by all Streamlit sessions
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))  # Max pooled connections to the LLM endpoint
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))  # Seconds to establish a connection
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))  # Seconds to wait between response bytes
+LLM_WARMUP_ON_START = os.getenv("LLM_WARMUP_ON_START", "true").lower() == "true"  # Pre-open a pooled connection
+# Hedged requests: send the prompt to the fallback model if the primary is slow to respond
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))  # Primary TTFB percentile used as delay
+LLM_HEDGE_INITIAL_DELAY = float(os.getenv("LLM_HEDGE_INITIAL_DELAY", "5"))  # Seconds, until enough samples exist
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))  # Seconds
+LLM_HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "30"))  # Seconds
+# Per-model circuit breakers (rolling window) for health-scored routing
+LLM_CB_ENABLED = os.getenv("LLM_CB_ENABLED", "true").lower() == "true"
+LLM_CB_FAILURE_RATE = float(os.getenv("LLM_CB_FAILURE_RATE", "0.5"))  # Error rate that opens the circuit
+LLM_CB_SLOW_CALL_SECONDS = float(os.getenv("LLM_CB_SLOW_CALL_SECONDS", "60"))  # Calls slower than this are "slow"
+LLM_CB_SLOW_CALL_RATE = float(os.getenv("LLM_CB_SLOW_CALL_RATE", "0.8"))  # Slow-call rate that opens the circuit
+LLM_CB_WINDOW_SECONDS = float(os.getenv("LLM_CB_WINDOW_SECONDS", "60"))  # Rolling window length
+LLM_CB_MIN_CALLS = int(os.getenv("LLM_CB_MIN_CALLS", "5"))  # Calls needed before rates are evaluated
+LLM_CB_OPEN_SECONDS = float(os.getenv("LLM_CB_OPEN_SECONDS", "30"))  # Cool-down before half-open probing
+# Client-side rate limiting (one token bucket per model, shared by the whole process);
+# off by default - when enabling, set LLM_RATE_LIMIT_RPS/BURST to the account's ModelArts quota
+LLM_RATE_LIMIT_ENABLED = os.getenv("LLM_RATE_LIMIT_ENABLED", "false").lower() == "true"
+LLM_RATE_LIMIT_RPS = float(os.getenv("LLM_RATE_LIMIT_RPS", "5"))  # Requests/second per model (0 = unlimited)
+QWEN_RATE_LIMIT_RPS = float(os.getenv("QWEN_RATE_LIMIT_RPS", str(LLM_RATE_LIMIT_RPS)))  # Override for Qwen3-32B
+LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "10"))  # Requests allowed back-to-back
+# Retries for 429/5xx and transport errors (exponential backoff with jitter, honours Retry-After)
+LLM_RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3"))  # Attempts per model, including the first
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))  # Seconds, doubled per retry
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))  # Cap for a single backoff
+LLM_REQUEST_DEADLINE = float(os.getenv("LLM_REQUEST_DEADLINE", "120"))  # Overall seconds for one call incl. retries and fallback
+# Usage/latency metering of every LLM call (in-memory ring buffer)
+LLM_METERING_ENABLED = os.getenv("LLM_METERING_ENABLED", "true").lower() == "true"
+LLM_METERING_CAPACITY = int(os.getenv("LLM_METERING_CAPACITY", "10000"))  # Call records kept
+LLM_METERING_INTERVAL = float(os.getenv("LLM_METERING_INTERVAL", "60"))  # Seconds per aggregated snapshot
+# Routing of model/max_tokens/timeout by task type and prompt length (see llm_router.py);
+# off by default so answers keep LLM_MAX_TOKENS, LLM_REQUEST_DEADLINE and the QWEN_ENABLED model order
+LLM_ROUTING_ENABLED = os.getenv("LLM_ROUTING_ENABLED", "false").lower() == "true"
+LLM_LATENCY_SLO_SECONDS = float(os.getenv("LLM_LATENCY_SLO_SECONDS", "30"))  # p95 target; slower routes degrade
+LLM_ROUTING_TABLE = os.getenv("LLM_ROUTING_TABLE", "")  # JSON list of routes (empty = built-in table)
+ASYNC_LLM_MAX_CONNECTIONS = int(os.getenv("ASYNC_LLM_MAX_CONNECTIONS", "200"))  # Concurrent async LLM requests
+ASYNC_EXECUTOR_WORKERS = int(os.getenv("ASYNC_EXECUTOR_WORKERS", "32"))  # Threads for blocking embedding/Milvus work
+
+# ------------------ LLM Response Cache ------------------
+# Exact-match cache keyed on model, normalized prompt and sampling parameters
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))  # 24 hours
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1000"))  # In-memory LRU tier size
+LLM_CACHE_DISK_MAX_MB = int(os.getenv("LLM_CACHE_DISK_MAX_MB", "256"))  # On-disk tier size bound
+
+# ------------------ Semantic Answer Cache ------------------
+# Serves a previous answer when a new query embedding is close enough. Opt-in: a
+# question that differs only in a dose or drug name can embed almost identically
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # Cosine similarity for a hit
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))  # 24 hours
+# Bump when the knowledge base is re-ingested so cached answers are not served against stale data
+# (read at startup: in-process caches pick up a new version when the app restarts)
+KNOWLEDGE_BASE_VERSION = os.getenv("KNOWLEDGE_BASE_VERSION", "1")
+
+# ------------------ Request Coalescing ------------------
+# Concurrent identical queries (normalized text) wait on one pipeline execution
+REQUEST_COALESCING_ENABLED = os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() == "true"
+
+# ------------------ Batch Inference ------------------
+# Offline replays (evaluation) run many prompts/queries concurrently
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))  # Requests in flight (keep <= LLM_POOL_SIZE)
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "2"))  # Retries per item after the first attempt
+BATCH_RETRY_BACKOFF = float(os.getenv("BATCH_RETRY_BACKOFF", "2.0"))  # Base delay in seconds, doubled per retry
 
 # ------------------ RAG Configuration ------------------
 RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
 RETRIEVAL_SCORE_THRESHOLD = float(os.getenv("RETRIEVAL_SCORE_THRESHOLD", "0.7"))
 
+# ------------------ Prompt Assembly ------------------
+# Context is filled in relevance order until the token budget is used up
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "3000"))
+PROMPT_MAX_ANSWER_TOKENS = int(os.getenv("PROMPT_MAX_ANSWER_TOKENS", "400"))  # Longer answers are truncated
+PROMPT_MAX_NODES = int(os.getenv("PROMPT_MAX_NODES", "10"))  # Maximum Q&A pairs in the context
+
 # ------------------ GraphRAG Configuration ------------------
 GRAPH_RAG_ENABLED = os.getenv("GRAPH_RAG_ENABLED", "true").lower() == "true"
 GRAPH_MAX_NODES = int(os.getenv("GRAPH_MAX_NODES", "10"))
 GRAPH_MAX_DEPTH = int(os.getenv("GRAPH_MAX_DEPTH", "2"))  # Default depth for graph traversal
-GRAPH_SIMILARITY_THRESHOLD = float(os.getenv("GRAPH_SIMILARITY_THRESHOLD", "0.7"))  # For edge creation
+GRAPH_SIMILARITY_THRESHOLD = float(os.getenv("GRAPH_SIMILARITY_THRESHOLD", "0.7"))  # For edge creation and as the beam traversal score floor
+GRAPH_TRAVERSAL_MODE = os.getenv("GRAPH_TRAVERSAL_MODE", "bfs").lower()  # bfs or beam
+GRAPH_BEAM_WIDTH = int(os.getenv("GRAPH_BEAM_WIDTH", "5"))  # Nodes kept per level in beam traversal
+GRAPH_LAZY_PAYLOADS = os.getenv("GRAPH_LAZY_PAYLOADS", "true").lower() == "true"  # Fetch Q&A text only for nodes that reach the context
+# In-process cache of node rows (adjacency, vectors, payloads) fetched during traversal
+GRAPH_CACHE_ENABLED = os.getenv("GRAPH_CACHE_ENABLED", "true").lower() == "true"
+GRAPH_CACHE_TTL_SECONDS = float(os.getenv("GRAPH_CACHE_TTL_SECONDS", "3600"))  # 1 hour
+GRAPH_CACHE_MAX_MB = int(os.getenv("GRAPH_CACHE_MAX_MB", "64"))  # Estimated memory bound
+# CSR snapshot of the related_nodes graph (memory-mapped) so traversal runs without Milvus round trips
+GRAPH_SNAPSHOT_ENABLED = os.getenv("GRAPH_SNAPSHOT_ENABLED", "true").lower() == "true"
+GRAPH_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("GRAPH_SNAPSHOT_REFRESH_SECONDS", "3600"))  # Incremental refresh interval (0 = never)
+
+# ------------------ Hybrid Retrieval ------------------
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense").lower()  # dense or hybrid (dense + BM25 fused by reciprocal rank)
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))  # RRF weight of the embedding ranking
+HYBRID_SPARSE_WEIGHT = float(os.getenv("HYBRID_SPARSE_WEIGHT", "1.0"))  # RRF weight of the BM25 ranking
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))  # RRF smoothing constant
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # Hits taken from each ranking before fusion
+HYBRID_SPARSE_FIELD = os.getenv("HYBRID_SPARSE_FIELD", "sparse_embedding")  # BM25 function output field for server-side hybrid search
+HYBRID_GRAPH_MAX_DEPTH = int(os.getenv("HYBRID_GRAPH_MAX_DEPTH", "1"))  # Traversal depth cap when hybrid seeds are available
+
+# ------------------ Local Replica ------------------
+LOCAL_REPLICA_ENABLED = os.getenv("LOCAL_REPLICA_ENABLED", "false").lower() == "true"  # Serve retrieval from a local copy of the Milvus collection
+LOCAL_REPLICA_SYNC_SECONDS = float(os.getenv("LOCAL_REPLICA_SYNC_SECONDS", "3600"))  # Incremental sync interval (0 = once at startup)
+REPLICA_HNSW_M = int(os.getenv("REPLICA_HNSW_M", "16"))  # HNSW graph degree (needs hnswlib)
+REPLICA_HNSW_EF_CONSTRUCTION = int(os.getenv("REPLICA_HNSW_EF_CONSTRUCTION", "200"))
+REPLICA_HNSW_EF_SEARCH = int(os.getenv("REPLICA_HNSW_EF_SEARCH", "64"))
+
+# ------------------ Ingestion ------------------
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))  # Documents per embedding call
+INGEST_INSERT_BATCH_ROWS = int(os.getenv("INGEST_INSERT_BATCH_ROWS", "1000"))  # Maximum rows per insert request
+INGEST_INSERT_BATCH_MB = float(os.getenv("INGEST_INSERT_BATCH_MB", "16"))  # Maximum estimated payload per insert request
+INGEST_FLUSH_INTERVAL_SECONDS = float(os.getenv("INGEST_FLUSH_INTERVAL_SECONDS", "0"))  # Periodic flush during long loads (0 = once at the end)
+
+# ------------------ Query Deadline ------------------
+# Optional budget per query, passed down to Milvus and the LLM call (embedding has no timeout hook).
+# When it runs low the pipeline degrades: cut traversal depth, skip traversal, shorten the prompt.
+# Unset = no deadline unless the caller passes one (LLM calls keep LLM_REQUEST_DEADLINE).
+QUERY_DEADLINE_SECONDS = float(os.getenv("QUERY_DEADLINE_SECONDS")) if os.getenv("QUERY_DEADLINE_SECONDS") else None  # Total seconds for one query
+DEADLINE_LLM_RESERVE_SECONDS = float(os.getenv("DEADLINE_LLM_RESERVE_SECONDS", "20"))  # Kept for the LLM; retrieval stops earlier
+DEADLINE_FULL_TRAVERSAL_SECONDS = float(os.getenv("DEADLINE_FULL_TRAVERSAL_SECONDS", "8"))  # Retrieval budget below this cuts depth to 1
+DEADLINE_MIN_TRAVERSAL_SECONDS = float(os.getenv("DEADLINE_MIN_TRAVERSAL_SECONDS", "3"))  # Retrieval budget below this skips traversal
+DEADLINE_SHORT_PROMPT_SECONDS = float(os.getenv("DEADLINE_SHORT_PROMPT_SECONDS", "15"))  # LLM budget below this shortens the prompt
+DEADLINE_SHORT_CONTEXT_TOKENS = int(os.getenv("DEADLINE_SHORT_CONTEXT_TOKENS", "1000"))  # Context budget of the shortened prompt
 
 # ------------------ Agentic RAG Configuration ------------------
 AGENTIC_RAG_ENABLED = os.getenv("AGENTIC_RAG_ENABLED", "true").lower() == "true"
@@ -101,8 +220,19 @@ AGENT_REASONING_ENABLED = os.getenv("AGENT_REASONING_ENABLED", "true").lower() =
 # ------------------ Application Configuration ------------------
 # Use /tmp for cloud deployments (ephemeral storage)
 VECTORSTORE_DIR = os.getenv("VECTORSTORE_DIR", "/tmp/medical_vectorstore")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(VECTORSTORE_DIR, "llm_cache"))  # Disk tier of the LLM cache
+GRAPH_SNAPSHOT_DIR = os.getenv("GRAPH_SNAPSHOT_DIR", os.path.join(VECTORSTORE_DIR, "graph_snapshot"))  # Persisted CSR adjacency
+NUMPY_STORE_DIR = os.getenv("NUMPY_STORE_DIR", os.path.join(VECTORSTORE_DIR, "numpy_store"))  # rows.jsonl + embeddings.npy for the numpy backend
+LOCAL_REPLICA_DIR = os.getenv("LOCAL_REPLICA_DIR", os.path.join(VECTORSTORE_DIR, "replica"))  # Memory-mapped replica columns and HNSW index
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
+# ------------------ Mock LLM Server ------------------
+# Local OpenAI-compatible stand-in for load/latency testing (mock_llm_server.py);
+# target it with MODELARTS_ENDPOINT=http://localhost:8090
+MOCK_LLM_PORT = int(os.getenv("MOCK_LLM_PORT", "8090"))
+MOCK_LLM_PROFILES = os.getenv("MOCK_LLM_PROFILES", "")  # JSON (or path to JSON) of model -> behaviour overrides
+MOCK_LLM_SEED = int(os.getenv("MOCK_LLM_SEED")) if os.getenv("MOCK_LLM_SEED") else None  # Reproducible runs
+
 # ------------------ Server Configuration ------------------
 # Streamlit server configuration for cloud deployment
 STREAMLIT_SERVER_PORT = int(os.getenv("STREAMLIT_SERVER_PORT", "8501"))
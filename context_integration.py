@@ -3,21 +3,137 @@ Context Integration Module
 Integrates context from Milvus Vector & Graph DB and OBS storage.
 Part of the Data & Memory Layer (Access Layer).
 """
+import json
 import logging
-from typing import List, Dict, Optional, Tuple
-try:
-    from pymilvus import connections, Collection, utility
-    from pymilvus import FieldSchema, CollectionSchema, DataType
-    MILVUS_AVAILABLE = True
-except ImportError:
-    MILVUS_AVAILABLE = False
+import threading
+import time
+from itertools import islice
+from typing import List, Dict, Optional, Tuple, Callable, Iterable, Iterator
+
+import numpy as np
+
+from prompt_builder import PromptBuilder
+from graph_cache import GraphCache
+from graph_snapshot import AdjacencySnapshot
+from sparse_index import BM25Index, weighted_rrf
+from vector_store import VectorStore, MilvusVectorStore, MILVUS_AVAILABLE
+
+if not MILVUS_AVAILABLE:
     logging.warning("pymilvus not available. Milvus features will be disabled.")
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of related nodes followed from a single node
+MAX_RELATED_NODES = 20
+# Maximum number of ids placed in a single `id in [...]` expression
+QUERY_BATCH_SIZE = 500
+# Fields of a node's Q&A payload
+NODE_FIELDS = ("id", "question", "response", "metadata")
+
+
+class GraphNode:
+    """
+    Compact GraphRAG node; the Q&A payload stays None until hydrated.
+    
+    Supports ``node["question"]`` / ``node.get("question")`` so code written
+    for the dictionary representation keeps working.
+    """
+    
+    __slots__ = ("id", "similarity", "depth", "question", "response", "metadata")
+    
+    def __init__(self, node_id, similarity: float = 0.0, depth: int = 0):
+        self.id = node_id
+        self.similarity = similarity
+        self.depth = depth
+        self.question = None
+        self.response = None
+        self.metadata = None
+    
+    @property
+    def hydrated(self) -> bool:
+        return self.question is not None
+    
+    def hydrate(self, row):
+        """Copy question/response/metadata from a Milvus row or search hit entity."""
+        self.question = row.get("question", None) or ""
+        self.response = row.get("response", None) or ""
+        self.metadata = row.get("metadata", None) or {}
+    
+    def payload(self) -> Dict:
+        return {"question": self.question, "response": self.response, "metadata": self.metadata}
+    
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+    
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "question": self.question or "",
+            "response": self.response or "",
+            "similarity": self.similarity,
+            "metadata": self.metadata or {}
+        }
+
+
+class GraphEdge:
+    """Compact GraphRAG edge (``edge["source"]`` access supported)."""
+    
+    __slots__ = ("source", "target", "type")
+    
+    def __init__(self, source, target, edge_type: str = "semantic_similarity"):
+        self.source = source
+        self.target = target
+        self.type = edge_type
+    
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+    
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+def rank_nodes(nodes: List[GraphNode]) -> List[GraphNode]:
+    """Nodes in context order: highest similarity first, traversal order otherwise (as PromptBuilder)."""
+    return sorted(nodes, key=lambda node: node.similarity or 0.0, reverse=True)
+
+
+def combined_text(document: Dict) -> str:
+    """Text embedded into combined_embedding: the question followed by its answer."""
+    return f"{document.get('question') or ''}\n{document.get('response') or ''}"
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most size items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, max(size, 1)))
+        if not batch:
+            return
+        yield batch
+
+
+def _estimate_row_bytes(row: Dict) -> int:
+    """Approximate insert payload of a row (vector, texts, related ids, metadata)."""
+    return (
+        4 * len(row["combined_embedding"])
+        + len(row["question"].encode("utf-8"))
+        + len(row["response"].encode("utf-8"))
+        + sum(len(str(node_id)) + 8 for node_id in row["related_nodes"])
+        + len(json.dumps(row["metadata"], ensure_ascii=False, default=str))
+        + 64
+    )
+
 
 class ContextIntegrator:
-    """Integrates context from vector database and graph database."""
+    """Integrates context from the vector store (Milvus by default) and its knowledge graph."""
     
     def __init__(
         self,
@@ -27,10 +143,19 @@ class ContextIntegrator:
         milvus_api_key: str = None,
         milvus_user: str = None,
         milvus_password: str = None,
-        use_cloud: bool = False
+        use_cloud: bool = False,
+        prompt_builder: PromptBuilder = None,
+        graph_cache: GraphCache = None,
+        graph_snapshot: AdjacencySnapshot = None,
+        snapshot_refresh_seconds: float = 0,
+        sparse_index: BM25Index = None,
+        sparse_field: str = None,
+        hybrid_weights: Tuple[float, float] = (1.0, 1.0),
+        rrf_k: int = 60,
+        vector_store: VectorStore = None
     ):
         """
-        Initialize context integrator with Milvus connection.
+        Initialize context integrator with a vector store (Milvus connection unless given).
         
         Args:
             milvus_host: Milvus server host (or cloud endpoint)
@@ -40,175 +165,247 @@ class ContextIntegrator:
             milvus_user: Username for authentication (if using username/password)
             milvus_password: Password for authentication (if using username/password)
             use_cloud: Whether using Milvus Cloud cluster
+            prompt_builder: Token-budgeted context builder (legacy fixed top-10 layout if omitted)
+            graph_cache: Cache for node rows fetched during traversal (None disables caching)
+            graph_snapshot: In-memory CSR adjacency used for traversal (None queries Milvus per hop)
+            snapshot_refresh_seconds: Interval for incremental snapshot refreshes (0 disables them)
+            sparse_index: Local BM25 index for hybrid retrieval without server-side BM25
+            sparse_field: Collection field produced by a Milvus BM25 function (server-side hybrid search)
+            hybrid_weights: (dense, sparse) weights for reciprocal-rank fusion
+            rrf_k: Reciprocal-rank fusion smoothing constant
+            vector_store: Storage backend (the Milvus connection parameters are ignored if given)
         """
-        self.milvus_host = milvus_host
-        self.milvus_port = milvus_port
-        self.collection_name = collection_name
-        self.milvus_api_key = milvus_api_key
-        self.milvus_user = milvus_user
-        self.milvus_password = milvus_password
-        self.use_cloud = use_cloud
-        self.collection = None
-        
-        self._connect()
-    
-    def _connect(self):
-        """Connect to Milvus server (local or cloud)."""
-        if not MILVUS_AVAILABLE:
-            logger.warning("Milvus not available. Skipping connection.")
-            return
+        self.store = vector_store if vector_store is not None else MilvusVectorStore(
+            milvus_host,
+            milvus_port,
+            collection_name,
+            milvus_api_key=milvus_api_key,
+            milvus_user=milvus_user,
+            milvus_password=milvus_password,
+            use_cloud=use_cloud
+        )
+        self.prompt_builder = prompt_builder
+        self.graph_cache = graph_cache
+        self.graph_snapshot = graph_snapshot
+        self.snapshot_refresh_seconds = snapshot_refresh_seconds
+        self.sparse_index = sparse_index
+        self.sparse_field = sparse_field
+        self.hybrid_weights = hybrid_weights
+        self.rrf_k = rrf_k
         
-        try:
-            # Prepare connection parameters
-            # For serverless Milvus, ensure port is integer
-            port = int(self.milvus_port) if isinstance(self.milvus_port, str) else self.milvus_port
-            
-            connection_params = {
-                "alias": "default",
-                "host": self.milvus_host,
-                "port": port
-            }
-            
-            # Add authentication for cloud cluster
-            if self.use_cloud:
-                if self.milvus_api_key:
-                    # Use API key authentication (preferred for Milvus Cloud)
-                    connection_params["token"] = self.milvus_api_key
-                    logger.info("Using API key authentication for Milvus Cloud")
-                elif self.milvus_user and self.milvus_password:
-                    # Use username/password authentication
-                    connection_params["user"] = self.milvus_user
-                    connection_params["password"] = self.milvus_password
-                    logger.info("Using username/password authentication")
-                else:
-                    logger.warning("Milvus Cloud enabled but no authentication provided")
-            
-            # Check if API key is provided for cloud
-            if self.use_cloud and not self.milvus_api_key:
-                logger.error("MILVUS_API_KEY is required for Milvus Cloud. Please set it in .env file")
-                return
-            
-            # For serverless, add secure=True
-            if self.use_cloud and "serverless" in self.milvus_host.lower():
-                connection_params["secure"] = True
-            
-            connections.connect(**connection_params)
-            logger.info(f"✅ Connected to Milvus at {self.milvus_host}:{port}")
-            
-            # Load collection if it exists
-            if utility.has_collection(self.collection_name):
-                self.collection = Collection(self.collection_name)
-                self.collection.load()
-                logger.info(f"Loaded collection: {self.collection_name}")
-            else:
-                logger.warning(f"Collection {self.collection_name} does not exist yet.")
-        except Exception as e:
-            logger.error(f"Error connecting to Milvus: {str(e)}")
-            # Fallback: collection will be None, will use fallback retrieval
+        self._init_snapshot()
+        self._init_hybrid()
+    
+    def _init_snapshot(self):
+        """Memory-map the persisted adjacency snapshot, or export it from the store in the background."""
+        if self.graph_snapshot is None or not self.store.available:
+            return
+        if not self.graph_snapshot.load():
+            self._start_snapshot_job(self.graph_snapshot.build)
+    
+    def _start_snapshot_job(self, job):
+        threading.Thread(
+            target=job, args=(self.store,), name="graph-snapshot", daemon=True
+        ).start()
+    
+    def _snapshot_ready(self) -> bool:
+        if self.graph_snapshot is None or not self.graph_snapshot.ready:
+            return False
+        if self.graph_snapshot.refresh_due(self.snapshot_refresh_seconds):
+            self.graph_snapshot.mark_refresh_started()
+            self._start_snapshot_job(self.graph_snapshot.refresh)
+        return True
+    
+    def _init_hybrid(self):
+        """Use Milvus hybrid search if the collection has a BM25 field, else build the local BM25 index in the background."""
+        self._server_hybrid = self.store.available and self.store.supports_hybrid(self.sparse_field)
+        if self._server_hybrid:
+            logger.info(f"✅ Hybrid retrieval on Milvus BM25 field '{self.sparse_field}'")
+            if self.hybrid_weights[0] != self.hybrid_weights[1]:
+                logger.warning("Milvus RRF reranking is unweighted; hybrid weights only apply to local fusion")
+            return
+        if self.sparse_index is not None and self.store.available:
+            threading.Thread(
+                target=self.sparse_index.build, args=(self.store,), name="bm25-index", daemon=True
+            ).start()
+    
+    def hybrid_available(self) -> bool:
+        """True if hybrid retrieval can run now (server-side BM25 or a built local index)."""
+        return self.store.available and (
+            self._server_hybrid or (self.sparse_index is not None and self.sparse_index.ready)
+        )
     
     def retrieve_graphrag_context(
         self,
         query_embedding: List[float],
         top_k: int = 5,
-        max_depth: int = 2
+        max_depth: int = 2,
+        traversal_mode: str = "bfs",
+        max_nodes: int = 10,
+        similarity_threshold: float = 0.7,
+        beam_width: int = 5,
+        deadline: float = None,
+        lazy_payloads: bool = True,
+        query_text: str = None,
+        retrieval_mode: str = "dense",
+        hybrid_candidates: int = 20
     ) -> Dict:
         """
         Retrieve context using GraphRAG approach - PRIMARY METHOD.
         
+        Traversal works on node ids, scores and vectors only. Q&A payloads are
+        fetched afterwards in one batched query: with ``lazy_payloads`` only
+        for the nodes that can make it into the context, otherwise for every
+        visited node.
+        
         Args:
             query_embedding: Query vector embedding
             top_k: Number of top initial results to retrieve
             max_depth: Maximum depth for graph traversal
-            
+            traversal_mode: "bfs" to expand every neighbour, "beam" to expand only
+                the neighbours that score best against the query
+            max_nodes: Node budget for beam traversal (seed nodes always kept)
+            similarity_threshold: Minimum query similarity for beam candidates
+            beam_width: Maximum number of nodes added per level in beam traversal
+            deadline: time.monotonic() deadline; Milvus calls get the remaining time
+                as timeout and traversal stops expanding levels once it has passed
+            lazy_payloads: Fetch payloads only for the nodes the context can include
+            query_text: Query text for the BM25 ranking of hybrid retrieval
+            retrieval_mode: "dense" for vector search seeds, "hybrid" to fuse in BM25 keyword hits
+            hybrid_candidates: Hits taken from each ranking before fusion
+        
         Returns:
             Dictionary containing retrieved Q&A pairs and graph context
         """
-        if not self.collection:
-            logger.warning("Milvus collection not available, returning empty results")
+        if not self.store.available:
+            logger.warning(f"Vector store ({self.store.name}) not available, returning empty results")
             return {"nodes": [], "edges": [], "context": "", "qa_pairs": []}
         
         try:
-            # Step 1: Find initial similar Q&A pairs using vector search
-            search_params = {
-                "metric_type": "COSINE",
-                "params": {"nprobe": 10}
-            }
-            
-            results = self.collection.search(
-                data=[query_embedding],
-                anns_field="combined_embedding",
-                param=search_params,
-                limit=top_k,
-                output_fields=["id", "question", "response", "related_nodes", "metadata"]
+            # Step 1: Find initial similar Q&A pairs using vector (or hybrid) search
+            output_fields = ["id", "related_nodes"] if lazy_payloads else [*NODE_FIELDS, "related_nodes"]
+            seeds, seed_mode = self._search_seeds(
+                query_embedding, query_text, top_k, output_fields, deadline, retrieval_mode, hybrid_candidates
             )
             
-            # Step 2: Extract initial nodes
+            # Step 2: Extract initial nodes (the search already returns their adjacency)
             initial_nodes = []
-            initial_node_ids = []
+            adjacency = {}
+            seed_rows = {}
             
-            for hits in results:
-                for hit in hits:
-                    node_data = {
-                        "id": hit.id,
-                        "question": hit.entity.get("question", ""),
-                        "response": hit.entity.get("response", ""),
-                        "similarity": 1 - hit.distance,  # Convert distance to similarity
-                        "metadata": hit.entity.get("metadata", {})
-                    }
-                    
-                    initial_nodes.append(node_data)
-                    initial_node_ids.append(hit.id)
+            for node_id, similarity, entity in seeds:
+                node = GraphNode(node_id, similarity=similarity)
+                related_nodes = list(entity.get("related_nodes", None) or [])
+                adjacency[node_id] = related_nodes[:MAX_RELATED_NODES]
+                seed_rows[node_id] = {"related_nodes": related_nodes}
+                if not lazy_payloads:
+                    node.hydrate(entity)
+                    seed_rows[node_id].update(node.payload())
+                initial_nodes.append(node)
             
-            # Step 3: Traverse graph to find related nodes
-            graph_nodes = initial_nodes.copy()
-            graph_edges = []
-            visited_nodes = set(initial_node_ids)
+            # Seed hits are often hubs reached again by later traversals
+            if self.graph_cache is not None:
+                self.graph_cache.put_many(seed_rows)
             
-            # Get related nodes from graph
-            current_level = initial_node_ids
-            for depth in range(max_depth):
-                if not current_level:
-                    break
-                
-                next_level = []
-                for node_id in current_level:
-                    # Get related nodes from Milvus
-                    related_node_ids = self._get_related_nodes_from_milvus(node_id)
-                    
-                    for related_id in related_node_ids:
-                        if related_id not in visited_nodes:
-                            visited_nodes.add(related_id)
-                            next_level.append(related_id)
-                            
-                            # Get full node data
-                            node_data = self._get_node_data_from_milvus(related_id)
-                            if node_data:
-                                graph_nodes.append(node_data)
-                            
-                            # Add edge
-                            graph_edges.append({
-                                "source": node_id,
-                                "target": related_id,
-                                "type": "semantic_similarity"
-                            })
-                
-                current_level = next_level
+            # Step 3: Traverse graph level by level on ids (and vectors for beam)
+            if traversal_mode == "beam":
+                graph_nodes, graph_edges = self._traverse_beam(
+                    query_embedding, initial_nodes, adjacency, max_depth,
+                    max_nodes, similarity_threshold, beam_width, deadline
+                )
+            else:
+                graph_nodes, graph_edges = self._traverse_levels(initial_nodes, adjacency, max_depth, deadline)
+            deadline_reached = max_depth > 0 and self._expired(deadline)
+            
+            # Step 4: Fetch payloads in one batched query
+            if lazy_payloads:
+                context_limit = self.prompt_builder.max_nodes if self.prompt_builder is not None else 10
+                qa_pairs = self._hydrate(rank_nodes(graph_nodes)[:context_limit])
+            else:
+                qa_pairs = self._hydrate(graph_nodes)
             
-            # Step 4: Build context string
-            context = self._build_graphrag_context(graph_nodes, graph_edges)
+            # Step 5: Build context string
+            if self.prompt_builder is not None:
+                context, context_stats = self.prompt_builder.build_context(qa_pairs, graph_edges)
+            else:
+                context, context_stats = self._build_graphrag_context(qa_pairs, graph_edges), {}
+            context_stats["nodes_hydrated"] = len(qa_pairs)
             
             return {
                 "nodes": graph_nodes,
                 "edges": graph_edges,
                 "context": context,
-                "qa_pairs": graph_nodes,  # Q&A pairs are the nodes
-                "depth": max_depth
+                "qa_pairs": qa_pairs,  # Q&A pairs are the nodes with payloads
+                "depth": max_depth,
+                "traversal_mode": traversal_mode,
+                "retrieval_mode": seed_mode,
+                "context_stats": context_stats,
+                "deadline_reached": deadline_reached
             }
         
         except Exception as e:
             logger.error(f"Error retrieving GraphRAG context: {str(e)}")
             return {"nodes": [], "edges": [], "context": "", "qa_pairs": []}
     
+    def _search_seeds(
+        self,
+        query_embedding: List[float],
+        query_text: Optional[str],
+        top_k: int,
+        output_fields: List[str],
+        deadline: Optional[float],
+        retrieval_mode: str,
+        candidates: int
+    ) -> Tuple[List[Tuple], str]:
+        """
+        Find the traversal seeds.
+        
+        Dense mode is one COSINE search on ``combined_embedding``. Hybrid mode
+        adds a BM25 ranking over question/response text: one Milvus hybrid
+        request with RRF reranking when the collection has a BM25 field,
+        otherwise the dense hits fused with the local BM25 index by weighted
+        RRF. Hybrid seeds are scored by cosine similarity to the query so they
+        rank alongside traversed nodes. Until the local index is built, hybrid
+        mode runs as dense.
+        
+        Returns:
+            Tuple of (list of (node id, similarity, entity), retrieval mode used)
+        """
+        if retrieval_mode != "hybrid" or not query_text or not self.hybrid_available():
+            hits = self.store.search(query_embedding, top_k, output_fields, timeout=self._milvus_timeout(deadline))
+            return hits, "dense"
+        
+        fields = [*output_fields, "combined_embedding"]
+        limit = max(top_k, candidates)
+        if self._server_hybrid:
+            entities = self.store.hybrid_search(
+                query_embedding, query_text, self.sparse_field, top_k, limit, self.rrf_k,
+                fields, timeout=self._milvus_timeout(deadline)
+            )
+            mode = "hybrid_server"
+        else:
+            hits = self.store.search(query_embedding, limit, fields, timeout=self._milvus_timeout(deadline))
+            dense = {node_id: entity for node_id, _, entity in hits}
+            sparse = [node_id for node_id, _ in self.sparse_index.search(query_text, limit)]
+            fused = [node_id for node_id, _ in weighted_rrf([list(dense), sparse], self.hybrid_weights, self.rrf_k)[:top_k]]
+            # Keyword-only hits were not returned by the vector search
+            rows = self._query_by_ids([node_id for node_id in fused if node_id not in dense], fields, deadline)
+            entities = [(node_id, dense.get(node_id) or rows.get(node_id)) for node_id in fused]
+            entities = [(node_id, entity) for node_id, entity in entities if entity is not None]
+            mode = "hybrid_local"
+        
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vector) or 1.0
+        seeds = []
+        for node_id, entity in entities:
+            vector = entity.get("combined_embedding", None)
+            similarity = 0.0
+            if vector is not None:
+                vector = np.asarray(vector, dtype=np.float32)
+                similarity = float(np.dot(query_vector, vector) / (query_norm * (np.linalg.norm(vector) or 1.0)))
+            seeds.append((node_id, similarity, entity))
+        return seeds, mode
+    
     def retrieve_vector_context(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
         """
         Retrieve relevant context from vector database (DEPRECATED - use retrieve_graphrag_context).
@@ -216,64 +413,268 @@ class ContextIntegrator:
         Args:
             query_embedding: Query vector embedding
             top_k: Number of top results to retrieve
-            
+        
         Returns:
             List of retrieved documents with metadata
         """
         logger.warning("retrieve_vector_context is deprecated. Use retrieve_graphrag_context instead.")
-        graph_result = self.retrieve_graphrag_context(query_embedding, top_k, max_depth=0)
-        return graph_result.get("qa_pairs", [])
+        graph_result = self.retrieve_graphrag_context(query_embedding, top_k, max_depth=0, lazy_payloads=False)
+        return [node.to_dict() for node in graph_result.get("qa_pairs", [])]
     
-    def _get_related_nodes_from_milvus(self, node_id: str) -> List[str]:
-        """Get related node IDs from Milvus for a given node."""
-        if not self.collection:
-            return []
+    def _traverse_levels(
+        self,
+        initial_nodes: List["GraphNode"],
+        adjacency: Dict[str, List[str]],
+        max_depth: int,
+        deadline: float = None
+    ) -> Tuple[List["GraphNode"], List["GraphEdge"]]:
+        """
+        Breadth-first traversal on node ids, one adjacency lookup per level.
         
-        try:
-            # Query Milvus to get related_nodes field
-            expr = f'id == "{node_id}"'
-            results = self.collection.query(
-                expr=expr,
-                output_fields=["related_nodes"]
-            )
+        Adjacency comes from the in-memory snapshot when it is loaded, and
+        otherwise from one batched Milvus query per level.
+        
+        Args:
+            initial_nodes: Seed nodes returned by the vector search
+            adjacency: Known related node ids, keyed by node id (seeded from the search)
+            max_depth: Maximum depth for graph traversal
+            deadline: time.monotonic() deadline after which no further level is expanded
+        
+        Returns:
+            Tuple of (graph nodes without payloads beyond the seeds, graph edges)
+        """
+        graph_nodes = initial_nodes.copy()
+        graph_edges = []
+        visited_nodes = set(node.id for node in initial_nodes)
+        
+        current_level = [node.id for node in initial_nodes]
+        for depth in range(max_depth):
+            if not current_level or self._expired(deadline):
+                break
+            
+            # Adjacency for frontier nodes that are not known yet
+            self._fill_adjacency(current_level, adjacency, deadline)
             
-            if results and len(results) > 0:
-                related_nodes = results[0].get("related_nodes", [])
-                return related_nodes[:20]  # Limit to top 20 related nodes
+            next_level = []
+            for node_id in current_level:
+                for related_id in adjacency.get(node_id, []):
+                    if related_id not in visited_nodes:
+                        visited_nodes.add(related_id)
+                        next_level.append(related_id)
+                        graph_nodes.append(GraphNode(related_id, depth=depth + 1))
+                        
+                        # Add edge
+                        graph_edges.append(GraphEdge(node_id, related_id))
             
-            return []
+            current_level = next_level
         
-        except Exception as e:
-            logger.error(f"Error getting related nodes for {node_id}: {str(e)}")
-            return []
+        return graph_nodes, graph_edges
     
-    def _get_node_data_from_milvus(self, node_id: str) -> Optional[Dict]:
-        """Get full node data from Milvus."""
-        if not self.collection:
-            return None
+    def _fill_adjacency(self, node_ids: List[str], adjacency: Dict[str, List[str]], deadline: float = None):
+        """
+        Add related node ids for nodes missing from adjacency.
         
-        try:
-            expr = f'id == "{node_id}"'
-            results = self.collection.query(
-                expr=expr,
-                output_fields=["id", "question", "response", "metadata"]
-            )
+        The snapshot answers in memory; nodes it does not know (e.g. inserted
+        after the last refresh) are looked up in Milvus in one batched query.
+        """
+        missing = [node_id for node_id in node_ids if node_id not in adjacency]
+        if not missing:
+            return
+        if self._snapshot_ready():
+            unknown = []
+            for node_id in missing:
+                related = self.graph_snapshot.neighbors(node_id, MAX_RELATED_NODES)
+                if related is None:
+                    unknown.append(node_id)
+                else:
+                    adjacency[node_id] = related
+            missing = unknown
+        if missing:
+            for node_id, row in self._query_by_ids(missing, ["id", "related_nodes"], deadline).items():
+                adjacency[node_id] = list(row.get("related_nodes", None) or [])[:MAX_RELATED_NODES]
+    
+    def _traverse_beam(
+        self,
+        query_embedding: List[float],
+        initial_nodes: List["GraphNode"],
+        adjacency: Dict[str, List[str]],
+        max_depth: int,
+        max_nodes: int,
+        similarity_threshold: float,
+        beam_width: int,
+        deadline: float = None
+    ) -> Tuple[List["GraphNode"], List["GraphEdge"]]:
+        """
+        Query-aware beam search over the graph.
+        
+        Candidate neighbours are scored against the query using their stored
+        embeddings; only the best-scoring ones above the threshold are kept and
+        expanded. No payloads are fetched during the search.
+        
+        Args:
+            query_embedding: Query vector embedding
+            initial_nodes: Seed nodes returned by the vector search
+            adjacency: Known related node ids, keyed by node id
+            max_depth: Maximum depth for graph traversal
+            max_nodes: Total node budget (seed nodes always kept)
+            similarity_threshold: Minimum cosine similarity for a candidate
+            beam_width: Maximum number of nodes kept per level
+            deadline: time.monotonic() deadline after which no further level is expanded
+        
+        Returns:
+            Tuple of (graph nodes without payloads beyond the seeds, graph edges)
+        """
+        graph_nodes = initial_nodes.copy()
+        graph_edges = []
+        visited_nodes = set(node.id for node in initial_nodes)
+        budget = max(max_nodes, len(initial_nodes))
+        
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vector) or 1.0
+        
+        current_level = [node.id for node in initial_nodes]
+        for depth in range(max_depth):
+            if not current_level or len(graph_nodes) >= budget or self._expired(deadline):
+                break
+            self._fill_adjacency(current_level, adjacency, deadline)
             
-            if results and len(results) > 0:
-                result = results[0]
-                return {
-                    "id": result.get("id", node_id),
-                    "question": result.get("question", ""),
-                    "response": result.get("response", ""),
-                    "similarity": 0.0,  # Will be calculated if needed
-                    "metadata": result.get("metadata", {})
-                }
+            # Collect unseen neighbours, remembering the first parent that reached them
+            parents = {}
+            for node_id in current_level:
+                for related_id in adjacency.get(node_id, []):
+                    if related_id not in visited_nodes and related_id not in parents:
+                        parents[related_id] = node_id
+            if not parents:
+                break
             
-            return None
+            # Score candidates on their stored vectors only (adjacency comes from the snapshot if loaded)
+            fields = ["id", "combined_embedding"] if self._snapshot_ready() else ["id", "combined_embedding", "related_nodes"]
+            rows = self._query_by_ids(list(parents), fields, deadline)
+            scored = []
+            for candidate_id, row in rows.items():
+                vector = row.get("combined_embedding")
+                if vector is None:
+                    continue
+                vector = np.asarray(vector, dtype=np.float32)
+                similarity = float(np.dot(query_vector, vector) / (query_norm * (np.linalg.norm(vector) or 1.0)))
+                if similarity >= similarity_threshold:
+                    scored.append((similarity, candidate_id))
+                    if "related_nodes" in row:
+                        adjacency[candidate_id] = list(row.get("related_nodes", None) or [])[:MAX_RELATED_NODES]
+            visited_nodes.update(parents)
+            
+            scored.sort(reverse=True)
+            beam = scored[:min(beam_width, budget - len(graph_nodes))]
+            if not beam:
+                break
+            
+            next_level = []
+            for similarity, candidate_id in beam:
+                graph_nodes.append(GraphNode(candidate_id, similarity=similarity, depth=depth + 1))
+                graph_edges.append(GraphEdge(parents[candidate_id], candidate_id))
+                next_level.append(candidate_id)
+            
+            current_level = next_level
         
-        except Exception as e:
-            logger.error(f"Error getting node data for {node_id}: {str(e)}")
+        return graph_nodes, graph_edges
+    
+    def _hydrate(self, nodes: List["GraphNode"]) -> List["GraphNode"]:
+        """
+        Fill in question/response/metadata with one batched query.
+        
+        Runs without the traversal deadline: the context needs these payloads
+        even when traversal was cut short.
+        
+        Args:
+            nodes: Nodes to return with payloads (already hydrated ones are not refetched)
+        
+        Returns:
+            The nodes that have a payload, in the given order (ids missing from Milvus are dropped)
+        """
+        missing = [node.id for node in nodes if not node.hydrated]
+        rows = self._query_by_ids(missing, list(NODE_FIELDS)) if missing else {}
+        hydrated = []
+        for node in nodes:
+            if not node.hydrated:
+                row = rows.get(node.id)
+                if row is None:
+                    continue
+                node.hydrate(row)
+            hydrated.append(node)
+        return hydrated
+    
+    def _query_by_ids(self, node_ids: List[str], output_fields: List[str], deadline: float = None) -> Dict[str, Dict]:
+        """
+        Fetch rows for many node ids with batched `id in [...]` queries.
+        
+        Rows already in the graph cache are served from memory; only the
+        remaining ids are queried, and their rows are added to the cache.
+        
+        Args:
+            node_ids: Node ids to fetch
+            output_fields: Fields to return for each row
+            deadline: time.monotonic() deadline; batches not started by then are skipped
+        
+        Returns:
+            Dictionary mapping node id to its row (missing ids are omitted)
+        """
+        if not self.store.available or not node_ids:
+            return {}
+        
+        rows = {}
+        unique_ids = list(dict.fromkeys(node_ids))
+        if self.graph_cache is not None:
+            rows, unique_ids = self.graph_cache.get_many(unique_ids, output_fields)
+            if not unique_ids:
+                return rows
+        
+        fetched = {}
+        for i in range(0, len(unique_ids), QUERY_BATCH_SIZE):
+            if self._expired(deadline):
+                logger.warning(f"Deadline reached, skipping {len(unique_ids) - i} of {len(unique_ids)} node lookups")
+                break
+            batch = unique_ids[i:i + QUERY_BATCH_SIZE]
+            try:
+                results = self.store.query_by_ids(batch, output_fields, timeout=self._milvus_timeout(deadline))
+            except Exception as e:
+                logger.error(f"Error querying {len(batch)} nodes from {self.store.name}: {str(e)}")
+                continue
+            for result in results:
+                fetched[result.get("id")] = result
+        
+        if self.graph_cache is not None and fetched:
+            self.graph_cache.put_many(fetched)
+        rows.update(fetched)
+        return rows
+    
+    def get_graph_cache_stats(self) -> Dict:
+        """Return graph cache hit ratios and memory use (empty if caching is disabled)."""
+        return self.graph_cache.stats() if self.graph_cache is not None else {}
+    
+    def get_graph_snapshot_stats(self) -> Dict:
+        """Return adjacency snapshot size, age and lookup counters (empty if disabled)."""
+        return self.graph_snapshot.stats() if self.graph_snapshot is not None else {}
+    
+    def get_vector_store_stats(self) -> Dict:
+        """Return vector store backend statistics."""
+        return self.store.stats()
+    
+    def get_sparse_index_stats(self) -> Dict:
+        """Return the hybrid retrieval backend and local BM25 index counters."""
+        stats = self.sparse_index.stats() if self.sparse_index is not None else {}
+        stats["server_hybrid"] = getattr(self, "_server_hybrid", False)
+        return stats
+    
+    @staticmethod
+    def _expired(deadline: Optional[float]) -> bool:
+        return deadline is not None and time.monotonic() >= deadline
+    
+    @staticmethod
+    def _milvus_timeout(deadline: Optional[float]) -> Optional[float]:
+        """Seconds left before the deadline as a Milvus RPC timeout (None waits indefinitely)."""
+        if deadline is None:
             return None
+        return max(0.1, deadline - time.monotonic())
     
     def _build_graphrag_context(self, nodes: List[Dict], edges: List[Dict]) -> str:
         """Build context string from GraphRAG nodes (Q&A pairs) and edges."""
@@ -312,7 +713,7 @@ class ContextIntegrator:
         Args:
             vector_results: Results from vector search (optional, deprecated)
             graph_results: Results from GraphRAG traversal
-            
+        
         Returns:
             Integrated context string
         """
@@ -333,39 +734,186 @@ class ContextIntegrator:
         
         return "\n".join(context_parts) if context_parts else ""
     
-    def store_document(self, text: str, embedding: List[float], metadata: Dict = None):
+    def store_document(
+        self,
+        question: str,
+        response: str,
+        embedding: List[float] = None,
+        metadata: Dict = None,
+        related_nodes: List = None,
+        node_id=None,
+        embed_documents: Callable[[List[str]], List[List[float]]] = None
+    ) -> Dict:
         """
-        Store a document in Milvus (for future use).
-        
-        NOTE: This method requires the Milvus collection schema to match the data structure.
-        The collection should have fields: 'text' (VARCHAR), 'embedding' (FLOAT_VECTOR), 
-        'metadata' (JSON), and optionally 'entity_id' (VARCHAR).
+        Store one Q&A node (a single-document store_documents call).
         
         Args:
-            text: Document text
-            embedding: Document embedding vector
+            question: Question text
+            response: Answer text
+            embedding: combined_embedding of the node (computed with embed_documents if omitted)
             metadata: Additional metadata
+            related_nodes: Ids of related nodes
+            node_id: Primary key (omit for auto_id collections)
+            embed_documents: Batch embedding function
+        
+        Returns:
+            Ingestion statistics (see store_documents)
         """
-        if not self.collection:
-            logger.warning("Cannot store document: Milvus collection not available")
-            return
+        document = {
+            "question": question,
+            "response": response,
+            "combined_embedding": embedding,
+            "related_nodes": related_nodes,
+            "metadata": metadata
+        }
+        if node_id is not None:
+            document["id"] = node_id
+        return self.store_documents([document], embed_documents=embed_documents)
+    
+    def store_documents(
+        self,
+        documents: Iterable[Dict],
+        embed_documents: Callable[[List[str]], List[List[float]]] = None,
+        embed_batch_size: int = 64,
+        insert_batch_rows: int = 1000,
+        insert_batch_bytes: int = 16 * 1024 * 1024,
+        flush_interval_seconds: float = 0
+    ) -> Dict:
+        """
+        Bulk-ingest Q&A nodes into the vector store.
         
-        try:
-            # Prepare data for insertion
-            # NOTE: Data structure must match collection schema
-            data = [{
-                "text": text,
-                "embedding": embedding,
-                "metadata": metadata or {}
-            }]
+        Documents are embedded in batches, buffered and inserted in chunks
+        bounded by row count and estimated payload size, and flushed once at
+        the end (plus every ``flush_interval_seconds`` during long loads), so
+        Milvus does not seal a segment per document.
+        
+        Args:
+            documents: Dicts with question, response and optionally id,
+                combined_embedding, related_nodes and metadata (streamed, any iterable)
+            embed_documents: Batch embedding function for documents without
+                combined_embedding (e.g. HuggingFaceEmbeddings.embed_documents)
+            embed_batch_size: Documents embedded per call
+            insert_batch_rows: Maximum rows per insert request
+            insert_batch_bytes: Maximum estimated payload per insert request
+            flush_interval_seconds: Flush during the load at this interval (0 flushes only at the end)
+        
+        Returns:
+            Dictionary with document/insert/failure counts, timings and throughput
+        """
+        stats = {
+            "documents": 0, "inserted": 0, "failed": 0, "insert_batches": 0, "flushes": 0,
+            "embed_seconds": 0.0, "insert_seconds": 0.0, "flush_seconds": 0.0
+        }
+        if not self.store.available:
+            logger.warning(f"Cannot store documents: vector store ({self.store.name}) not available")
+            return stats
+        
+        started = time.perf_counter()
+        last_flush = time.monotonic()
+        pending, pending_bytes, inserted = [], 0, []
+        
+        def insert_pending():
+            nonlocal pending, pending_bytes
+            if not pending:
+                return
+            insert_started = time.perf_counter()
+            try:
+                keys = self.store.insert(pending)
+                # Auto-id collections assign the keys; keep them for the local indexes
+                for row, key in zip(pending, keys or []):
+                    row.setdefault("id", key)
+                stats["inserted"] += len(pending)
+                inserted.extend(pending)
+            except Exception as e:
+                logger.error(f"Error inserting {len(pending)} documents: {str(e)}")
+                stats["failed"] += len(pending)
+            stats["insert_batches"] += 1
+            stats["insert_seconds"] += time.perf_counter() - insert_started
+            pending, pending_bytes = [], 0
+        
+        def flush():
+            nonlocal last_flush
+            flush_started = time.perf_counter()
+            try:
+                self.store.flush()
+                stats["flushes"] += 1
+            except Exception as e:
+                logger.error(f"Error flushing vector store: {str(e)}")
+            stats["flush_seconds"] += time.perf_counter() - flush_started
+            last_flush = time.monotonic()
+        
+        for batch in _batched(documents, embed_batch_size):
+            stats["documents"] += len(batch)
+            embed_started = time.perf_counter()
+            rows = self._prepare_rows(batch, embed_documents)
+            stats["embed_seconds"] += time.perf_counter() - embed_started
+            stats["failed"] += len(batch) - len(rows)
             
-            # Insert into collection
-            self.collection.insert(data)
-            self.collection.flush()
+            for row in rows:
+                size = _estimate_row_bytes(row)
+                if pending and (len(pending) >= insert_batch_rows or pending_bytes + size > insert_batch_bytes):
+                    insert_pending()
+                pending.append(row)
+                pending_bytes += size
             
-            logger.info("Document stored successfully")
+            if flush_interval_seconds > 0 and time.monotonic() - last_flush >= flush_interval_seconds:
+                insert_pending()
+                flush()
         
-        except Exception as e:
-            logger.error(f"Error storing document: {str(e)}")
-            logger.warning("Make sure the collection schema matches the data structure")
-
+        insert_pending()
+        if inserted:
+            flush()
+            self._index_stored_rows(inserted)
+        
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        stats["docs_per_second"] = round(stats["inserted"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        for key in ("embed_seconds", "insert_seconds", "flush_seconds"):
+            stats[key] = round(stats[key], 3)
+        logger.info(
+            f"✅ Stored {stats['inserted']}/{stats['documents']} documents in {stats['seconds']:.1f}s "
+            f"({stats['docs_per_second']} docs/s, {stats['insert_batches']} insert batches, {stats['flushes']} flushes)"
+        )
+        return stats
+    
+    @staticmethod
+    def _prepare_rows(batch: List[Dict], embed_documents: Optional[Callable]) -> List[Dict]:
+        """Build collection rows, embedding question + response where no vector is given."""
+        to_embed = [doc for doc in batch if doc.get("combined_embedding") is None]
+        vectors = {}
+        if to_embed:
+            if embed_documents is None:
+                logger.error(f"{len(to_embed)} documents have no combined_embedding and no embedding function was given")
+            else:
+                try:
+                    embeddings = embed_documents([combined_text(doc) for doc in to_embed])
+                    vectors = {id(doc): vector for doc, vector in zip(to_embed, embeddings)}
+                except Exception as e:
+                    logger.error(f"Error embedding {len(to_embed)} documents: {str(e)}")
+        
+        rows = []
+        for doc in batch:
+            vector = doc.get("combined_embedding")
+            if vector is None:
+                vector = vectors.get(id(doc))
+            if vector is None:
+                continue
+            row = {
+                "question": doc.get("question") or "",
+                "response": doc.get("response") or "",
+                "combined_embedding": [float(value) for value in vector],
+                "related_nodes": list(doc.get("related_nodes") or []),
+                "metadata": doc.get("metadata") or {}
+            }
+            if doc.get("id") is not None:
+                row["id"] = doc["id"]
+            rows.append(row)
+        return rows
+    
+    def _index_stored_rows(self, rows: List[Dict]):
+        """Keep caches and local indexes consistent with newly stored rows."""
+        if self.graph_cache is not None:
+            self.graph_cache.invalidate()
+        if self.sparse_index is not None and self.sparse_index.ready:
+            for row in rows:
+                if "id" in row:
+                    self.sparse_index.add(row["id"], f"{row['question']} {row['response']}")
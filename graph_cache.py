@@ -0,0 +1,171 @@
+"""
+Graph Node Cache
+In-process LRU cache of knowledge-graph rows (adjacency, vectors and Q&A
+payloads) fetched from Milvus during GraphRAG traversal.
+Part of the Data & Memory Layer (Access Layer).
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Rough per-object overhead used for the memory estimate
+_ENTRY_OVERHEAD_BYTES = 256
+_FIELD_OVERHEAD_BYTES = 64
+
+
+def _estimate_bytes(row: Dict[str, Any]) -> int:
+    """Approximate memory footprint of a cached row."""
+    size = _ENTRY_OVERHEAD_BYTES
+    for field, value in row.items():
+        size += _FIELD_OVERHEAD_BYTES + len(field)
+        if isinstance(value, str):
+            size += len(value)
+        elif hasattr(value, "nbytes"):
+            size += int(value.nbytes)
+        elif isinstance(value, (list, tuple)):
+            size += sum(len(item) if isinstance(item, str) else 8 for item in value) + 8 * len(value)
+        elif isinstance(value, dict):
+            size += len(json.dumps(value, default=str))
+        else:
+            size += 16
+    return size
+
+
+def lookup_kind(output_fields: Iterable[str]) -> str:
+    """Classify a lookup for hit-ratio reporting: "payload", "vector" or "adjacency"."""
+    fields = set(output_fields)
+    if fields & {"question", "response", "metadata"}:
+        return "payload"
+    if "combined_embedding" in fields:
+        return "vector"
+    return "adjacency"
+
+
+class GraphCache:
+    """
+    Thread-safe LRU cache of Milvus rows keyed by node id.
+    
+    Fields fetched for the same node by different queries (adjacency, vector,
+    payload) are merged into one entry, so a lookup hits when every requested
+    field is cached. Entries expire after the TTL and least recently used
+    entries are evicted once the estimated memory exceeds the bound.
+    
+    The cache lives in process and is stamped with the KNOWLEDGE_BASE_VERSION
+    it was created for, so a new version takes effect on restart; rows
+    written through ContextIntegrator.store_documents invalidate it at once.
+    """
+    
+    def __init__(self, ttl_seconds: float = 3600, max_bytes: int = 64 * 1024 * 1024, version: str = "1"):
+        """
+        Initialize graph cache.
+        
+        Args:
+            ttl_seconds: Time-to-live for entries
+            max_bytes: Bound on the estimated memory of all entries
+            version: Knowledge-base version the entries belong to
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.version = version
+        self._entries = OrderedDict()  # node id -> (expires_at, row, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            kind: {"hits": 0, "misses": 0}
+            for kind in ("adjacency", "vector", "payload")
+        }
+        self._stats_totals = {"evictions": 0, "expired": 0, "invalidations": 0}
+    
+    def get_many(self, node_ids: List[str], output_fields: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Look up rows for many nodes.
+        
+        Args:
+            node_ids: Node ids to look up
+            output_fields: Fields the caller needs
+        
+        Returns:
+            Tuple of (node id -> row with the requested fields, ids to fetch from Milvus)
+        """
+        now = time.time()
+        fields = [field for field in output_fields if field != "id"]
+        stats = self._stats[lookup_kind(output_fields)]
+        found, missing = {}, []
+        with self._lock:
+            for node_id in node_ids:
+                entry = self._entries.get(node_id)
+                if entry is not None and entry[0] <= now:
+                    self._remove(node_id)
+                    self._stats_totals["expired"] += 1
+                    entry = None
+                if entry is None or not all(field in entry[1] for field in fields):
+                    stats["misses"] += 1
+                    missing.append(node_id)
+                    continue
+                self._entries.move_to_end(node_id)
+                stats["hits"] += 1
+                row = entry[1]
+                found[node_id] = {"id": node_id, **{field: row[field] for field in fields}}
+        return found, missing
+    
+    def put_many(self, rows: Dict[str, Dict[str, Any]]):
+        """Cache rows fetched from Milvus, merging with fields already cached for the node."""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            for node_id, row in rows.items():
+                entry = self._entries.get(node_id)
+                merged = dict(entry[1]) if entry is not None else {}
+                merged.update((field, value) for field, value in row.items() if field != "id")
+                self._remove(node_id)
+                size = _estimate_bytes(merged)
+                self._entries[node_id] = (expires_at, merged, size)
+                self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self._stats_totals["evictions"] += 1
+    
+    def invalidate(self, node_ids: Iterable[str] = None):
+        """Drop the given nodes (all nodes if None)."""
+        with self._lock:
+            if node_ids is None:
+                self._clear()
+                return
+            for node_id in node_ids:
+                if node_id in self._entries:
+                    self._remove(node_id)
+                    self._stats_totals["invalidations"] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return per-lookup-kind hit ratios, evictions and memory use."""
+        with self._lock:
+            stats = dict(self._stats_totals)
+            hits = misses = 0
+            for kind, counters in self._stats.items():
+                lookups = counters["hits"] + counters["misses"]
+                stats[kind] = {
+                    **counters,
+                    "hit_ratio": round(counters["hits"] / lookups, 3) if lookups else 0.0
+                }
+                hits += counters["hits"]
+                misses += counters["misses"]
+            stats["hit_ratio"] = round(hits / (hits + misses), 3) if hits + misses else 0.0
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+            stats["version"] = self.version
+            return stats
+    
+    def _remove(self, node_id: str):
+        entry = self._entries.pop(node_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+    
+    def _clear(self):
+        self._stats_totals["invalidations"] += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
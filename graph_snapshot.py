@@ -0,0 +1,313 @@
+"""
+Graph Adjacency Snapshot
+Compact CSR copy of the ``related_nodes`` graph stored in Milvus, persisted
+under VECTORSTORE_DIR and memory-mapped at startup so graph traversal runs
+in process instead of one Milvus round trip per hop.
+Part of the Data & Memory Layer (Access Layer).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Maximum ids per `id in [...]` expression when fetching new rows
+QUERY_BATCH_SIZE = 500
+
+_FILES = ("ids", "offsets", "indices", "loaded")
+
+
+class _CSR:
+    """Immutable adjacency arrays plus the id -> row mapping."""
+    
+    def __init__(self, ids: np.ndarray, offsets: np.ndarray, indices: np.ndarray, loaded: np.ndarray):
+        self.ids = ids  # (n,) node ids (int64 or unicode)
+        self.offsets = offsets  # (n + 1,) int64, row i spans indices[offsets[i]:offsets[i + 1]]
+        self.indices = indices  # (nnz,) int32 row numbers of the neighbours
+        self.loaded = loaded  # (n,) bool, False for ids only seen as a neighbour
+        self.index = {node_id: i for i, node_id in enumerate(ids.tolist())}
+    
+    @property
+    def node_count(self) -> int:
+        return int(self.loaded.sum())
+    
+    @property
+    def edge_count(self) -> int:
+        return int(self.indices.shape[0])
+
+
+def _build_csr(
+    ids: List[Any],
+    adjacency: Dict[Any, List[Any]],
+    base: Optional[_CSR] = None
+) -> _CSR:
+    """
+    Build CSR arrays from adjacency lists, optionally on top of an existing snapshot.
+    
+    Args:
+        ids: Node ids of the rows in ``adjacency`` that are not in ``base`` yet
+        adjacency: Node id -> related node ids for new (or newly loaded) rows
+        base: Existing snapshot whose rows are kept unchanged
+    
+    Returns:
+        New _CSR instance
+    """
+    all_ids = base.ids.tolist() if base is not None else []
+    index = dict(base.index) if base is not None else {}
+    
+    def row_of(node_id):
+        row = index.get(node_id)
+        if row is None:
+            row = len(all_ids)
+            index[node_id] = row
+            all_ids.append(node_id)
+        return row
+    
+    for node_id in ids:
+        row_of(node_id)
+    new_rows = {row_of(node_id): [row_of(related) for related in related_ids] for node_id, related_ids in adjacency.items()}
+    
+    count = len(all_ids)
+    lengths = np.zeros(count, dtype=np.int64)
+    loaded = np.zeros(count, dtype=bool)
+    if base is not None:
+        base_count = base.ids.shape[0]
+        lengths[:base_count] = np.diff(base.offsets)
+        loaded[:base_count] = base.loaded
+    for row, related_rows in new_rows.items():
+        lengths[row] = len(related_rows)
+        loaded[row] = True
+    
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    indices = np.empty(int(offsets[-1]), dtype=np.int32)
+    
+    # Copy unchanged base rows in contiguous runs between the replaced rows
+    if base is not None:
+        base_count = base.ids.shape[0]
+        start = 0
+        for row in sorted(r for r in new_rows if r < base_count) + [base_count]:
+            if row > start:
+                indices[offsets[start]:offsets[row]] = base.indices[base.offsets[start]:base.offsets[row]]
+            start = row + 1
+    for row, related_rows in new_rows.items():
+        indices[offsets[row]:offsets[row + 1]] = related_rows
+    
+    id_array = np.asarray(all_ids) if all_ids else np.asarray([], dtype=np.int64)
+    if id_array.dtype.kind not in "iU":
+        id_array = id_array.astype(str)
+    return _CSR(id_array, offsets, indices, loaded)
+
+
+class AdjacencySnapshot:
+    """
+    Memory-resident CSR adjacency of the knowledge graph.
+    
+    ``load`` memory-maps a persisted snapshot; ``build`` exports every node id
+    and its ``related_nodes`` from Milvus; ``refresh`` fetches only rows that
+    are not in the snapshot yet and appends them. The arrays are swapped
+    atomically, so lookups never block on a refresh.
+    """
+    
+    def __init__(self, snapshot_dir: str, version: str = "1"):
+        """
+        Initialize snapshot.
+        
+        Args:
+            snapshot_dir: Directory for the persisted arrays
+            version: Knowledge-base version; a persisted snapshot of another version is rebuilt
+        """
+        self.snapshot_dir = snapshot_dir
+        self.version = version
+        self._csr: Optional[_CSR] = None
+        self._refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._stats = {"lookups": 0, "misses": 0, "refreshes": 0, "rows_added": 0}
+    
+    @property
+    def ready(self) -> bool:
+        return self._csr is not None
+    
+    def neighbors(self, node_id: Any, limit: int = None) -> Optional[List[Any]]:
+        """
+        Related node ids of a node.
+        
+        Args:
+            node_id: Node id
+            limit: Maximum neighbours returned
+        
+        Returns:
+            List of related node ids, or None if the node is not in the snapshot
+            (the caller should then ask Milvus)
+        """
+        csr = self._csr
+        self._stats["lookups"] += 1
+        row = csr.index.get(node_id) if csr is not None else None
+        if row is None or not csr.loaded[row]:
+            self._stats["misses"] += 1
+            return None
+        start, end = int(csr.offsets[row]), int(csr.offsets[row + 1])
+        if limit is not None:
+            end = min(end, start + limit)
+        return csr.ids[csr.indices[start:end]].tolist()
+    
+    # ------------------ Persistence ------------------
+    
+    def load(self) -> bool:
+        """
+        Memory-map the persisted snapshot.
+        
+        Returns:
+            True if a snapshot of the current version was loaded
+        """
+        meta_path = os.path.join(self.snapshot_dir, "meta.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != self.version:
+                logger.info(f"Graph snapshot is for knowledge base version {meta.get('version')}, rebuilding")
+                return False
+            arrays = {
+                name: np.load(os.path.join(self.snapshot_dir, f"{name}.npy"), mmap_mode="r")
+                for name in _FILES
+            }
+        except (OSError, ValueError) as e:
+            logger.info(f"No usable graph snapshot in {self.snapshot_dir}: {e}")
+            return False
+        
+        self._csr = _CSR(arrays["ids"], arrays["offsets"], arrays["indices"], arrays["loaded"])
+        self._refreshed_at = meta.get("refreshed_at", 0.0)
+        logger.info(
+            f"✅ Graph snapshot loaded: {self._csr.node_count} nodes, {self._csr.edge_count} edges "
+            f"(memory-mapped from {self.snapshot_dir})"
+        )
+        return True
+    
+    def _save(self, csr: _CSR):
+        """Write the arrays and metadata; files are replaced atomically one by one, metadata last."""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        meta_path = os.path.join(self.snapshot_dir, "meta.json")
+        # A missing meta.json marks a half-written snapshot as unusable until the write completes
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name in _FILES:
+            path = os.path.join(self.snapshot_dir, f"{name}.npy")
+            tmp_path = os.path.join(self.snapshot_dir, f"{name}.tmp.npy")
+            np.save(tmp_path, getattr(csr, name))
+            os.replace(tmp_path, path)
+        meta = {
+            "version": self.version,
+            "refreshed_at": self._refreshed_at,
+            "nodes": csr.node_count,
+            "edges": csr.edge_count
+        }
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+    
+    # ------------------ Export from Milvus ------------------
+    
+    def build(self, store) -> bool:
+        """
+        Export every node and its related_nodes from the vector store into a new snapshot.
+        
+        Args:
+            store: VectorStore holding the knowledge graph
+        
+        Returns:
+            True on success
+        """
+        with self._refresh_lock:
+            started = time.perf_counter()
+            try:
+                adjacency = {
+                    row["id"]: list(row.get("related_nodes", None) or [])
+                    for row in store.iterate_rows(["id", "related_nodes"])
+                }
+            except Exception as e:
+                logger.error(f"Error exporting graph snapshot from Milvus: {str(e)}")
+                return False
+            csr = _build_csr(list(adjacency), adjacency)
+            self._refreshed_at = time.time()
+            self._install(csr)
+            logger.info(
+                f"✅ Graph snapshot built: {csr.node_count} nodes, {csr.edge_count} edges "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+            return True
+    
+    def refresh(self, store) -> int:
+        """
+        Add rows inserted into Milvus since the snapshot was taken.
+        
+        Only ids are scanned; related_nodes are fetched for the new ids alone.
+        Existing rows are kept as they are (knowledge-base rows are immutable;
+        re-ingestion bumps KNOWLEDGE_BASE_VERSION and triggers a rebuild).
+        
+        Args:
+            store: VectorStore holding the knowledge graph
+        
+        Returns:
+            Number of rows added
+        """
+        if self._csr is None:
+            return self._csr.node_count if self.build(store) else 0
+        if not self._refresh_lock.acquire(blocking=False):
+            return 0  # Another refresh is running
+        try:
+            base = self._csr
+            new_ids = [
+                row["id"] for row in store.iterate_rows(["id"])
+                if not (row["id"] in base.index and base.loaded[base.index[row["id"]]])
+            ]
+            self._refreshed_at = time.time()
+            if not new_ids:
+                return 0
+            
+            adjacency = {}
+            for i in range(0, len(new_ids), QUERY_BATCH_SIZE):
+                batch = new_ids[i:i + QUERY_BATCH_SIZE]
+                for row in store.query_by_ids(batch, ["id", "related_nodes"]):
+                    adjacency[row["id"]] = list(row.get("related_nodes", None) or [])
+            
+            csr = _build_csr(list(adjacency), adjacency, base)
+            self._install(csr)
+            self._stats["rows_added"] += len(adjacency)
+            logger.info(f"✅ Graph snapshot refreshed: +{len(adjacency)} nodes ({csr.node_count} total)")
+            return len(adjacency)
+        except Exception as e:
+            logger.error(f"Error refreshing graph snapshot: {str(e)}")
+            return 0
+        finally:
+            self._refresh_lock.release()
+    
+    def refresh_due(self, interval_seconds: float) -> bool:
+        """True if the last build/refresh is older than the interval."""
+        return interval_seconds > 0 and time.time() - self._refreshed_at >= interval_seconds
+    
+    def mark_refresh_started(self):
+        """Reset the refresh clock so concurrent callers do not start the same refresh."""
+        self._refreshed_at = time.time()
+    
+    def _install(self, csr: _CSR):
+        try:
+            self._save(csr)
+        except OSError as e:
+            logger.warning(f"Could not persist graph snapshot to {self.snapshot_dir}: {e}")
+        self._csr = csr
+        self._stats["refreshes"] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return snapshot size, age and lookup counters."""
+        csr = self._csr
+        stats = dict(self._stats)
+        stats["ready"] = csr is not None
+        stats["nodes"] = csr.node_count if csr is not None else 0
+        stats["edges"] = csr.edge_count if csr is not None else 0
+        stats["age_seconds"] = round(time.time() - self._refreshed_at, 1) if self._refreshed_at else None
+        return stats
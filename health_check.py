@@ -65,7 +65,10 @@ def check_llm():
             "status": "healthy",
             "models": [m["name"] for m in models],
             "primary": models[0]["name"] if models else None,
-            "qwen_enabled": QWEN_ENABLED
+            "qwen_enabled": QWEN_ENABLED,
+            "circuits": {m["name"]: m.get("circuit_state") for m in models},
+            "rate_limits": client.get_rate_limit_stats(),
+            "metering": client.get_metering_stats(window_seconds=300)
         }
     except Exception as e:
         logger.warning(f"LLM health check failed: {e}")
@@ -0,0 +1,92 @@
+"""
+Request Hedging Policy
+Decides when to duplicate a slow LLM request to the fallback model.
+Part of the Intelligence Layer client (ModelArts).
+"""
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+class HedgingPolicy:
+    """
+    Percentile-based hedge delay computed from recent time-to-first-byte samples.
+    
+    Until enough samples are collected the initial delay is used; afterwards
+    the delay tracks the configured percentile, clamped to [min_delay, max_delay].
+    """
+    
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        initial_delay: float = 5.0,
+        min_delay: float = 1.0,
+        max_delay: float = 30.0,
+        window_size: int = 200,
+        min_samples: int = 20
+    ):
+        """
+        Initialize hedging policy.
+        
+        Args:
+            percentile: TTFB percentile used as hedge delay (e.g. 95 for p95)
+            initial_delay: Delay in seconds used before min_samples are collected
+            min_delay: Lower bound for the hedge delay in seconds
+            max_delay: Upper bound for the hedge delay in seconds
+            window_size: Number of recent samples kept
+            min_samples: Samples required before the percentile is trusted
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+    
+    def record(self, ttfb: float):
+        """Record a time-to-first-byte sample (seconds) for the primary model."""
+        with self._lock:
+            self._samples.append(ttfb)
+    
+    def delay(self) -> float:
+        """Current hedge delay in seconds."""
+        with self._lock:
+            samples = list(self._samples)
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        value = float(np.percentile(samples, self.percentile))
+        return min(max(value, self.min_delay), self.max_delay)
+    
+    def stats(self) -> dict:
+        """Return current policy state for monitoring."""
+        with self._lock:
+            count = len(self._samples)
+        return {
+            "percentile": self.percentile,
+            "samples": count,
+            "delay_seconds": round(self.delay(), 3)
+        }
+
+
+class HedgeAttempt:
+    """State for one in-flight attempt of a hedged request."""
+    
+    def __init__(self, model: str):
+        self.model = model
+        self.first_byte = threading.Event()
+        self.cancelled = threading.Event()
+        self.response = None
+        self.ttfb: Optional[float] = None
+    
+    def cancel(self):
+        """Cancel the attempt, closing its connection if the response has started."""
+        self.cancelled.set()
+        response = self.response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
@@ -0,0 +1,215 @@
+"""
+LLM Response Cache
+Exact-match cache for chat completions with an in-memory LRU tier and a
+size-bounded on-disk tier under VECTORSTORE_DIR.
+Part of the Intelligence Layer client (ModelArts).
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(text: str) -> str:
+    """Normalize prompt text for cache keys (trim and collapse whitespace)."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class ResponseCache:
+    """
+    Two-tier (memory + disk) LRU cache for LLM responses.
+    
+    Entries expire after the TTL. The memory tier is bounded by entry count,
+    the disk tier by total bytes; least recently used entries are evicted first.
+    """
+    
+    def __init__(
+        self,
+        cache_dir: Optional[str],
+        ttl_seconds: float = 86400,
+        memory_max_entries: int = 1000,
+        disk_max_bytes: int = 256 * 1024 * 1024
+    ):
+        """
+        Initialize response cache.
+        
+        Args:
+            cache_dir: Directory for the disk tier (None disables it)
+            ttl_seconds: Time-to-live for entries
+            memory_max_entries: Maximum entries kept in memory
+            disk_max_bytes: Maximum total size of the disk tier
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._disk_index = OrderedDict()  # key -> size in bytes, LRU order
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+        
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._load_disk_index()
+            except OSError as e:
+                logger.warning(f"LLM cache directory unavailable, disk tier disabled: {e}")
+                self.cache_dir = None
+    
+    @staticmethod
+    def make_key(
+        model: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int]
+    ) -> str:
+        """Build a cache key from model, normalized prompt and sampling parameters."""
+        material = json.dumps({
+            "model": model,
+            "prompt": normalize_prompt(prompt),
+            "system": normalize_prompt(system_prompt) if system_prompt else "",
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._stats["expired"] += 1
+            
+            entry = self._disk_get(key, now)
+            if entry is not None:
+                expires_at, value = entry
+                self._stats["disk_hits"] += 1
+                self._memory_put(key, expires_at, value)
+                return value
+            
+            self._stats["misses"] += 1
+            return None
+    
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a response in both tiers."""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._memory_put(key, expires_at, value)
+            self._disk_put(key, expires_at, value)
+            self._stats["stores"] += 1
+    
+    def clear(self):
+        """Remove all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk_index):
+                self._disk_remove(key)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = len(self._disk_index)
+            stats["disk_bytes"] = self._disk_bytes
+            return stats
+    
+    # ------------------ Memory tier ------------------
+    
+    def _memory_put(self, key: str, expires_at: float, value: Dict[str, Any]):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+    
+    # ------------------ Disk tier ------------------
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def _load_disk_index(self):
+        """Index existing cache files, oldest access first."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        if entries:
+            logger.info(f"LLM cache: indexed {len(entries)} disk entries ({self._disk_bytes} bytes)")
+    
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        if not self.cache_dir or key not in self._disk_index:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._disk_remove(key)
+            return None
+        if entry.get("expires_at", 0) <= now:
+            self._disk_remove(key)
+            self._stats["expired"] += 1
+            return None
+        try:
+            os.utime(path, None)  # Record access for LRU order across restarts
+        except OSError:
+            pass
+        self._disk_index.move_to_end(key)
+        return entry["expires_at"], entry.get("value")
+    
+    def _disk_put(self, key: str, expires_at: float, value: Dict[str, Any]):
+        if not self.cache_dir:
+            return
+        data = json.dumps({"expires_at": expires_at, "value": value}, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"LLM cache: failed to write disk entry: {e}")
+            return
+        self._disk_bytes += len(data) - self._disk_index.pop(key, 0)
+        self._disk_index[key] = len(data)
+        while self._disk_bytes > self.disk_max_bytes and len(self._disk_index) > 1:
+            oldest = next(iter(self._disk_index))
+            self._disk_remove(oldest)
+            self._stats["evictions"] += 1
+    
+    def _disk_remove(self, key: str):
+        size = self._disk_index.pop(key, 0)
+        self._disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
@@ -0,0 +1,200 @@
+"""
+LLM Routing Policy
+Maps task type and input length to model, max_tokens and timeout, and keeps
+per-route latency statistics against a latency SLO.
+Part of the Application Server (ECS) layer.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Ordered rules, first match wins.
+#   task_types:        TaskType values the rule applies to (omit for any)
+#   max_input_tokens:  Only match prompts up to this many tokens (omit for any length)
+#   model:             "primary" (configured model and order, see QWEN_ENABLED) or "qwen"
+#   max_tokens:        Completion token allowance (omit for LLM_MAX_TOKENS)
+#   timeout:           Seconds allowed for the LLM call, retries and fallback included (omit for LLM_REQUEST_DEADLINE)
+#   degrade_to:        Route used instead while this route's p95 latency exceeds the SLO
+# Primary routes keep the unrouted defaults; only short simple questions and
+# degraded routes are shortened and sent to Qwen.
+DEFAULT_ROUTING_TABLE = [
+    {
+        "name": "simple_short",
+        "task_types": ["simple_retrieval"],
+        "max_input_tokens": 2000,
+        "model": "qwen",
+        "max_tokens": 512,
+        "timeout": 20
+    },
+    {
+        "name": "graph_rag",
+        "task_types": ["graph_rag"],
+        "model": "primary",
+        "degrade_to": "fast"
+    },
+    {
+        "name": "reasoning",
+        "task_types": ["multi_step_reasoning", "comparative_analysis"],
+        "model": "primary",
+        "degrade_to": "fast"
+    },
+    {
+        "name": "default",
+        "model": "primary",
+        "degrade_to": "fast"
+    },
+    {
+        # Only reached through degrade_to
+        "name": "fast",
+        "task_types": [],
+        "model": "qwen",
+        "max_tokens": 640,
+        "timeout": 25
+    }
+]
+
+
+def load_routing_table(raw: str) -> List[Dict[str, Any]]:
+    """
+    Parse a routing table from JSON, falling back to the default table.
+    
+    Args:
+        raw: JSON list of route dictionaries (empty for the default table)
+    
+    Returns:
+        List of route dictionaries
+    """
+    if not raw:
+        return DEFAULT_ROUTING_TABLE
+    try:
+        table = json.loads(raw)
+        if not isinstance(table, list) or not all(isinstance(r, dict) and r.get("name") for r in table):
+            raise ValueError("expected a list of routes with a name")
+        return table
+    except ValueError as e:
+        logger.warning(f"Invalid LLM_ROUTING_TABLE ({e}), using the default routing table")
+        return DEFAULT_ROUTING_TABLE
+
+
+class LLMRouter:
+    """
+    Chooses a route per request and tracks per-route latency against the SLO.
+    
+    A route whose recent p95 latency exceeds the SLO hands its requests to
+    its ``degrade_to`` route. Samples older than the SLO window expire, so a
+    degraded route is tried again once its slow samples have aged out.
+    """
+    
+    def __init__(
+        self,
+        table: List[Dict[str, Any]],
+        latency_slo: float,
+        window_size: int = 200,
+        window_seconds: float = 300.0,
+        min_samples: int = 20
+    ):
+        """
+        Initialize router.
+        
+        Args:
+            table: Ordered routing rules (see DEFAULT_ROUTING_TABLE)
+            latency_slo: Target LLM latency in seconds (p95)
+            window_size: Latency samples kept per route
+            window_seconds: Age after which samples no longer count toward the SLO check
+            min_samples: Samples required before a route can be degraded
+        """
+        self.table = table
+        self.routes = {route["name"]: route for route in table}
+        self.latency_slo = latency_slo
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self._latencies = {name: deque(maxlen=window_size) for name in self.routes}
+        self._counters = {name: {"requests": 0, "failures": 0, "slo_violations": 0, "degraded": 0} for name in self.routes}
+        self._lock = threading.Lock()
+    
+    def select(self, task_type: str, input_tokens: int) -> Dict[str, Any]:
+        """
+        Select the route for a request.
+        
+        Args:
+            task_type: TaskType value of the request
+            input_tokens: Estimated prompt tokens (system + user message)
+        
+        Returns:
+            Route dictionary plus ``route`` (name used), ``matched`` (rule
+            that matched) and ``degraded`` (True if the SLO forced a downgrade)
+        """
+        matched = self._match(task_type, input_tokens)
+        route = matched
+        degraded = False
+        target = matched.get("degrade_to")
+        if target in self.routes and self._over_slo(matched["name"]):
+            route = self.routes[target]
+            degraded = True
+            with self._lock:
+                self._counters[matched["name"]]["degraded"] += 1
+        return {**route, "route": route["name"], "matched": matched["name"], "degraded": degraded}
+    
+    def _match(self, task_type: str, input_tokens: int) -> Dict[str, Any]:
+        for route in self.table:
+            task_types = route.get("task_types")
+            if task_types is not None and task_type not in task_types:
+                continue
+            max_input = route.get("max_input_tokens")
+            if max_input is not None and input_tokens > max_input:
+                continue
+            return route
+        return self.table[-1]
+    
+    def _over_slo(self, name: str) -> bool:
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            samples = [latency for ts, latency in self._latencies.get(name, ()) if ts >= cutoff]
+        if len(samples) < self.min_samples:
+            return False
+        return float(np.percentile(samples, 95)) > self.latency_slo
+    
+    def record(self, route: str, latency: float, success: bool = True):
+        """Record the LLM latency (seconds) of a request served by a route."""
+        with self._lock:
+            if route not in self._counters:
+                return
+            counters = self._counters[route]
+            counters["requests"] += 1
+            if not success:
+                counters["failures"] += 1
+                return
+            self._latencies[route].append((time.time(), latency))
+            if latency > self.latency_slo:
+                counters["slo_violations"] += 1
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-route configuration, counters and latency percentiles."""
+        with self._lock:
+            snapshot = {
+                name: ([latency for _, latency in self._latencies[name]], dict(self._counters[name]))
+                for name in self.routes
+            }
+        stats = {}
+        for name, (samples, counters) in snapshot.items():
+            route = self.routes[name]
+            entry = {
+                "model": route.get("model"),
+                "max_tokens": route.get("max_tokens"),
+                "timeout": route.get("timeout"),
+                "slo_seconds": self.latency_slo,
+                **counters
+            }
+            if samples:
+                p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+                entry.update({"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)})
+                entry["over_slo"] = self._over_slo(name)
+            stats[name] = entry
+        return stats
@@ -0,0 +1,205 @@
+"""
+LLM Metering Module
+Records token usage and latency of every LLM call in an in-memory ring
+buffer and aggregates per-model throughput and latency percentiles.
+Part of the Intelligence Layer client (ModelArts).
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99 of the values in seconds (None when there are no samples)."""
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    points = np.percentile(values, PERCENTILES)
+    return {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, points)}
+
+
+def summarize(records: List[Dict[str, Any]], span_seconds: float = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate call records per model.
+    
+    Args:
+        records: Call records as stored by LLMMeter.record
+        span_seconds: Length of the period the records cover (for tokens/s);
+            defaults to the time between the first and last record
+    
+    Returns:
+        Dictionary of model -> call counts, token totals, throughput and latency percentiles
+    """
+    by_model: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        by_model.setdefault(record["model"], []).append(record)
+    
+    summary = {}
+    for model, calls in by_model.items():
+        ok = [c for c in calls if c["success"]]
+        prompt_tokens = sum(c["prompt_tokens"] for c in ok)
+        completion_tokens = sum(c["completion_tokens"] for c in ok)
+        cached_tokens = sum(c["cached_prompt_tokens"] for c in ok)
+        wall = sum(c["wall_time"] for c in ok)
+        
+        span = span_seconds
+        if span is None:
+            started = min(c["timestamp"] - c["wall_time"] for c in calls)
+            span = max(c["timestamp"] for c in calls) - started
+        
+        summary[model] = {
+            "calls": len(calls),
+            "errors": len(calls) - len(ok),
+            "fallback_calls": sum(1 for c in calls if c["fallback"]),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_prompt_tokens": cached_tokens,
+            "cache_hit_ratio": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0,
+            # Overall token rate over the period vs. generation speed of a single call
+            "tokens_per_s": round((prompt_tokens + completion_tokens) / span, 2) if span > 0 else None,
+            "completion_tokens_per_s": round(completion_tokens / wall, 2) if wall > 0 else None,
+            "latency": _percentiles([c["wall_time"] for c in ok]),
+            "ttfb": _percentiles([c["ttfb"] for c in ok if c["ttfb"] is not None])
+        }
+    return summary
+
+
+class LLMMeter:
+    """
+    Ring buffer of per-call usage records with periodic per-model aggregation.
+    
+    The most recent ``capacity`` calls are kept verbatim; every
+    ``aggregation_interval`` seconds the calls of the elapsed interval are
+    summarized into a history of per-interval snapshots.
+    """
+    
+    def __init__(self, capacity: int = 10000, aggregation_interval: float = 60.0, history_size: int = 60):
+        """
+        Initialize meter.
+        
+        Args:
+            capacity: Maximum call records kept in the ring buffer
+            aggregation_interval: Seconds per aggregated history snapshot
+            history_size: Number of snapshots kept
+        """
+        self.aggregation_interval = aggregation_interval
+        self._records = deque(maxlen=capacity)
+        self._interval_records: List[Dict[str, Any]] = []
+        self._interval_started = time.time()
+        self._history = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+    
+    def record(
+        self,
+        model: str,
+        wall_time: float,
+        usage: Optional[Dict[str, int]] = None,
+        ttfb: Optional[float] = None,
+        fallback: bool = False,
+        success: bool = True,
+        response_id: Optional[str] = None,
+        stream: bool = False
+    ):
+        """
+        Record one LLM call.
+        
+        Args:
+            model: Model that served the call
+            wall_time: Seconds from request start to the complete response
+            usage: Token usage as returned by ModelArtsClient.extract_usage
+            ttfb: Seconds to the first response byte/token, if known
+            fallback: Whether the call was a fallback/hedge for the primary model
+            success: Whether the call returned a response
+            response_id: Provider response id
+            stream: Whether the call was streamed
+        """
+        usage = usage or {}
+        now = time.time()
+        entry = {
+            "timestamp": now,
+            "model": model,
+            "wall_time": wall_time,
+            "ttfb": ttfb,
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "cached_prompt_tokens": usage.get("cached_prompt_tokens", 0),
+            "fallback": fallback,
+            "success": success,
+            "response_id": response_id,
+            "stream": stream
+        }
+        with self._lock:
+            self._roll_interval(now)
+            self._records.append(entry)
+            self._interval_records.append(entry)
+    
+    def _roll_interval(self, now: float):
+        """Close the current aggregation interval if it has elapsed (lock held)."""
+        if now - self._interval_started < self.aggregation_interval:
+            return
+        if self._interval_records:
+            span = min(now, self._interval_started + self.aggregation_interval) - self._interval_started
+            snapshot = {
+                "start": self._interval_started,
+                "end": self._interval_started + span,
+                "models": summarize(self._interval_records, span)
+            }
+            self._history.append(snapshot)
+            for model, stats in snapshot["models"].items():
+                logger.info(
+                    f"LLM metering [{model}]: {stats['calls']} calls, {stats['tokens_per_s']} tokens/s, "
+                    f"p95 latency {stats['latency']['p95']}s, cache hit {stats['cache_hit_ratio']:.0%}"
+                )
+        self._interval_records = []
+        # Skip empty intervals so the next one starts at a multiple of the interval
+        elapsed = int((now - self._interval_started) // self.aggregation_interval)
+        self._interval_started += elapsed * self.aggregation_interval
+    
+    def stats(self, window_seconds: float = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-model aggregate over the ring buffer.
+        
+        Args:
+            window_seconds: Only include calls from the last N seconds (default: whole buffer)
+        
+        Returns:
+            Dictionary of model -> summary (see summarize)
+        """
+        now = time.time()
+        with self._lock:
+            self._roll_interval(now)
+            records = list(self._records)
+        if window_seconds is not None:
+            records = [r for r in records if now - r["timestamp"] <= window_seconds]
+        return summarize(records, window_seconds)
+    
+    def history(self) -> List[Dict[str, Any]]:
+        """Return the aggregated per-interval snapshots, oldest first."""
+        with self._lock:
+            self._roll_interval(time.time())
+            return list(self._history)
+    
+    def recent(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Return the most recent raw call records, newest last."""
+        with self._lock:
+            return list(self._records)[-limit:]
+
+
+_shared_meter: Optional[LLMMeter] = None
+_shared_lock = threading.Lock()
+
+
+def get_meter(capacity: int = 10000, aggregation_interval: float = 60.0) -> LLMMeter:
+    """Return the process-wide meter shared by every LLM client, creating it on first call."""
+    global _shared_meter
+    with _shared_lock:
+        if _shared_meter is None:
+            _shared_meter = LLMMeter(capacity, aggregation_interval)
+        return _shared_meter
@@ -0,0 +1,346 @@
+"""
+Mock LLM Server
+Local stand-in for the ModelArts MaaS / DeepSeek ``/v1/chat/completions``
+endpoint (OpenAI-compatible, including SSE streaming and ``usage``) for load,
+latency and fallback testing without the real service.
+
+Point the app at it with:
+    MODELARTS_ENDPOINT=http://localhost:8090 DEEPSEEK_API_KEY=mock
+
+Per-model behaviour (latency distribution, token rate, error and 429
+injection) is configured with MOCK_LLM_PROFILES, see DEFAULT_PROFILES.
+"""
+from flask import Flask, Response, jsonify, request
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, List
+
+from config import MOCK_LLM_PORT, MOCK_LLM_PROFILES, MOCK_LLM_SEED
+from prompt_builder import count_tokens
+from rate_limiter import TokenBucket
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Behaviour of one model. Durations and counts are either a number (fixed) or
+# a distribution: {"distribution": "uniform", "low": .., "high": ..},
+# {"distribution": "normal", "mean": .., "std": ..},
+# {"distribution": "lognormal", "median": .., "sigma": ..} or
+# {"distribution": "exponential", "mean": ..}
+#   ttfb:              Seconds before the first token (the whole prefill/queueing delay)
+#   tokens_per_s:      Generation rate after the first token
+#   completion_tokens: Length of an answer (capped by the request's max_tokens)
+#   error_rate:        Fraction of requests answered with error_status
+#   rate_limit_rate:   Fraction of requests answered with 429 regardless of load
+#   max_rps:           Sustained requests/second before 429s (0 = unlimited)
+#   retry_after:       Retry-After seconds sent with 429s
+#   prefix_cache:      Report a repeated system prompt as cached prompt tokens
+DEFAULT_PROFILE = {
+    "ttfb": {"distribution": "lognormal", "median": 0.8, "sigma": 0.4},
+    "tokens_per_s": 40,
+    "completion_tokens": {"distribution": "uniform", "low": 150, "high": 400},
+    "error_rate": 0.0,
+    "error_status": 503,
+    "rate_limit_rate": 0.0,
+    "max_rps": 0,
+    "retry_after": 1,
+    "prefix_cache": True
+}
+
+DEFAULT_PROFILES = {
+    "deepseek-v3.1": {"ttfb": {"distribution": "lognormal", "median": 1.2, "sigma": 0.5}, "tokens_per_s": 30},
+    "deepseek-chat": {"ttfb": {"distribution": "lognormal", "median": 1.2, "sigma": 0.5}, "tokens_per_s": 30},
+    "qwen3-32b": {"ttfb": {"distribution": "lognormal", "median": 0.6, "sigma": 0.4}, "tokens_per_s": 60}
+}
+
+# Vocabulary the generated answers are drawn from
+_WORDS = (
+    "the patient presents with symptoms that may indicate a viral infection fever headache "
+    "fatigue rest hydration monitor temperature consult physician if symptoms persist "
+    "examination blood pressure history medication dosage recommended follow up evaluation"
+).split()
+
+# System prompts seen recently (for simulated prefix cache hits)
+PREFIX_CACHE_SIZE = 1024
+
+
+def load_profiles(raw: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Build per-model profiles from MOCK_LLM_PROFILES.
+    
+    Args:
+        raw: JSON object of model name -> profile overrides, or a path to a JSON
+            file with the same content; the key "*" applies to every model
+    
+    Returns:
+        Dictionary of model name -> overrides (DEFAULT_PROFILES if raw is empty)
+    """
+    if not raw:
+        return DEFAULT_PROFILES
+    try:
+        if os.path.exists(raw):
+            with open(raw, "r", encoding="utf-8") as f:
+                profiles = json.load(f)
+        else:
+            profiles = json.loads(raw)
+        if not isinstance(profiles, dict):
+            raise ValueError("expected an object of model name -> profile")
+        return profiles
+    except (OSError, ValueError) as e:
+        logger.warning(f"Invalid MOCK_LLM_PROFILES ({e}), using default profiles")
+        return DEFAULT_PROFILES
+
+
+def sample(spec: Any, rng: random.Random) -> float:
+    """Draw a non-negative value from a fixed number or distribution spec (see DEFAULT_PROFILE)."""
+    if not isinstance(spec, dict):
+        return max(0.0, float(spec))
+    distribution = spec.get("distribution", "fixed")
+    if distribution == "uniform":
+        value = rng.uniform(spec["low"], spec["high"])
+    elif distribution == "normal":
+        value = rng.gauss(spec["mean"], spec.get("std", 0.0))
+    elif distribution == "lognormal":
+        value = spec["median"] * rng.lognormvariate(0.0, spec.get("sigma", 0.5))
+    elif distribution == "exponential":
+        value = rng.expovariate(1.0 / spec["mean"]) if spec["mean"] > 0 else 0.0
+    else:
+        value = spec.get("value", 0.0)
+    return max(0.0, float(value))
+
+
+class MockLLM:
+    """Generates chat completions with per-model latency, throughput and failures."""
+    
+    def __init__(self, profiles: Dict[str, Dict[str, Any]], seed: int = None):
+        """
+        Initialize mock backend.
+        
+        Args:
+            profiles: Model name -> profile overrides ("*" for every model)
+            seed: Random seed for reproducible runs (None for random)
+        """
+        self.profiles = profiles
+        self.rng = random.Random(seed)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._prefixes = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+    
+    def profile(self, model: str) -> Dict[str, Any]:
+        """Effective profile of a model: defaults, then "*" overrides, then the model's own."""
+        return {**DEFAULT_PROFILE, **self.profiles.get("*", {}), **self.profiles.get(model, {})}
+    
+    def admit(self, model: str, profile: Dict[str, Any]):
+        """
+        Decide whether a request is rejected.
+        
+        Returns:
+            Tuple of (status, headers) for an injected failure, or None to serve it
+        """
+        if profile["max_rps"] > 0:
+            with self._lock:
+                bucket = self._buckets.get(model)
+                if bucket is None:
+                    bucket = TokenBucket(profile["max_rps"], max(1, int(profile["max_rps"])))
+                    self._buckets[model] = bucket
+            if not bucket.acquire(timeout=0):
+                return 429, {"Retry-After": str(profile["retry_after"])}
+        if self.rng.random() < profile["rate_limit_rate"]:
+            return 429, {"Retry-After": str(profile["retry_after"])}
+        if self.rng.random() < profile["error_rate"]:
+            return int(profile["error_status"]), {}
+        return None
+    
+    def usage(self, messages: List[Dict[str, Any]], completion_tokens: int, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Usage block in the DeepSeek/OpenAI format, with simulated prefix cache hits."""
+        prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in messages)
+        cached = 0
+        system = "".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        if profile["prefix_cache"] and system:
+            digest = hashlib.sha256(system.encode("utf-8")).hexdigest()
+            with self._lock:
+                if digest in self._prefixes:
+                    self._prefixes.move_to_end(digest)
+                    cached = count_tokens(system)
+                else:
+                    self._prefixes[digest] = True
+                    if len(self._prefixes) > PREFIX_CACHE_SIZE:
+                        self._prefixes.popitem(last=False)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_cache_hit_tokens": cached,
+            "prompt_cache_miss_tokens": prompt_tokens - cached,
+            "prompt_tokens_details": {"cached_tokens": cached}
+        }
+    
+    def plan(self, body: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Sample latency and answer length for one request."""
+        requested = int(sample(profile["completion_tokens"], self.rng)) or 1
+        max_tokens = body.get("max_tokens") or requested
+        tokens = min(requested, max_tokens)
+        return {
+            "ttfb": sample(profile["ttfb"], self.rng),
+            "interval": 1.0 / profile["tokens_per_s"] if profile["tokens_per_s"] > 0 else 0.0,
+            "words": [self.rng.choice(_WORDS) for _ in range(tokens)],
+            "finish_reason": "length" if tokens < requested else "stop"
+        }
+    
+    def count(self, model: str, key: str, amount: int = 1):
+        with self._lock:
+            stats = self._stats.setdefault(model, {})
+            stats[key] = stats.get(key, 0) + amount
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-model request, status and token counters."""
+        with self._lock:
+            return {model: dict(stats) for model, stats in self._stats.items()}
+    
+    def reset(self):
+        """Clear counters, rate-limit buckets and the simulated prefix cache."""
+        with self._lock:
+            self._stats.clear()
+            self._buckets.clear()
+            self._prefixes.clear()
+
+
+app = Flask(__name__)
+mock = MockLLM(load_profiles(MOCK_LLM_PROFILES), MOCK_LLM_SEED)
+
+
+def _error(status: int, message: str, headers: Dict[str, str] = None):
+    body = {"error": {"message": message, "type": "mock_error", "code": status}}
+    return jsonify(body), status, headers or {}
+
+
+def _chunk(completion_id: str, model: str, created: int, delta: Dict[str, Any], finish_reason=None) -> str:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+def _stream(completion_id: str, model: str, plan: Dict[str, Any], usage: Dict[str, Any], include_usage: bool) -> Iterator[str]:
+    created = int(time.time())
+    time.sleep(plan["ttfb"])
+    yield _chunk(completion_id, model, created, {"role": "assistant", "content": ""})
+    for index, word in enumerate(plan["words"]):
+        if index:
+            time.sleep(plan["interval"])
+        yield _chunk(completion_id, model, created, {"content": word if index == 0 else " " + word})
+    yield _chunk(completion_id, model, created, {}, plan["finish_reason"])
+    if include_usage:
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [],
+            "usage": usage
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    """OpenAI-compatible chat completion (JSON or SSE when "stream" is true)."""
+    if not request.headers.get("Authorization", "").startswith("Bearer "):
+        return _error(401, "Missing bearer token")
+    body = request.get_json(silent=True) or {}
+    model = body.get("model")
+    messages = body.get("messages")
+    if not model or not isinstance(messages, list) or not messages:
+        return _error(400, "Request must include a model and a non-empty messages list")
+    
+    profile = mock.profile(model)
+    mock.count(model, "requests")
+    rejected = mock.admit(model, profile)
+    if rejected is not None:
+        status, headers = rejected
+        mock.count(model, f"status_{status}")
+        return _error(status, "Rate limit exceeded" if status == 429 else "Injected upstream error", headers)
+    
+    plan = mock.plan(body, profile)
+    usage = mock.usage(messages, len(plan["words"]), profile)
+    completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:24]}"
+    mock.count(model, "status_200")
+    mock.count(model, "prompt_tokens", usage["prompt_tokens"])
+    mock.count(model, "completion_tokens", usage["completion_tokens"])
+    
+    if body.get("stream"):
+        mock.count(model, "streamed")
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return Response(
+            _stream(completion_id, model, plan, usage, include_usage),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache"}
+        )
+    
+    time.sleep(plan["ttfb"] + plan["interval"] * max(0, len(plan["words"]) - 1))
+    return jsonify({
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": " ".join(plan["words"])},
+            "finish_reason": plan["finish_reason"]
+        }],
+        "usage": usage
+    }), 200
+
+
+@app.route('/v1/chat/completions', methods=['HEAD'])
+def chat_completions_head():
+    """Connection warm-up probe used by ModelArtsClient."""
+    return "", 200
+
+
+@app.route('/v1/models')
+def list_models():
+    """Models with an explicit profile."""
+    return jsonify({
+        "object": "list",
+        "data": [{"id": model, "object": "model", "owned_by": "mock"} for model in mock.profiles if model != "*"]
+    }), 200
+
+
+@app.route('/mock/stats')
+def stats():
+    """Per-model request/status/token counters and effective profiles."""
+    return jsonify({
+        "stats": mock.stats(),
+        "profiles": {model: mock.profile(model) for model in mock.profiles if model != "*"}
+    }), 200
+
+
+@app.route('/mock/reset', methods=['POST'])
+def reset():
+    """Reset counters, rate-limit state and the simulated prefix cache."""
+    mock.reset()
+    return jsonify({"status": "reset"}), 200
+
+
+if __name__ == '__main__':
+    port = MOCK_LLM_PORT
+    logger.info(f"Starting mock LLM server on port {port} (models: {', '.join(mock.profiles)})")
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
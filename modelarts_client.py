@@ -32,18 +32,47 @@ Working Postman Response Format:
 }
 """
 import logging
+import threading
+import time
 import requests
 import json
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional, Dict, Any, Iterator, List
+from requests.adapters import HTTPAdapter
 from config import (
     MODELARTS_ENDPOINT, DEEPSEEK_API_KEY, DEEPSEEK_API_BASE, 
     DEEPSEEK_MODEL_NAME, DEEPSEEK_USE_DIRECT_API,
     MODELARTS_MODEL_NAME, LLM_TEMPERATURE, LLM_MAX_TOKENS,
-    QWEN_ENABLED, QWEN_MODEL_NAME, QWEN_USE_AS_FALLBACK
+    QWEN_ENABLED, QWEN_MODEL_NAME, QWEN_USE_AS_FALLBACK,
+    LLM_POOL_SIZE, LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_WARMUP_ON_START,
+    LLM_HEDGING_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_INITIAL_DELAY,
+    LLM_HEDGE_MIN_DELAY, LLM_HEDGE_MAX_DELAY,
+    LLM_CB_ENABLED, LLM_CB_FAILURE_RATE, LLM_CB_SLOW_CALL_SECONDS, LLM_CB_SLOW_CALL_RATE,
+    LLM_CB_WINDOW_SECONDS, LLM_CB_MIN_CALLS, LLM_CB_OPEN_SECONDS,
+    LLM_CACHE_ENABLED, LLM_CACHE_DIR, LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_DISK_MAX_MB,
+    BATCH_MAX_CONCURRENCY, BATCH_MAX_RETRIES, BATCH_RETRY_BACKOFF,
+    LLM_RATE_LIMIT_ENABLED, LLM_RATE_LIMIT_RPS, QWEN_RATE_LIMIT_RPS, LLM_RATE_LIMIT_BURST,
+    LLM_RETRY_MAX_ATTEMPTS, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY, LLM_REQUEST_DEADLINE,
+    LLM_METERING_ENABLED, LLM_METERING_CAPACITY, LLM_METERING_INTERVAL
 )
+from hedging import HedgingPolicy, HedgeAttempt
+from circuit_breaker import CircuitBreaker, CircuitState
+from llm_cache import ResponseCache
+from batch_runner import BatchRunner
+from rate_limiter import get_rate_limiter, parse_retry_after, backoff_delay
+from metering import get_meter
 
 logger = logging.getLogger(__name__)
 
+# Status codes worth retrying: throttling, overload and gateway errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMDeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when waiting for a rate-limit slot or a retry would pass the request deadline."""
+
 
 class ModelArtsClient:
     """
@@ -97,13 +126,153 @@ class ModelArtsClient:
                 logger.info("   → Configured as fallback when primary model fails")
         elif self.qwen_use_as_fallback and self.enabled:
             logger.info(f"✅ Qwen3-32B available as fallback: {self.qwen_model_name}")
+        
+        # Pooled keep-alive HTTP transport shared by all sessions using this client
+        self.timeout = (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+        self.session = self._create_session()
+        if self.enabled and LLM_WARMUP_ON_START:
+            threading.Thread(target=self.warm_up, name="llm-warmup", daemon=True).start()
+        
+        # Per-model circuit breakers for health-scored routing
+        self.circuit_breakers = {
+            model: CircuitBreaker(
+                model,
+                failure_rate_threshold=LLM_CB_FAILURE_RATE,
+                slow_call_seconds=LLM_CB_SLOW_CALL_SECONDS,
+                slow_call_rate_threshold=LLM_CB_SLOW_CALL_RATE,
+                window_seconds=LLM_CB_WINDOW_SECONDS,
+                min_calls=LLM_CB_MIN_CALLS,
+                open_seconds=LLM_CB_OPEN_SECONDS
+            )
+            for model in (self.model_name, self.qwen_model_name)
+        }
+        
+        # Process-wide token buckets (one per model) shared by every client instance
+        self.rate_limiter = None
+        if LLM_RATE_LIMIT_ENABLED:
+            self.rate_limiter = get_rate_limiter(
+                LLM_RATE_LIMIT_RPS,
+                LLM_RATE_LIMIT_BURST,
+                rates={self.qwen_model_name: QWEN_RATE_LIMIT_RPS}
+            )
+        
+        # Process-wide usage/latency meter
+        self.meter = get_meter(LLM_METERING_CAPACITY, LLM_METERING_INTERVAL) if LLM_METERING_ENABLED else None
+        
+        # Exact-match response cache (memory LRU + disk tier)
+        self.response_cache = None
+        if LLM_CACHE_ENABLED:
+            self.response_cache = ResponseCache(
+                LLM_CACHE_DIR,
+                ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                memory_max_entries=LLM_CACHE_MEMORY_ENTRIES,
+                disk_max_bytes=LLM_CACHE_DISK_MAX_MB * 1024 * 1024
+            )
+        # Model that produced the last successful answer on this thread (fallback/hedge aware)
+        self._answered = threading.local()
+        
+        # Hedged requests: duplicate slow primary calls to the fallback model
+        self.hedging_enabled = LLM_HEDGING_ENABLED and self.qwen_use_as_fallback
+        self.hedging_policy = HedgingPolicy(
+            percentile=LLM_HEDGE_PERCENTILE,
+            initial_delay=LLM_HEDGE_INITIAL_DELAY,
+            min_delay=LLM_HEDGE_MIN_DELAY,
+            max_delay=LLM_HEDGE_MAX_DELAY
+        )
+        self._hedge_executor = None
+        self._hedge_session = None
+        if self.hedging_enabled:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=LLM_POOL_SIZE * 2,
+                thread_name_prefix="llm-hedge"
+            )
+            # Separate pool so losing attempts never hold connections needed by regular calls
+            self._hedge_session = self._create_session(pool_size=LLM_POOL_SIZE * 2)
+            logger.info(f"✅ Request hedging enabled (p{LLM_HEDGE_PERCENTILE:g} TTFB delay)")
+    
+    def _create_session(self, pool_size: int = LLM_POOL_SIZE) -> requests.Session:
+        """
+        Create a keep-alive HTTP session for LLM calls.
+        
+        urllib3's connection pool is thread-safe; cookies are disabled so the
+        session carries no per-user state and can be shared by concurrent
+        Streamlit sessions through the cached RAGService.
+        
+        Args:
+            pool_size: Maximum number of pooled connections
+        """
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=pool_size,
+            pool_block=True,  # Wait for a free connection instead of opening throwaway ones
+            max_retries=0
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Content-Type": "application/json",
+            self.auth_header: f"{self.auth_prefix}{self.api_key}"
+        })
+        return session
+    
+    def warm_up(self) -> bool:
+        """
+        Open a pooled connection to the endpoint so the TCP+TLS handshake is
+        paid at startup instead of on the first question.
+        
+        Returns:
+            True if the endpoint was reachable
+        """
+        try:
+            self.session.head(self.endpoint, timeout=self.timeout)
+            logger.info("✅ LLM connection pool warmed up")
+            return True
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"LLM connection warm-up failed: {e}")
+            return False
+    
+    def _build_payload(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        system_prompt: str = None,
+        stream: bool = False
+    ) -> Dict[str, Any]:
+        """Build an OpenAI-compatible chat completion payload."""
+        # Prepare messages (OpenAI-compatible format)
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        payload = {
+            "model": model,
+            "messages": messages
+        }
+        
+        # Add optional parameters only if not default values (Postman might not send these)
+        if temperature is not None and temperature != 0.2:
+            payload["temperature"] = temperature
+        if max_tokens is not None and max_tokens != 2048:
+            payload["max_tokens"] = max_tokens
+        if stream:
+            payload["stream"] = True
+            # Ask for a final usage chunk so cached-prefix tokens are reported for streams too
+            payload["stream_options"] = {"include_usage": True}
+        
+        return payload
     
     def invoke_deepseek(
         self, 
         prompt: str, 
         temperature: float = None, 
         max_tokens: int = None,
-        system_prompt: str = None
+        system_prompt: str = None,
+        timeout: float = None
     ) -> Optional[Dict[str, Any]]:
         """
         Invoke primary model (DeepSeek v3.1) via API.
@@ -124,6 +293,7 @@ class ModelArtsClient:
             temperature: Sampling temperature (default: from config)
             max_tokens: Maximum tokens to generate (default: from config)
             system_prompt: Optional system prompt
+            timeout: Seconds allowed including retries and fallback (default: LLM_REQUEST_DEADLINE)
             
         Returns:
             API response dictionary or None if error
@@ -135,55 +305,53 @@ class ModelArtsClient:
         # Use config defaults if not provided
         temp = temperature if temperature is not None else LLM_TEMPERATURE
         max_toks = max_tokens if max_tokens is not None else LLM_MAX_TOKENS
+        deadline = self._deadline(timeout)
         
-        # Use the configured endpoint (already includes /v1/chat/completions)
-        url = self.endpoint
+        return self._cached_call(self.model_name, prompt, temp, max_toks, system_prompt, self._invoke_primary, deadline)
+    
+    def _invoke_primary(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        system_prompt: str = None,
+        deadline: float = None
+    ) -> Optional[Dict[str, Any]]:
+        """Invoke the primary model with circuit-aware routing, hedging and Qwen fallback."""
+        temp = temperature
+        max_toks = max_tokens
+        # One deadline (time.monotonic) covers retries and the fallback call
+        deadline = deadline or time.monotonic() + LLM_REQUEST_DEADLINE
         
-        # Prepare messages (OpenAI-compatible format)
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        # Route around an open circuit instead of paying for a failing call
+        if not self._allow(self.model_name):
+            if self.qwen_use_as_fallback:
+                logger.warning(f"Circuit open for {self.model_name}, routing to {self.qwen_model_name}")
+                return self._invoke_qwen(prompt, temp, max_toks, system_prompt, deadline, fallback=True)
+            logger.error(f"Circuit open for {self.model_name}, no fallback configured")
+            return None
         
-        # Prepare payload - matching Postman working format
-        payload = {
-            "model": self.model_name,
-            "messages": messages
-        }
+        if self.hedging_enabled:
+            return self._invoke_hedged(prompt, temp, max_toks, system_prompt, deadline)
         
-        # Add optional parameters only if specified (Postman might not send these)
-        if temp is not None and temp != 0.2:  # Only add if not default
-            payload["temperature"] = temp
-        if max_toks is not None and max_toks != 2048:  # Only add if not default
-            payload["max_tokens"] = max_toks
+        # Use the configured endpoint (already includes /v1/chat/completions)
+        url = self.endpoint
         
-        # Prepare headers - using Authorization: Bearer format (matching Postman)
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        # Prepare payload - matching Postman working format
+        payload = self._build_payload(self.model_name, prompt, temp, max_toks, system_prompt)
         
         try:
             logger.info(f"Calling API: {url}")
             logger.info(f"Model: {self.model_name}")
             logger.debug(f"Payload: {json.dumps(payload, ensure_ascii=False)[:500]}")
             
-            response = requests.post(
-                url, 
-                headers=headers, 
-                json=payload, 
-                timeout=120  # Increased timeout for longer responses
-            )
-            response.raise_for_status()
-            
-            result = response.json()
+            result = self._post_chat(self.model_name, payload, deadline)
             
             # Log response info (matching Postman response structure)
             if "id" in result:
                 logger.info(f"✅ API Response ID: {result.get('id')}")
             if "usage" in result:
-                usage = result["usage"]
-                logger.info(f"✅ Tokens - Prompt: {usage.get('prompt_tokens')}, Completion: {usage.get('completion_tokens')}, Total: {usage.get('total_tokens')}")
+                self._log_usage(result)
             
             logger.info(f"✅ {self.model_name} API call successful")
             return result
@@ -197,22 +365,380 @@ class ModelArtsClient:
             # Try Qwen3-32B fallback if enabled (same endpoint, different model)
             if self.qwen_enabled and self.qwen_use_as_fallback:
                 logger.info("Attempting Qwen3-32B fallback...")
-                return self._invoke_qwen(prompt, temp, max_toks, system_prompt)
+                return self._invoke_qwen(prompt, temp, max_toks, system_prompt, deadline, fallback=True)
             return None
         except Exception as e:
             logger.error(f"DeepSeek API error: {e}")
             # Try Qwen3-32B fallback if enabled
             if self.qwen_use_as_fallback:
                 logger.info("Attempting Qwen3-32B fallback...")
-                return self._invoke_qwen(prompt, temp, max_toks, system_prompt)
+                return self._invoke_qwen(prompt, temp, max_toks, system_prompt, deadline, fallback=True)
             return None
     
+    def _post_chat(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        deadline: float = None,
+        fallback: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Send one chat completion request over the pooled session.
+        
+        Headers (Authorization: Bearer, matching Postman) live on the session.
+        The outcome and latency are recorded in the model's circuit breaker
+        and in the usage meter.
+        
+        Raises:
+            requests.exceptions.RequestException: On transport or HTTP errors
+        """
+        deadline = deadline or time.monotonic() + LLM_REQUEST_DEADLINE
+        call_started = time.perf_counter()
+        try:
+            response, started = self._send(model, payload, deadline)
+            try:
+                result = response.json()
+            except Exception as e:
+                self._record_outcome(model, started, e)
+                raise
+        except Exception:
+            self._meter(model, call_started, fallback=fallback, success=False)
+            raise
+        self._record_outcome(model, started)
+        self._answered.model = model
+        # requests' elapsed stops when the response headers are parsed
+        self._meter(model, call_started, result, ttfb=response.elapsed.total_seconds(), fallback=fallback)
+        return result
+    
+    def _meter(
+        self,
+        model: str,
+        call_started: float,
+        result: Optional[Dict[str, Any]] = None,
+        ttfb: float = None,
+        fallback: bool = False,
+        success: bool = True,
+        stream: bool = False
+    ):
+        """Record one call (wall time since call_started, token usage, response id) in the meter."""
+        if self.meter is None:
+            return
+        self.meter.record(
+            model,
+            time.perf_counter() - call_started,
+            usage=self.extract_usage(result),
+            ttfb=ttfb,
+            fallback=fallback,
+            success=success,
+            response_id=(result or {}).get("id"),
+            stream=stream
+        )
+    
+    def _send(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        deadline: float,
+        stream: bool = False,
+        headers: Dict[str, str] = None,
+        cancelled: threading.Event = None,
+        session: requests.Session = None
+    ):
+        """
+        POST a payload, waiting for a rate-limit slot and retrying throttling,
+        overload and transport errors with exponential backoff and jitter.
+        
+        A 429 Retry-After pauses the model's bucket for every caller in the
+        process. No wait or retry is started that would pass the deadline.
+        The circuit breaker sees one outcome per call, not per attempt: the
+        final error is recorded here and the caller records the success once
+        the body has been consumed.
+        
+        Args:
+            model: Model name (selects rate-limit bucket and circuit breaker)
+            payload: Request body
+            deadline: Absolute time.monotonic() deadline
+            stream: Stream the response body
+            headers: Extra request headers
+            cancelled: Optional event that stops further attempts
+            session: Session to send on (default: the shared pooled session)
+            
+        Returns:
+            Tuple of (response with a 2xx status, perf_counter start of the successful attempt)
+        
+        Raises:
+            requests.exceptions.RequestException: On the last error, or LLMDeadlineExceeded
+        """
+        session = session or self.session
+        attempts = max(1, LLM_RETRY_MAX_ATTEMPTS)
+        started = None
+        try:
+            for attempt in range(attempts):
+                self._acquire_slot(model, deadline)
+                started = time.perf_counter()
+                try:
+                    response = session.post(
+                        self.endpoint,
+                        headers=headers,
+                        json=payload,
+                        timeout=self._timeout_for(deadline),
+                        stream=stream
+                    )
+                    response.raise_for_status()
+                    return response, started
+                except requests.exceptions.RequestException as e:
+                    if stream and e.response is not None:
+                        e.response.close()  # Release the pooled connection
+                    if attempt + 1 >= attempts or not self._is_retryable(e):
+                        raise
+                    delay = self._retry_delay(model, e, attempt)
+                    if time.monotonic() + delay >= deadline or self._circuit_open(model):
+                        raise
+                    logger.warning(f"{model} request failed ({e}), retrying in {delay:.2f}s (attempt {attempt + 2}/{attempts})")
+                    if cancelled is None:
+                        time.sleep(delay)
+                    elif cancelled.wait(delay):
+                        raise
+        except Exception as e:
+            if started is None or (cancelled is not None and cancelled.is_set()):
+                # Nothing was sent, or the caller gave up: release a half-open probe slot only
+                self._record_cancelled(model)
+            else:
+                self._record_outcome(model, started, e)
+            raise
+    
+    def _acquire_slot(self, model: str, deadline: float):
+        """Wait for the model's rate-limit token without passing the deadline."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded(f"Request deadline passed before calling {model}")
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(model, timeout=remaining):
+            raise LLMDeadlineExceeded(f"Rate-limit wait for {model} would exceed the request deadline")
+    
+    def _timeout_for(self, deadline: float):
+        """(connect, read) timeout clipped to the time left before the deadline."""
+        remaining = max(0.1, deadline - time.monotonic())
+        return (min(self.timeout[0], remaining), min(self.timeout[1], remaining))
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Throttling/overload statuses and connection errors/timeouts are retried."""
+        if isinstance(error, LLMDeadlineExceeded):
+            return False
+        response = getattr(error, "response", None)
+        if response is not None and response.status_code is not None:
+            return response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+    
+    def _retry_delay(self, model: str, error: Exception, attempt: int) -> float:
+        """Backoff before the next attempt; a 429 Retry-After also pauses the model's bucket."""
+        response = getattr(error, "response", None)
+        retry_after = None
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code == 429 and retry_after and self.rate_limiter is not None:
+                self.rate_limiter.pause(model, retry_after)
+        return backoff_delay(attempt, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY, retry_after)
+    
+    def _allow(self, model: str) -> bool:
+        """Check the model's circuit breaker (always allowed when breakers are disabled)."""
+        breaker = self.circuit_breakers.get(model)
+        return not LLM_CB_ENABLED or breaker is None or breaker.allow_request()
+    
+    def _record_outcome(self, model: str, started: float, error: Exception = None):
+        """Record a call outcome in the model's circuit breaker."""
+        breaker = self.circuit_breakers.get(model)
+        if not LLM_CB_ENABLED or breaker is None:
+            return
+        latency = time.perf_counter() - started
+        if error is None or not self._is_health_failure(error):
+            breaker.record_success(latency)
+        else:
+            breaker.record_failure(latency)
+    
+    def _record_cancelled(self, model: str):
+        """Release a half-open probe slot held by a call that was cancelled (e.g. a losing hedge)."""
+        breaker = self.circuit_breakers.get(model)
+        if LLM_CB_ENABLED and breaker is not None:
+            breaker.record_cancelled()
+    
+    @staticmethod
+    def _is_health_failure(error: Exception) -> bool:
+        """Only server-side problems (timeouts, connection errors, 429/5xx) count against a model."""
+        response = getattr(error, "response", None)
+        if response is not None and response.status_code is not None:
+            return response.status_code == 429 or response.status_code >= 500
+        return True
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return response cache hit/miss counters (empty when the cache is disabled)."""
+        return self.response_cache.stats() if self.response_cache is not None else {}
+    
+    def get_circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        """Return circuit breaker state, window statistics and recent transitions per model."""
+        return {model: breaker.snapshot() for model, breaker in self.circuit_breakers.items()}
+    
+    def get_metering_stats(self, window_seconds: float = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Return per-model call counts, token throughput and p50/p95/p99 latencies.
+        
+        Args:
+            window_seconds: Only include calls from the last N seconds (default: all buffered calls)
+        """
+        return self.meter.stats(window_seconds) if self.meter is not None else {}
+    
+    def get_rate_limit_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-model token bucket state (empty when rate limiting is disabled)."""
+        return self.rate_limiter.stats() if self.rate_limiter is not None else {}
+    
+    def _invoke_hedged(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        system_prompt: str = None,
+        deadline: float = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Invoke the primary model, hedging to Qwen3-32B when it is slow.
+        
+        Both attempts are streamed (``stream: true``) on a dedicated session
+        and reassembled into a chat completion. If the primary has not sent
+        its first SSE chunk within the policy's percentile-based delay, the
+        same prompt is sent to the fallback model. The first successful answer
+        wins and the other attempt is cancelled, which closes its stream and
+        returns its connection. A primary failure before the delay falls back
+        immediately.
+        
+        Returns:
+            API response dictionary or None if both models failed
+        """
+        futures = {}
+        
+        def launch(model: str) -> HedgeAttempt:
+            attempt = HedgeAttempt(model)
+            payload = self._build_payload(model, prompt, temperature, max_tokens, system_prompt, stream=True)
+            futures[self._hedge_executor.submit(self._hedge_call, attempt, payload, deadline)] = attempt
+            return attempt
+        
+        logger.info(f"Calling API (hedged): {self.endpoint}")
+        primary = launch(self.model_name)
+        delay = self.hedging_policy.delay()
+        hedged = False
+        fallback_launched = False
+        if not primary.first_byte.wait(delay) and self._allow(self.qwen_model_name):
+            logger.warning(f"No first byte from {self.model_name} after {delay:.2f}s, hedging to {self.qwen_model_name}")
+            launch(self.qwen_model_name)
+            hedged = fallback_launched = True
+        
+        result = None
+        winner = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    candidate = future.result()
+                except Exception as e:
+                    logger.error(f"{futures[future].model} API request error: {e}")
+                    candidate = None
+                if candidate is not None and result is None:
+                    result = candidate
+                    winner = futures[future]
+            if result is not None:
+                break
+            if not fallback_launched and self._allow(self.qwen_model_name):
+                # Primary failed outright - regular fallback
+                logger.info("Attempting Qwen3-32B fallback...")
+                fallback = launch(self.qwen_model_name)
+                pending |= {f for f, a in futures.items() if a is fallback}
+                fallback_launched = True
+        
+        # Cancel the loser(s)
+        for attempt in futures.values():
+            if attempt is not winner:
+                attempt.cancel()
+        
+        if result is not None:
+            self._answered.model = winner.model
+            if "usage" in result:
+                self._log_usage(result)
+            logger.info(f"✅ {winner.model} API call successful" + (" (hedged)" if hedged else ""))
+        return result
+    
+    def _hedge_call(self, attempt: HedgeAttempt, payload: Dict[str, Any], deadline: float) -> Optional[Dict[str, Any]]:
+        """
+        Run one streamed hedge attempt and reassemble it into a chat completion.
+        
+        First byte is signalled on the first SSE chunk; the attempt stops as
+        soon as it is cancelled.
+        """
+        call_started = time.perf_counter()
+        fallback = attempt.model != self.model_name
+        try:
+            response, started = self._send(
+                attempt.model, payload, deadline, stream=True,
+                headers={"Accept": "text/event-stream"},
+                cancelled=attempt.cancelled, session=self._hedge_session
+            )
+        except Exception:
+            attempt.first_byte.set()
+            if not attempt.cancelled.is_set():
+                self._meter(attempt.model, call_started, fallback=fallback, success=False)
+            raise
+        
+        attempt.response = response
+        parts = []
+        result = {"model": attempt.model, "object": "chat.completion"}
+        finish_reason = None
+        try:
+            if attempt.cancelled.is_set():
+                response.close()  # cancel() may have run before the response was published
+            for chunk in self._iter_sse(response):
+                if attempt.ttfb is None:
+                    attempt.ttfb = time.perf_counter() - started
+                    attempt.first_byte.set()
+                    if attempt.model == self.model_name:
+                        self.hedging_policy.record(attempt.ttfb)
+                if attempt.cancelled.is_set():
+                    break
+                if chunk.get("id"):
+                    result.setdefault("id", chunk["id"])
+                if chunk.get("usage"):
+                    result["usage"] = chunk["usage"]
+                for choice in chunk.get("choices") or []:
+                    parts.append((choice.get("delta") or {}).get("content") or "")
+                    finish_reason = choice.get("finish_reason") or finish_reason
+            if attempt.cancelled.is_set():
+                self._record_cancelled(attempt.model)
+                return None
+            result["choices"] = [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(parts)},
+                "finish_reason": finish_reason or "stop"
+            }]
+            self._record_outcome(attempt.model, started)
+            self._meter(attempt.model, call_started, result, ttfb=attempt.ttfb, fallback=fallback)
+            return result
+        except Exception as e:
+            if attempt.cancelled.is_set():
+                self._record_cancelled(attempt.model)
+                return None
+            self._record_outcome(attempt.model, started, e)
+            self._meter(attempt.model, call_started, ttfb=attempt.ttfb, fallback=fallback, success=False)
+            raise
+        finally:
+            attempt.first_byte.set()
+            response.close()
+    
     def _invoke_qwen(
         self,
         prompt: str,
         temperature: float,
         max_tokens: int,
-        system_prompt: str = None
+        system_prompt: str = None,
+        deadline: float = None,
+        fallback: bool = False
     ) -> Optional[Dict[str, Any]]:
         """
         Invoke Qwen3-32B model via Huawei ModelArts.
@@ -234,6 +760,8 @@ class ModelArtsClient:
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
             system_prompt: Optional system prompt
+            deadline: Optional time.monotonic() deadline shared with the primary call
+            fallback: Whether Qwen3-32B is standing in for the primary model (metering)
             
         Returns:
             API response dictionary or None if error
@@ -242,54 +770,28 @@ class ModelArtsClient:
             logger.error("LLM API client not enabled")
             return None
         
+        if not self._allow(self.qwen_model_name):
+            logger.error(f"Circuit open for {self.qwen_model_name}, skipping call")
+            return None
+        
         # Use the SAME endpoint as primary model
         url = self.endpoint
         
-        # Prepare messages (OpenAI-compatible format)
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-        
         # Prepare payload - matching Postman format, only model name changes
-        payload = {
-            "model": self.qwen_model_name,
-            "messages": messages
-        }
-        
-        # Add optional parameters only if not default values
-        if temperature is not None and temperature != 0.2:
-            payload["temperature"] = temperature
-        if max_tokens is not None and max_tokens != 2048:
-            payload["max_tokens"] = max_tokens
-        
-        # Use Authorization: Bearer format (matching Postman)
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        payload = self._build_payload(self.qwen_model_name, prompt, temperature, max_tokens, system_prompt)
         
         try:
             logger.info(f"Calling Qwen3-32B API: {url}")
             logger.info(f"Model: {self.qwen_model_name}")
             logger.debug(f"Payload: {json.dumps(payload, ensure_ascii=False)[:500]}")
             
-            response = requests.post(
-                url,
-                headers=headers,
-                json=payload,
-                timeout=120  # Increased timeout
-            )
-            response.raise_for_status()
-            
-            result = response.json()
+            result = self._post_chat(self.qwen_model_name, payload, deadline, fallback)
             
             # Log response info (matching Postman response structure)
             if "id" in result:
                 logger.info(f"✅ API Response ID: {result.get('id')}")
             if "usage" in result:
-                usage = result["usage"]
-                logger.info(f"✅ Tokens - Prompt: {usage.get('prompt_tokens')}, Completion: {usage.get('completion_tokens')}, Total: {usage.get('total_tokens')}")
+                self._log_usage(result)
             
             logger.info("✅ Qwen3-32B API call successful")
             return result
@@ -309,7 +811,8 @@ class ModelArtsClient:
         prompt: str,
         temperature: float = None,
         max_tokens: int = None,
-        system_prompt: str = None
+        system_prompt: str = None,
+        timeout: float = None
     ) -> Optional[Dict[str, Any]]:
         """
         Explicitly invoke Qwen3-32B model (public method).
@@ -320,13 +823,252 @@ class ModelArtsClient:
             temperature: Sampling temperature (default: from config)
             max_tokens: Maximum tokens to generate (default: from config)
             system_prompt: Optional system prompt
+            timeout: Seconds allowed including retries (default: LLM_REQUEST_DEADLINE)
             
         Returns:
             API response dictionary or None if error
         """
         temp = temperature if temperature is not None else LLM_TEMPERATURE
         max_toks = max_tokens if max_tokens is not None else LLM_MAX_TOKENS
-        return self._invoke_qwen(prompt, temp, max_toks, system_prompt)
+        deadline = self._deadline(timeout)
+        return self._cached_call(self.qwen_model_name, prompt, temp, max_toks, system_prompt, self._invoke_qwen, deadline)
+    
+    def invoke_batch(
+        self,
+        prompts: List[str],
+        temperature: float = None,
+        max_tokens: int = None,
+        system_prompt: str = None,
+        use_qwen: bool = False,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        progress_path: str = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Invoke the model for many prompts concurrently (offline evaluation).
+        
+        Each prompt goes through the same path as invoke_deepseek/invoke_qwen
+        (cache, circuit breakers, fallback) on the shared connection pool.
+        
+        Args:
+            prompts: User prompts
+            temperature: Sampling temperature (default: from config)
+            max_tokens: Maximum tokens to generate (default: from config)
+            system_prompt: Optional system prompt shared by all prompts
+            use_qwen: Call Qwen3-32B instead of the primary model
+            max_concurrency: Requests in flight (default: BATCH_MAX_CONCURRENCY)
+            max_retries: Retries per prompt (default: BATCH_MAX_RETRIES)
+            progress_path: JSONL file for resumable progress (optional)
+            
+        Returns:
+            API responses in prompt order (None for prompts that failed every attempt)
+        """
+        invoke = self.invoke_qwen if use_qwen else self.invoke_deepseek
+        concurrency = max_concurrency or BATCH_MAX_CONCURRENCY
+        if concurrency > LLM_POOL_SIZE:
+            logger.warning(f"Batch concurrency {concurrency} exceeds LLM_POOL_SIZE={LLM_POOL_SIZE}; extra connections will not be reused")
+        
+        runner = BatchRunner(
+            max_concurrency=concurrency,
+            max_retries=max_retries if max_retries is not None else BATCH_MAX_RETRIES,
+            retry_backoff=BATCH_RETRY_BACKOFF,
+            progress_path=progress_path
+        )
+        return runner.run(
+            prompts,
+            lambda prompt: invoke(prompt, temperature, max_tokens, system_prompt)
+        )
+    
+    @staticmethod
+    def _deadline(timeout: Optional[float]) -> float:
+        """Absolute time.monotonic() deadline for a call given its timeout in seconds."""
+        return time.monotonic() + (timeout if timeout is not None else LLM_REQUEST_DEADLINE)
+    
+    def _cached_call(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        system_prompt: Optional[str],
+        call,
+        deadline: float = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Serve a completion from the response cache, or make the call and cache a successful result.
+        
+        The result is cached under the model that actually answered, so a
+        fallback or hedged Qwen answer is never served for the primary model.
+        
+        Args:
+            model: Requested model name (part of the cache key)
+            call: Function invoked as call(prompt, temperature, max_tokens, system_prompt, deadline) on a miss
+            deadline: time.monotonic() deadline for the call
+            
+        Returns:
+            API response dictionary (with ``"cached": True`` on a hit) or None if error
+        """
+        if self.response_cache is None:
+            return call(prompt, temperature, max_tokens, system_prompt, deadline)
+        
+        key = ResponseCache.make_key(model, prompt, system_prompt, temperature, max_tokens)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            logger.info(f"✅ LLM cache hit for {model}")
+            return {**cached, "cached": True}
+        
+        self._answered.model = None
+        result = call(prompt, temperature, max_tokens, system_prompt, deadline)
+        if result and self.extract_response_text(result):
+            answered = getattr(self._answered, "model", None) or model
+            if answered != model:
+                key = ResponseCache.make_key(answered, prompt, system_prompt, temperature, max_tokens)
+            self.response_cache.put(key, result)
+        return result
+    
+    def invoke_stream(
+        self,
+        prompt: str,
+        temperature: float = None,
+        max_tokens: int = None,
+        system_prompt: str = None,
+        use_qwen: bool = False,
+        timeout: float = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a completion token by token (Server-Sent Events, ``stream: true``).
+        
+        Falls back to Qwen3-32B when the primary model fails before producing
+        any output. Once tokens have been yielded the model is never switched.
+        
+        Args:
+            prompt: User prompt/question
+            temperature: Sampling temperature (default: from config)
+            max_tokens: Maximum tokens to generate (default: from config)
+            system_prompt: Optional system prompt
+            use_qwen: Stream from Qwen3-32B instead of the primary model
+            timeout: Seconds allowed until the stream starts, fallback included (default: LLM_REQUEST_DEADLINE)
+            
+        Yields:
+            ``{"model": ..., "content": ...}`` for each text delta, followed by a final
+            ``{"model": ..., "content": "", "usage": ..., "done": True}`` event
+        """
+        if not self.enabled:
+            logger.error("LLM API client not enabled")
+            return
+        
+        temp = temperature if temperature is not None else LLM_TEMPERATURE
+        max_toks = max_tokens if max_tokens is not None else LLM_MAX_TOKENS
+        
+        models = [self.qwen_model_name if use_qwen else self.model_name]
+        if not use_qwen and self.qwen_use_as_fallback:
+            models.append(self.qwen_model_name)
+        
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = ResponseCache.make_key(models[0], prompt, system_prompt, temp, max_toks)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"✅ LLM cache hit for {models[0]}")
+                yield {"model": cached.get("model", models[0]), "content": self.extract_response_text(cached), "cached": True}
+                yield {"model": cached.get("model", models[0]), "content": "", "usage": cached.get("usage"), "done": True, "cached": True}
+                return
+        
+        deadline = self._deadline(timeout)
+        for model in models:
+            if not self._allow(model):
+                logger.warning(f"Circuit open for {model}, skipping")
+                continue
+            started = False
+            parts = []
+            try:
+                for event in self._stream_chat(
+                    model, prompt, temp, max_toks, system_prompt, deadline, fallback=model != models[0]
+                ):
+                    started = True
+                    parts.append(event.get("content", ""))
+                    if event.get("done") and cache_key and "".join(parts):
+                        # Cache the assembled stream in chat.completion form, under the model that streamed it
+                        self.response_cache.put(ResponseCache.make_key(model, prompt, system_prompt, temp, max_toks), {
+                            "model": model,
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(parts)}, "finish_reason": "stop"}],
+                            "usage": event.get("usage")
+                        })
+                    yield event
+                return
+            except Exception as e:
+                logger.error(f"{model} streaming error: {e}")
+                if hasattr(e, 'response') and e.response is not None:
+                    logger.error(f"Response status: {e.response.status_code}")
+                if started:
+                    return
+                if model != models[-1]:
+                    logger.info("Attempting Qwen3-32B fallback...")
+    
+    def _stream_chat(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        system_prompt: str = None,
+        deadline: float = None,
+        fallback: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """Issue one streaming request and parse its SSE ``data:`` lines."""
+        payload = self._build_payload(model, prompt, temperature, max_tokens, system_prompt, stream=True)
+        logger.info(f"Calling streaming API: {self.endpoint}")
+        logger.info(f"Model: {model}")
+        
+        deadline = deadline or time.monotonic() + LLM_REQUEST_DEADLINE
+        call_started = time.perf_counter()
+        try:
+            response, started = self._send(
+                model, payload, deadline, stream=True, headers={"Accept": "text/event-stream"}
+            )
+        except Exception:
+            self._meter(model, call_started, fallback=fallback, success=False, stream=True)
+            raise
+        # Health is judged on time to first byte for streams
+        self._record_outcome(model, started)
+        
+        usage = None
+        response_id = None
+        ttfb = None
+        try:
+            for chunk in self._iter_sse(response):
+                response_id = response_id or chunk.get("id")
+                if chunk.get("usage"):
+                    usage = chunk["usage"]
+                for choice in chunk.get("choices") or []:
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        if ttfb is None:
+                            ttfb = time.perf_counter() - call_started
+                        yield {"model": model, "content": content}
+        except Exception:
+            self._meter(model, call_started, ttfb=ttfb, fallback=fallback, success=False, stream=True)
+            raise
+        finally:
+            response.close()
+        
+        self._meter(model, call_started, {"id": response_id, "usage": usage}, ttfb=ttfb, fallback=fallback, stream=True)
+        if usage:
+            self._log_usage({"usage": usage})
+        logger.info(f"✅ {model} streaming call completed")
+        yield {"model": model, "content": "", "usage": usage, "done": True}
+    
+    @staticmethod
+    def _iter_sse(response: requests.Response) -> Iterator[Dict[str, Any]]:
+        """Parse the SSE ``data:`` lines of a streaming response into chunk dictionaries."""
+        response.encoding = "utf-8"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            yield json.loads(data)
     
     def extract_response_text(self, api_response: Dict[str, Any]) -> str:
         """
@@ -401,13 +1143,60 @@ class ModelArtsClient:
             logger.debug(f"Raw response: {api_response}")
             return ""
     
+    @staticmethod
+    def extract_usage(api_response: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+        """
+        Extract token usage, including provider-side prompt cache hits.
+        
+        Cached prefix tokens are reported as ``usage.prompt_tokens_details.cached_tokens``
+        (OpenAI-compatible servers) or ``usage.prompt_cache_hit_tokens`` (DeepSeek API).
+        
+        Args:
+            api_response: API response dictionary
+            
+        Returns:
+            Dictionary with prompt, completion, total and cached prompt tokens, or None
+        """
+        usage = (api_response or {}).get("usage")
+        if not usage:
+            return None
+        
+        cached = usage.get("prompt_cache_hit_tokens")
+        if cached is None:
+            cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        return {
+            "prompt_tokens": usage.get("prompt_tokens") or 0,
+            "completion_tokens": usage.get("completion_tokens") or 0,
+            "total_tokens": usage.get("total_tokens") or 0,
+            "cached_prompt_tokens": cached or 0
+        }
+    
+    @classmethod
+    def _log_usage(cls, api_response: Dict[str, Any]):
+        """Log token usage with the share of the prompt served from the provider cache."""
+        usage = cls.extract_usage(api_response)
+        if not usage:
+            return
+        prompt_tokens = usage["prompt_tokens"]
+        cached = usage["cached_prompt_tokens"]
+        cache_share = f", {cached / prompt_tokens:.0%}" if prompt_tokens else ""
+        logger.info(f"✅ Tokens - Prompt: {prompt_tokens} (cached: {cached}{cache_share}), Completion: {usage['completion_tokens']}, Total: {usage['total_tokens']}")
+    
     def is_available(self) -> bool:
-        """Check if primary LLM API client is available and configured."""
-        return self.enabled
+        """Check if the primary model (or its fallback) is configured and not circuit-open."""
+        if not self.enabled:
+            return False
+        if self._circuit_open(self.model_name):
+            return self.qwen_use_as_fallback and not self._circuit_open(self.qwen_model_name)
+        return True
     
     def is_qwen_available(self) -> bool:
-        """Check if Qwen3-32B is available (uses same endpoint as primary)."""
-        return self.enabled  # Same endpoint, so if primary works, Qwen works too
+        """Check if Qwen3-32B is available (same endpoint as primary) and not circuit-open."""
+        return self.enabled and not self._circuit_open(self.qwen_model_name)
+    
+    def _circuit_open(self, model: str) -> bool:
+        breaker = self.circuit_breakers.get(model)
+        return LLM_CB_ENABLED and breaker is not None and breaker.state == CircuitState.OPEN
     
     def get_available_models(self) -> list:
         """Get list of available models."""
@@ -416,13 +1205,15 @@ class ModelArtsClient:
             models.append({
                 "name": self.model_name,
                 "type": "primary",
-                "provider": "DeepSeek API" if self.use_direct_api else "Huawei ModelArts"
+                "provider": "DeepSeek API" if self.use_direct_api else "Huawei ModelArts",
+                "circuit_state": self.circuit_breakers[self.model_name].state.value
             })
             # Qwen uses same endpoint, always available if primary is available
             models.append({
                 "name": self.qwen_model_name,
                 "type": "primary" if self.qwen_enabled else "fallback",
-                "provider": "Huawei ModelArts"
+                "provider": "Huawei ModelArts",
+                "circuit_state": self.circuit_breakers[self.qwen_model_name].state.value
             })
         return models
 
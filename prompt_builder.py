@@ -0,0 +1,143 @@
+"""
+Prompt Builder Module
+Token-budgeted assembly of GraphRAG context with local token counting.
+Part of the Application Server (ECS) layer.
+"""
+import logging
+import math
+import re
+from typing import List, Dict, Tuple, Any
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+    TIKTOKEN_AVAILABLE = True
+except Exception:
+    _ENCODING = None
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens locally.
+    
+    Uses tiktoken's cl100k_base encoding when installed; otherwise estimates
+    from words and punctuation (long words count as one token per 4 characters).
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Truncate text to at most max_tokens, cutting at a sentence or word boundary.
+    
+    Returns the text unchanged if it already fits; truncated text ends with "...".
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    
+    # Binary search the longest character prefix that fits (leaving room for "...")
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) + 1 <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    prefix = text[:low]
+    
+    sentence_end = max(prefix.rfind(". "), prefix.rfind("\n"))
+    if sentence_end >= len(prefix) // 2:
+        prefix = prefix[:sentence_end + 1]
+    elif " " in prefix:
+        prefix = prefix[:prefix.rfind(" ")]
+    return prefix.rstrip().rstrip(".") + "..."
+
+
+class PromptBuilder:
+    """Fills a token budget with GraphRAG Q&A pairs in relevance order."""
+    
+    def __init__(self, context_token_budget: int = 3000, max_answer_tokens: int = 400, max_nodes: int = 10):
+        """
+        Initialize prompt builder.
+        
+        Args:
+            context_token_budget: Maximum tokens for the whole context block
+            max_answer_tokens: Maximum tokens kept from a single answer
+            max_nodes: Maximum number of Q&A pairs included
+        """
+        self.context_token_budget = context_token_budget
+        self.max_answer_tokens = max_answer_tokens
+        self.max_nodes = max_nodes
+    
+    def build_context(self, nodes: List[Dict], edges: List[Dict]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the context string from GraphRAG nodes and edges within the budget.
+        
+        Args:
+            nodes: Q&A nodes (with "question", "response", "similarity")
+            edges: Graph edges (with "source", "target")
+        
+        Returns:
+            Tuple of (context string, stats with token estimate and counts)
+        """
+        stats = {"context_tokens": 0, "nodes_included": 0, "nodes_truncated": 0, "nodes_dropped": 0, "token_budget": self.context_token_budget}
+        if not nodes:
+            return "", stats
+        
+        header = "=== Relevant Medical Q&A Information ===\n"
+        parts = [header]
+        used = count_tokens(header)
+        
+        # Relevance order: highest similarity first, traversal order otherwise
+        ranked = sorted(nodes, key=lambda node: node.get("similarity", 0.0) or 0.0, reverse=True)
+        for node in ranked:
+            if stats["nodes_included"] >= self.max_nodes:
+                break
+            index = stats["nodes_included"] + 1
+            question = node.get("question", "")
+            response = node.get("response", "")
+            similarity = node.get("similarity", 0.0)
+            
+            lead = f"[{index}] Question: {question}\n    Answer: "
+            tail = f"\n    Relevance: {similarity:.3f}\n" if similarity > 0 else "\n"
+            overhead = count_tokens(lead) + count_tokens(tail)
+            remaining = self.context_token_budget - used - overhead
+            if remaining <= 0:
+                break
+            
+            answer = truncate_to_tokens(response, min(self.max_answer_tokens, remaining))
+            if not answer and response:
+                break
+            if answer != response:
+                stats["nodes_truncated"] += 1
+            
+            block = lead + answer + tail
+            parts.append(block)
+            used += count_tokens(block)
+            stats["nodes_included"] += 1
+        
+        stats["nodes_dropped"] = len(nodes) - stats["nodes_included"]
+        
+        # Add graph structure info if budget remains
+        if edges:
+            edge_lines = [f"\n=== Related Medical Concepts (Graph Connections: {len(edges)}) ==="]
+            edge_lines += [f"Related: {edge['source']} -> {edge['target']}" for edge in edges[:5]]
+            edge_block = "\n".join(edge_lines)
+            edge_tokens = count_tokens(edge_block)
+            if used + edge_tokens <= self.context_token_budget:
+                parts.append(edge_block)
+                used += edge_tokens
+        
+        stats["context_tokens"] = used
+        return "\n".join(parts), stats
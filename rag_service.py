@@ -3,20 +3,51 @@ Main RAG Service that orchestrates all components.
 This is the core service layer that coordinates Input Processing,
 Agentic Orchestrator, Context Integration, and LLM.
 """
+import asyncio
+import copy
 import logging
-from typing import Dict, List, Optional, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Iterator, Tuple, Iterable
 
 from config import (
     MILVUS_HOST, MILVUS_PORT, MILVUS_COLLECTION_NAME,
     EMBEDDING_MODEL_NAME, LLM_MODEL, LLM_TEMPERATURE,
     RETRIEVAL_TOP_K, GRAPH_RAG_ENABLED, AGENTIC_RAG_ENABLED,
     AGENT_MAX_ITERATIONS, AGENT_REASONING_ENABLED, GRAPH_MAX_DEPTH,
-    DEEPSEEK_MODEL_NAME, QWEN_ENABLED
+    GRAPH_MAX_NODES, GRAPH_SIMILARITY_THRESHOLD, GRAPH_TRAVERSAL_MODE, GRAPH_BEAM_WIDTH, GRAPH_LAZY_PAYLOADS,
+    DEEPSEEK_MODEL_NAME, QWEN_ENABLED, ASYNC_EXECUTOR_WORKERS,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL_SECONDS, KNOWLEDGE_BASE_VERSION,
+    PROMPT_CONTEXT_TOKEN_BUDGET, PROMPT_MAX_ANSWER_TOKENS, PROMPT_MAX_NODES,
+    BATCH_MAX_CONCURRENCY, BATCH_MAX_RETRIES, BATCH_RETRY_BACKOFF,
+    REQUEST_COALESCING_ENABLED, LLM_ROUTING_ENABLED, LLM_LATENCY_SLO_SECONDS, LLM_ROUTING_TABLE,
+    QUERY_DEADLINE_SECONDS, DEADLINE_LLM_RESERVE_SECONDS, DEADLINE_FULL_TRAVERSAL_SECONDS,
+    DEADLINE_MIN_TRAVERSAL_SECONDS, DEADLINE_SHORT_PROMPT_SECONDS, DEADLINE_SHORT_CONTEXT_TOKENS,
+    GRAPH_CACHE_ENABLED, GRAPH_CACHE_TTL_SECONDS, GRAPH_CACHE_MAX_MB,
+    GRAPH_SNAPSHOT_ENABLED, GRAPH_SNAPSHOT_DIR, GRAPH_SNAPSHOT_REFRESH_SECONDS,
+    RETRIEVAL_MODE, HYBRID_DENSE_WEIGHT, HYBRID_SPARSE_WEIGHT, HYBRID_RRF_K, HYBRID_CANDIDATES,
+    HYBRID_SPARSE_FIELD, HYBRID_GRAPH_MAX_DEPTH, VECTOR_STORE_BACKEND, NUMPY_STORE_DIR,
+    LOCAL_REPLICA_ENABLED, LOCAL_REPLICA_DIR, LOCAL_REPLICA_SYNC_SECONDS,
+    REPLICA_HNSW_M, REPLICA_HNSW_EF_CONSTRUCTION, REPLICA_HNSW_EF_SEARCH,
+    INGEST_EMBED_BATCH_SIZE, INGEST_INSERT_BATCH_ROWS, INGEST_INSERT_BATCH_MB, INGEST_FLUSH_INTERVAL_SECONDS
 )
 from input_processing import InputProcessor
 from agentic_orchestrator import AgenticOrchestrator
 from context_integration import ContextIntegrator
+from graph_cache import GraphCache
+from graph_snapshot import AdjacencySnapshot
+from sparse_index import BM25Index
+from vector_store import VectorStore, MilvusVectorStore, NumpyVectorStore
+from replica_store import ReplicaVectorStore
 from modelarts_client import ModelArtsClient
+from async_modelarts_client import AsyncModelArtsClient
+from semantic_cache import SemanticCache
+from prompt_builder import PromptBuilder, count_tokens, truncate_to_tokens
+from batch_runner import BatchRunner
+from singleflight import SingleFlight
+from llm_cache import normalize_prompt
+from llm_router import LLMRouter, load_routing_table
 
 # LLM imports
 try:
@@ -56,7 +87,33 @@ class RAGService:
             milvus_api_key=MILVUS_API_KEY,
             milvus_user=MILVUS_USER,
             milvus_password=MILVUS_PASSWORD,
-            use_cloud=MILVUS_USE_CLOUD
+            use_cloud=MILVUS_USE_CLOUD,
+            prompt_builder=PromptBuilder(
+                context_token_budget=PROMPT_CONTEXT_TOKEN_BUDGET,
+                max_answer_tokens=PROMPT_MAX_ANSWER_TOKENS,
+                max_nodes=PROMPT_MAX_NODES
+            ),
+            graph_cache=GraphCache(
+                ttl_seconds=GRAPH_CACHE_TTL_SECONDS,
+                max_bytes=GRAPH_CACHE_MAX_MB * 1024 * 1024,
+                version=KNOWLEDGE_BASE_VERSION
+            ) if GRAPH_CACHE_ENABLED else None,
+            graph_snapshot=AdjacencySnapshot(
+                GRAPH_SNAPSHOT_DIR,
+                version=KNOWLEDGE_BASE_VERSION
+            ) if GRAPH_SNAPSHOT_ENABLED else None,
+            snapshot_refresh_seconds=GRAPH_SNAPSHOT_REFRESH_SECONDS,
+            sparse_index=BM25Index() if RETRIEVAL_MODE == "hybrid" else None,
+            sparse_field=HYBRID_SPARSE_FIELD if RETRIEVAL_MODE == "hybrid" else None,
+            hybrid_weights=(HYBRID_DENSE_WEIGHT, HYBRID_SPARSE_WEIGHT),
+            rrf_k=HYBRID_RRF_K,
+            vector_store=self._create_vector_store()
+        )
+        # Smaller context budget used when the query deadline is close
+        self.short_prompt_builder = PromptBuilder(
+            context_token_budget=DEADLINE_SHORT_CONTEXT_TOKENS,
+            max_answer_tokens=PROMPT_MAX_ANSWER_TOKENS,
+            max_nodes=PROMPT_MAX_NODES
         )
         self.agentic_orchestrator = AgenticOrchestrator(
             max_iterations=AGENT_MAX_ITERATIONS,
@@ -72,14 +129,40 @@ class RAGService:
         
         # Initialize LLM - DeepSeek/Qwen via ModelArts
         self.modelarts_client = ModelArtsClient()
+        self.async_modelarts_client = AsyncModelArtsClient(self.modelarts_client)
+        
+        # Bounded pool for blocking work (embedding, Milvus) on the async path
+        self._executor = ThreadPoolExecutor(
+            max_workers=ASYNC_EXECUTOR_WORKERS,
+            thread_name_prefix="rag-io"
+        )
+        
+        # Semantic answer cache (paraphrased repeats skip retrieval and the LLM)
+        self.semantic_cache = None
+        if SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticCache(
+                similarity_threshold=SEMANTIC_CACHE_THRESHOLD,
+                max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+                ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS
+            )
         
-        # Initialize prompt template
+        # Identical concurrent queries share one pipeline execution
+        self.singleflight = SingleFlight() if REQUEST_COALESCING_ENABLED else None
+        
+        # Model, max_tokens and timeout chosen per task type and prompt length
+        self.router = None
+        if LLM_ROUTING_ENABLED:
+            self.router = LLMRouter(load_routing_table(LLM_ROUTING_TABLE), LLM_LATENCY_SLO_SECONDS)
+        
+        # Initialize prompt: static instructions go in the system message so every
+        # request shares the same prefix (provider-side prefix/KV cache), the
+        # per-query context and question go in the trailing user message
+        self.system_prompt = self._create_system_prompt()
         self.prompt_template = self._create_prompt_template()
     
-    def _create_prompt_template(self) -> str:
-        """Create the prompt template for medical responses."""
-        return """
-You are an experienced medical assistant supporting a doctor in evaluating a patient's symptoms. Based on the provided context and the doctor's question, respond clearly and professionally. Do not copy the context directly—paraphrase and interpret it to generate a medically sound, structured answer.
+    def _create_system_prompt(self) -> str:
+        """Create the static system prompt for medical responses."""
+        return """You are an experienced medical assistant supporting a doctor in evaluating a patient's symptoms. Based on the provided context and the doctor's question, respond clearly and professionally. Do not copy the context directly—paraphrase and interpret it to generate a medically sound, structured answer.
 
 Your response **must** be divided into three clear paragraphs:
 1. **Diagnosis**: State the most likely medical diagnosis using precise terminology.
@@ -96,216 +179,837 @@ Your response **must** be divided into three clear paragraphs:
 - If there is no relevant medical context (e.g., retrieved documents list is empty or similarity scores are below threshold), reply:
   > "I'm sorry, I couldn't find enough relevant medical information to answer your question. Could you please provide more details about the patient's history and symptoms?"
 
-Context:
+Respond only with the three paragraphs described. Do not add any extra sections or disclaimers."""
+    
+    def _create_prompt_template(self) -> str:
+        """Create the per-query user message template (context and question only)."""
+        return """Context:
 {context}
 
 Doctor's Question:
-{question}
-
-Respond only with the three paragraphs described. Do not add any extra sections or disclaimers.
-"""
+{question}"""
     
-    def process_query(self, user_query: str) -> Dict[str, Any]:
+    def process_query(self, user_query: str, timeout: float = None) -> Dict[str, Any]:
         """
         Process a user query through the complete RAG pipeline.
         
+        Concurrent calls with the same normalized query share one execution.
+        The timeout is a budget for the whole pipeline: Milvus and the LLM call
+        get the time that is left, and the pipeline degrades (shallower or no
+        graph traversal, shorter prompt) when it runs low. Applied degradations
+        are listed in ``metadata["deadline"]``.
+        
         Args:
             user_query: User's medical query
-            
+            timeout: Total seconds for the query (default: QUERY_DEADLINE_SECONDS, None for no deadline)
+        
         Returns:
             Dictionary containing response and metadata
         """
+        deadline = self._query_deadline(timeout)
+        if self.singleflight is None:
+            return self._process_query(user_query, deadline)
+        result, shared = self.singleflight.do(
+            self._coalesce_key(user_query), lambda: self._process_query(user_query, deadline)
+        )
+        return self._coalesced(result) if shared else result
+    
+    def _process_query(self, user_query: str, deadline: float = None) -> Dict[str, Any]:
+        """Run the complete RAG pipeline for one query (see process_query)."""
         try:
-            # Step 1: Input Processing
-            logger.info("Step 1: Input Processing")
-            processed_input = self.input_processor.preprocess(user_query)
+            retrieval = self._retrieve_context(user_query, deadline)
+            if retrieval.get("error_result"):
+                return retrieval["error_result"]
+            if retrieval.get("cached_result"):
+                return retrieval["cached_result"]
             
-            # Step 2: Generate query embedding
-            logger.info("Step 2: Generating query embedding")
-            if not self.embedding_model:
-                return {
-                    "response": "[Error] Embedding model not available.",
-                    "sources": [],
-                    "context": "",
-                    "metadata": processed_input
-                }
-            
-            query_embedding = self.embedding_model.embed_query(processed_input["processed_text"])
+            # Step 6: Generate Response
+            logger.info("Step 6: Generating Response")
+            self._shorten_for_deadline(retrieval)
+            route = self._select_route(retrieval)
+            response_text, llm_used, usage = self._generate_response(
+                user_query, retrieval["integrated_context"], route, self._llm_timeout(retrieval, route)
+            )
             
-            # Step 3: Agentic Orchestration (if enabled)
-            execution_result = None
-            vector_results = []
-            graph_results = None
+            # If still no response, return error
+            if not response_text:
+                return self._no_llm_result(retrieval)
             
-            if AGENTIC_RAG_ENABLED:
-                logger.info("Step 3: Agentic Orchestration")
-                plan = self.agentic_orchestrator.plan_task(
-                    user_query,
-                    processed_input
-                )
-                
-                # Execute with reasoning
-                execution_result = self.agentic_orchestrator.execute_with_reasoning(
-                    plan,
-                    self.context_integrator,
-                    None  # LLM handled by ModelArts client
-                )
-                
-                # Use orchestrated context
-                integrated_context = execution_result.get("final_context", "")
-            else:
-                # Step 3: GraphRAG Retrieval (PRIMARY METHOD)
-                logger.info("Step 3: GraphRAG Retrieval")
-                graph_results = self.context_integrator.retrieve_graphrag_context(
-                    query_embedding,
-                    top_k=RETRIEVAL_TOP_K,
-                    max_depth=GRAPH_MAX_DEPTH if GRAPH_RAG_ENABLED else 1
-                )
-                
-                # Step 4: Context Integration
-                logger.info("Step 4: Context Integration")
-                integrated_context = self.context_integrator.integrate_contexts(
-                    graph_results=graph_results
-                )
-                
-                # Store for sources extraction
-                vector_results = graph_results.get("qa_pairs", []) if graph_results else []
+            result = self._build_result(retrieval, response_text, llm_used, usage)
+            self._store_semantic(retrieval, result)
+            return result
+        
+        except Exception as e:
+            return self._error_result(e)
+    
+    def process_query_stream(self, user_query: str, timeout: float = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process a user query and stream the LLM answer as it is generated.
+        
+        Retrieval runs exactly as in ``process_query``; the LLM call then uses
+        ``stream=True`` so tokens reach the caller as soon as they are produced.
+        Concurrent streams for the same normalized query share one execution;
+        a caller joining late replays the tokens produced so far.
+        
+        Args:
+            user_query: User's medical query
+            timeout: Total seconds until the answer starts streaming (default: QUERY_DEADLINE_SECONDS, None for no deadline)
+        
+        Yields:
+            ``{"type": "token", "content": ...}`` for each text delta, then a single
+            ``{"type": "result", "result": ...}`` event carrying the same dictionary
+            ``process_query`` would have returned
+        """
+        deadline = self._query_deadline(timeout)
+        if self.singleflight is None:
+            yield from self._process_query_stream(user_query, deadline)
+            return
+        events = self.singleflight.stream(
+            self._coalesce_key(user_query), lambda: self._process_query_stream(user_query, deadline)
+        )
+        for event, shared in events:
+            if shared and event.get("type") == "result":
+                event = {"type": "result", "result": self._coalesced(event["result"])}
+            yield event
+    
+    def _process_query_stream(self, user_query: str, deadline: float = None) -> Iterator[Dict[str, Any]]:
+        """Run the RAG pipeline for one query, streaming the answer (see process_query_stream)."""
+        started = time.perf_counter()
+        try:
+            retrieval = self._retrieve_context(user_query, deadline)
+            if retrieval.get("error_result"):
+                yield {"type": "result", "result": retrieval["error_result"]}
+                return
+            if retrieval.get("cached_result"):
+                result = retrieval["cached_result"]
+                yield {"type": "token", "content": result["response"]}
+                yield {"type": "result", "result": result}
+                return
             
-            # Step 6: Generate Response
-            logger.info("Step 6: Generating Response")
+            # Step 6: Generate Response (streaming)
+            logger.info("Step 6: Generating Response (streaming)")
+            self._shorten_for_deadline(retrieval)
+            full_prompt = self._build_prompt(user_query, retrieval["integrated_context"])
+            route = self._select_route(retrieval)
+            models = self._model_order(route)
+            if not models:
+                yield {"type": "result", "result": self._no_llm_result(retrieval)}
+                return
             
-            # Try DeepSeek/Qwen API via ModelArts or direct API
-            response_text = None
+            parts = []
             llm_used = "unknown"
+            usage = None
+            time_to_first_token = None
+            llm_timeout = self._llm_timeout(retrieval, route)
+            llm_started = time.perf_counter()
+            # Same model order and labels as _generate_response; the next model is
+            # only tried when the previous one failed before its first token
+            for model in models:
+                if model == "qwen":
+                    logger.info(f"Using Qwen3-32B (streaming)")
+                    llm_name = "qwen3-32b"
+                else:
+                    logger.info(f"Using DeepSeek API (streaming): {LLM_MODEL}")
+                    llm_name = LLM_MODEL.lower()
+                for event in self.modelarts_client.invoke_stream(
+                    full_prompt,
+                    max_tokens=route.get("max_tokens") if route else None,
+                    system_prompt=self.system_prompt,
+                    use_qwen=model == "qwen",
+                    timeout=llm_timeout
+                ):
+                    if event.get("done"):
+                        usage = self.modelarts_client.extract_usage(event)
+                    content = event.get("content")
+                    if not content:
+                        continue
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - started
+                        llm_used = llm_name
+                    parts.append(content)
+                    yield {"type": "token", "content": content}
+                if parts:
+                    break
             
-            # Check available models
-            available_models = self.modelarts_client.get_available_models()
-            logger.info(f"Available LLM models: {[m['name'] for m in available_models]}")
+            response_text = "".join(parts)
+            self._record_route(route, time.perf_counter() - llm_started, bool(response_text))
+            if not response_text:
+                yield {"type": "result", "result": self._no_llm_result(retrieval)}
+                return
             
-            # Check if Qwen should be used as primary (when QWEN_ENABLED=true)
-            if QWEN_ENABLED and self.modelarts_client.is_qwen_available():
-                logger.info(f"Using Qwen3-32B as primary model")
-                full_prompt = self.prompt_template.format(
-                    context=integrated_context,
-                    question=user_query
-                )
-                api_response = self.modelarts_client.invoke_qwen(full_prompt)
-                if api_response:
-                    response_text = self.modelarts_client.extract_response_text(api_response)
-                    llm_used = "qwen3-32b"
+            result = self._build_result(retrieval, response_text, llm_used, usage)
+            result["metadata"]["time_to_first_token"] = time_to_first_token
+            result["metadata"]["total_time"] = time.perf_counter() - started
+            self._store_semantic(retrieval, result)
+            yield {"type": "result", "result": result}
+        
+        except Exception as e:
+            yield {"type": "result", "result": self._error_result(e)}
+    
+    async def process_query_async(self, user_query: str, timeout: float = None) -> Dict[str, Any]:
+        """
+        Process a user query through the RAG pipeline without blocking the event loop.
+        
+        Embedding and Milvus retrieval are blocking library calls and run in a
+        bounded thread pool; the LLM call is made with the async HTTP client, so
+        a single worker can keep many consultations in flight.
+        
+        Args:
+            user_query: User's medical query
+            timeout: Total seconds for the query (default: QUERY_DEADLINE_SECONDS, None for no deadline)
+        
+        Returns:
+            Dictionary containing response and metadata (same shape as process_query)
+        """
+        deadline = self._query_deadline(timeout)
+        if self.singleflight is None:
+            return await self._process_query_async(user_query, deadline)
+        result, shared = await self.singleflight.do_async(
+            self._coalesce_key(user_query), lambda: self._process_query_async(user_query, deadline)
+        )
+        return self._coalesced(result) if shared else result
+    
+    async def _process_query_async(self, user_query: str, deadline: float = None) -> Dict[str, Any]:
+        """Run the RAG pipeline for one query on the event loop (see process_query_async)."""
+        try:
+            loop = asyncio.get_running_loop()
+            retrieval = await loop.run_in_executor(self._executor, self._retrieve_context, user_query, deadline)
+            if retrieval.get("error_result"):
+                return retrieval["error_result"]
+            if retrieval.get("cached_result"):
+                return retrieval["cached_result"]
             
-            # Check if DeepSeek should be used (supports multiple model names)
-            if not response_text:
-                deepseek_models = ["deepseek-chat", "deepseek-v3.1", "deepseek-v3"]
-                use_deepseek = self.modelarts_client.is_available() and (
-                    LLM_MODEL.lower() in deepseek_models or 
-                    LLM_MODEL.lower().startswith("deepseek")
-                )
-                
-                # Try DeepSeek API (direct or ModelArts) - includes Qwen fallback if configured
-                if use_deepseek:
-                    logger.info(f"Using DeepSeek API: {LLM_MODEL}")
-                    full_prompt = self.prompt_template.format(
-                        context=integrated_context,
-                        question=user_query
-                    )
-                    api_response = self.modelarts_client.invoke_deepseek(full_prompt)
-                    if api_response:
-                        response_text = self.modelarts_client.extract_response_text(api_response)
-                        llm_used = LLM_MODEL.lower()
+            # Step 6: Generate Response
+            logger.info("Step 6: Generating Response (async)")
+            self._shorten_for_deadline(retrieval)
+            route = self._select_route(retrieval)
+            response_text, llm_used, usage = await self._generate_response_async(
+                user_query, retrieval["integrated_context"], route, self._llm_timeout(retrieval, route)
+            )
             
-            # If still no response, return error
             if not response_text:
-                return {
-                    "response": "[Error] No LLM available. Please configure DEEPSEEK_API_KEY in .env file.",
+                return self._no_llm_result(retrieval)
+            
+            result = self._build_result(retrieval, response_text, llm_used, usage)
+            self._store_semantic(retrieval, result)
+            return result
+        
+        except Exception as e:
+            return self._error_result(e)
+    
+    def process_batch(
+        self,
+        queries: List[str],
+        max_concurrency: int = None,
+        max_retries: int = None,
+        progress_path: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run many queries through the RAG pipeline concurrently (offline evaluation).
+        
+        Each query is processed exactly like ``process_query``; failed queries
+        are retried, and with a progress file an interrupted replay resumes
+        where it stopped.
+        
+        Args:
+            queries: User queries
+            max_concurrency: Queries in flight (default: BATCH_MAX_CONCURRENCY)
+            max_retries: Retries per query (default: BATCH_MAX_RETRIES)
+            progress_path: JSONL file for resumable progress (optional)
+        
+        Returns:
+            Results in query order (same shape as process_query)
+        """
+        runner = BatchRunner(
+            max_concurrency=max_concurrency or BATCH_MAX_CONCURRENCY,
+            max_retries=max_retries if max_retries is not None else BATCH_MAX_RETRIES,
+            retry_backoff=BATCH_RETRY_BACKOFF,
+            progress_path=progress_path
+        )
+        results = runner.run(queries, self.process_query, is_success=self._is_success_result)
+        return [result if result is not None else self._error_result(RuntimeError("batch item failed")) for result in results]
+    
+    @staticmethod
+    def _coalesce_key(user_query: str) -> str:
+        """Key for request coalescing: whitespace-collapsed, case-folded query text."""
+        return normalize_prompt(user_query).casefold()
+    
+    @staticmethod
+    def _coalesced(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Private copy of a shared result, marked as served by another caller's execution."""
+        result = copy.deepcopy(result)
+        result.setdefault("metadata", {})["coalesced"] = True
+        return result
+    
+    def get_graph_cache_stats(self) -> Dict[str, Any]:
+        """Return hit ratios of the graph node cache used by retrieval."""
+        return self.context_integrator.get_graph_cache_stats()
+    
+    def get_graph_snapshot_stats(self) -> Dict[str, Any]:
+        """Return size and age of the in-memory adjacency snapshot."""
+        return self.context_integrator.get_graph_snapshot_stats()
+    
+    @staticmethod
+    def _create_vector_store() -> Optional[VectorStore]:
+        """Vector store for VECTOR_STORE_BACKEND / LOCAL_REPLICA_ENABLED (None: ContextIntegrator connects to Milvus)."""
+        if VECTOR_STORE_BACKEND == "numpy":
+            return NumpyVectorStore(NUMPY_STORE_DIR)
+        if not LOCAL_REPLICA_ENABLED:
+            return None
+        from config import MILVUS_API_KEY, MILVUS_USER, MILVUS_PASSWORD, MILVUS_USE_CLOUD
+        return ReplicaVectorStore(
+            MilvusVectorStore(
+                MILVUS_HOST,
+                MILVUS_PORT,
+                MILVUS_COLLECTION_NAME,
+                milvus_api_key=MILVUS_API_KEY,
+                milvus_user=MILVUS_USER,
+                milvus_password=MILVUS_PASSWORD,
+                use_cloud=MILVUS_USE_CLOUD
+            ),
+            LOCAL_REPLICA_DIR,
+            version=KNOWLEDGE_BASE_VERSION,
+            sync_interval_seconds=LOCAL_REPLICA_SYNC_SECONDS,
+            hnsw_m=REPLICA_HNSW_M,
+            hnsw_ef_construction=REPLICA_HNSW_EF_CONSTRUCTION,
+            hnsw_ef_search=REPLICA_HNSW_EF_SEARCH
+        )
+    
+    def store_documents(self, documents: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Bulk-ingest Q&A nodes, embedding question + response with the shared embedding model.
+        
+        Args:
+            documents: Dicts with question, response and optionally id, related_nodes,
+                metadata and a precomputed combined_embedding
+        
+        Cached answers are dropped once any row was inserted, since they were
+        built from the previous knowledge base.
+        
+        Returns:
+            Ingestion statistics (counts, timings, docs_per_second)
+        """
+        stats = self.context_integrator.store_documents(
+            documents,
+            embed_documents=self.embedding_model.embed_documents if self.embedding_model else None,
+            embed_batch_size=INGEST_EMBED_BATCH_SIZE,
+            insert_batch_rows=INGEST_INSERT_BATCH_ROWS,
+            insert_batch_bytes=int(INGEST_INSERT_BATCH_MB * 1024 * 1024),
+            flush_interval_seconds=INGEST_FLUSH_INTERVAL_SECONDS
+        )
+        if stats.get("inserted", 0) > 0 and self.semantic_cache is not None:
+            self.semantic_cache.invalidate()
+            logger.info("✅ Semantic answer cache cleared after ingestion")
+        return stats
+    
+    def get_vector_store_stats(self) -> Dict[str, Any]:
+        """Return the vector store backend and, for the local replica, its size, age and local/Milvus request counts."""
+        return self.context_integrator.get_vector_store_stats()
+    
+    def get_sparse_index_stats(self) -> Dict[str, Any]:
+        """Return the hybrid retrieval backend and local BM25 index size."""
+        return self.context_integrator.get_sparse_index_stats()
+    
+    def get_coalescing_stats(self) -> Dict[str, int]:
+        """Return request coalescing counters (empty when disabled)."""
+        return self.singleflight.stats() if self.singleflight is not None else {}
+    
+    @staticmethod
+    def _is_success_result(result: Optional[Dict[str, Any]]) -> bool:
+        """Check whether a pipeline result is an answer rather than an error."""
+        if not result:
+            return False
+        if (result.get("metadata") or {}).get("error"):
+            return False
+        return not str(result.get("response", "")).startswith("[Error]")
+    
+    def _retrieve_context(self, user_query: str, deadline: float = None) -> Dict[str, Any]:
+        """
+        Run input processing, embedding and retrieval (Steps 1-4).
+        
+        Args:
+            user_query: User's medical query
+            deadline: time.monotonic() deadline of the whole query (None for no limit)
+        
+        Returns:
+            Dictionary with the processed input, integrated context and raw
+            retrieval results, or an ``error_result`` to return as-is
+        """
+        # Step 1: Input Processing
+        logger.info("Step 1: Input Processing")
+        processed_input = self.input_processor.preprocess(user_query)
+        
+        # Step 2: Generate query embedding
+        logger.info("Step 2: Generating query embedding")
+        if not self.embedding_model:
+            return {
+                "error_result": {
+                    "response": "[Error] Embedding model not available.",
                     "sources": [],
-                    "context": integrated_context,
+                    "context": "",
                     "metadata": processed_input
                 }
+            }
+        
+        query_embedding = self.embedding_model.embed_query(processed_input["processed_text"])
+        deadline_info = {
+            "budget_seconds": round(deadline - time.monotonic(), 2) if deadline is not None else None,
+            "degradations": []
+        }
+        
+        # Step 2b: Semantic answer cache
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(query_embedding, KNOWLEDGE_BASE_VERSION)
+            if cached is not None:
+                cached_result, similarity = cached
+                logger.info(f"✅ Semantic cache hit (similarity {similarity:.3f}), skipping retrieval and LLM")
+                metadata = cached_result.setdefault("metadata", {})
+                metadata.pop("time_to_first_token", None)
+                metadata.pop("total_time", None)
+                metadata["semantic_cache"] = {
+                    "hit": True,
+                    "similarity": similarity
+                }
+                return {"cached_result": cached_result}
+        
+        # Step 3: Agentic Orchestration (if enabled)
+        execution_result = None
+        vector_results = []
+        graph_results = None
+        
+        task_type = None
+        
+        if AGENTIC_RAG_ENABLED:
+            logger.info("Step 3: Agentic Orchestration")
+            plan = self.agentic_orchestrator.plan_task(
+                user_query,
+                processed_input
+            )
+            task_type = plan["task_type"].value
             
-            # Prepare sources and GraphRAG metadata
-            sources = []
-            graphrag_metadata = {}
+            # Execute with reasoning
+            execution_result = self.agentic_orchestrator.execute_with_reasoning(
+                plan,
+                self.context_integrator,
+                None  # LLM handled by ModelArts client
+            )
             
-            if not AGENTIC_RAG_ENABLED:
-                # GraphRAG was used - extract detailed information
-                graphrag_metadata = {
-                    "method": "GraphRAG",
-                    "enabled": GRAPH_RAG_ENABLED,
-                    "max_depth": GRAPH_MAX_DEPTH if GRAPH_RAG_ENABLED else 1,
-                    "nodes_found": len(graph_results.get("nodes", [])),
-                    "edges_found": len(graph_results.get("edges", [])),
-                    "initial_matches": len(graph_results.get("nodes", [])) if graph_results else 0,
-                    "graph_traversal_depth": graph_results.get("depth", 0) if graph_results else 0,
-                    "retrieval_method": "Vector Search + Graph Traversal"
-                }
-                
-                # Use GraphRAG Q&A pairs as sources with similarity scores
-                sources = []
-                for idx, result in enumerate(vector_results[:5], 1):  # Top 5 Q&A pairs
-                    similarity = result.get('similarity', 0.0)
-                    question = result.get('question', '')
-                    answer_text = result.get('response', '')
-                    
-                    source_text = f"[{idx}] Similarity: {similarity:.3f}\n"
-                    source_text += f"Q: {question[:200]}...\n" if len(question) > 200 else f"Q: {question}\n"
-                    source_text += f"A: {answer_text[:300]}..." if len(answer_text) > 300 else f"A: {answer_text}"
-                    
-                    sources.append(source_text)
-            else:
-                # Agentic RAG was used
-                graphrag_metadata = {
-                    "method": "Agentic RAG",
-                    "enabled": AGENTIC_RAG_ENABLED,
-                    "iterations": execution_result.get("iterations", 0) if execution_result else 0
-                }
-                
-                # For agentic RAG, extract sources from execution trace if available
-                if execution_result:
-                    # Try to extract sources from iteration history
-                    iteration_history = execution_result.get("plan", {}).get("steps", [])
-                    if iteration_history:
-                        sources = [
-                            f"Step {step.get('step', '')}: {step.get('description', '')}"
-                            for step in iteration_history
-                        ]
-                    else:
-                        sources = ["Agentic reasoning completed"]
+            # Use orchestrated context
+            integrated_context = execution_result.get("final_context", "")
+        else:
+            # Step 3: GraphRAG Retrieval (PRIMARY METHOD)
+            logger.info("Step 3: GraphRAG Retrieval")
+            max_depth, retrieval_deadline = self._plan_retrieval(deadline, deadline_info)
+            graph_results = self.context_integrator.retrieve_graphrag_context(
+                query_embedding,
+                top_k=RETRIEVAL_TOP_K,
+                max_depth=max_depth,
+                traversal_mode=GRAPH_TRAVERSAL_MODE,
+                max_nodes=GRAPH_MAX_NODES,
+                similarity_threshold=GRAPH_SIMILARITY_THRESHOLD,
+                beam_width=GRAPH_BEAM_WIDTH,
+                deadline=retrieval_deadline,
+                lazy_payloads=GRAPH_LAZY_PAYLOADS,
+                query_text=processed_input["processed_text"],
+                retrieval_mode=RETRIEVAL_MODE,
+                hybrid_candidates=HYBRID_CANDIDATES
+            )
+            if graph_results.get("deadline_reached"):
+                deadline_info["degradations"].append("traversal_cut_short")
             
-            # Add GraphRAG metadata to processed_input metadata
-            enhanced_metadata = {
-                **processed_input,
-                "graphrag": graphrag_metadata,
-                "retrieval_stats": {
-                    "sources_count": len(sources),
-                    "context_length": len(integrated_context)
-                }
-            }
+            # Step 4: Context Integration
+            logger.info("Step 4: Context Integration")
+            integrated_context = self.context_integrator.integrate_contexts(
+                graph_results=graph_results
+            )
             
-            # Add LLM info to metadata
-            enhanced_metadata["llm_used"] = llm_used
+            # Store for sources extraction
+            vector_results = graph_results.get("qa_pairs", []) if graph_results else []
+        
+        return {
+            "user_query": user_query,
+            "processed_input": processed_input,
+            "query_embedding": query_embedding,
+            "integrated_context": integrated_context,
+            "execution_result": execution_result,
+            "graph_results": graph_results,
+            "vector_results": vector_results,
+            "task_type": task_type or self.agentic_orchestrator.determine_task_type(user_query, processed_input).value,
+            "deadline": deadline,
+            "deadline_info": deadline_info
+        }
+    
+    @staticmethod
+    def _query_deadline(timeout: Optional[float]) -> Optional[float]:
+        """Absolute time.monotonic() deadline of a query given its budget in seconds (None without a budget)."""
+        budget = timeout if timeout is not None else QUERY_DEADLINE_SECONDS
+        return time.monotonic() + budget if budget is not None else None
+    
+    def _plan_retrieval(self, deadline: Optional[float], deadline_info: Dict[str, Any]) -> Tuple[int, Optional[float]]:
+        """
+        Choose the traversal depth for the time left before the deadline.
+        
+        Retrieval must finish DEADLINE_LLM_RESERVE_SECONDS before the deadline.
+        A tight retrieval budget first cuts traversal to one level, then skips
+        it; the seed vector search always gets at least
+        DEADLINE_MIN_TRAVERSAL_SECONDS.
+        
+        Returns:
+            Tuple of (max traversal depth, time.monotonic() deadline for Milvus)
+        """
+        max_depth = GRAPH_MAX_DEPTH if GRAPH_RAG_ENABLED else 1
+        if RETRIEVAL_MODE == "hybrid" and self.context_integrator.hybrid_available():
+            # Keyword-matched seeds need less graph expansion
+            max_depth = min(max_depth, HYBRID_GRAPH_MAX_DEPTH)
+        if deadline is None:
+            return max_depth, None
+        
+        now = time.monotonic()
+        budget = deadline - DEADLINE_LLM_RESERVE_SECONDS - now
+        if budget < DEADLINE_MIN_TRAVERSAL_SECONDS and max_depth > 0:
+            deadline_info["degradations"].append("traversal_skipped")
+            max_depth = 0
+        elif budget < DEADLINE_FULL_TRAVERSAL_SECONDS and max_depth > 1:
+            deadline_info["degradations"].append(f"depth_reduced:{max_depth}->1")
+            max_depth = 1
+        if deadline_info["degradations"]:
+            logger.warning(f"Query deadline: {budget:.1f}s left for retrieval, {', '.join(deadline_info['degradations'])}")
+        return max_depth, now + max(budget, DEADLINE_MIN_TRAVERSAL_SECONDS)
+    
+    def _shorten_for_deadline(self, retrieval: Dict[str, Any]):
+        """Rebuild the context with DEADLINE_SHORT_CONTEXT_TOKENS when little time is left for the LLM."""
+        deadline = retrieval.get("deadline")
+        if deadline is None or deadline - time.monotonic() >= DEADLINE_SHORT_PROMPT_SECONDS:
+            return
+        
+        context = retrieval["integrated_context"]
+        graph_results = retrieval.get("graph_results") or {}
+        if graph_results.get("qa_pairs"):
+            # Only hydrated nodes carry Q&A text
+            short_context, context_stats = self.short_prompt_builder.build_context(
+                graph_results["qa_pairs"], graph_results.get("edges", [])
+            )
+        else:
+            short_context, context_stats = truncate_to_tokens(context, DEADLINE_SHORT_CONTEXT_TOKENS), None
+        if count_tokens(short_context) >= count_tokens(context):
+            return
+        
+        retrieval["integrated_context"] = short_context
+        if context_stats is not None:
+            graph_results["context_stats"] = context_stats
+        retrieval["deadline_info"]["degradations"].append("prompt_shortened")
+        logger.warning(f"Query deadline: {deadline - time.monotonic():.1f}s left for the LLM, prompt shortened")
+    
+    @staticmethod
+    def _llm_timeout(retrieval: Dict[str, Any], route: Optional[Dict[str, Any]]) -> Optional[float]:
+        """LLM timeout: the route's timeout clipped to the time left before the query deadline."""
+        route_timeout = route.get("timeout") if route else None
+        deadline = retrieval.get("deadline")
+        if deadline is None:
+            return route_timeout
+        # Leave the LLM at least a second even when the budget is already spent
+        remaining = max(1.0, deadline - time.monotonic())
+        timeout = remaining if route_timeout is None else min(route_timeout, remaining)
+        retrieval["deadline_info"]["llm_timeout"] = round(timeout, 2)
+        return timeout
+    
+    def _store_semantic(self, retrieval: Dict[str, Any], result: Dict[str, Any]):
+        """Remember a generated answer in the semantic cache."""
+        if self.semantic_cache is None:
+            return
+        graph_results = retrieval.get("graph_results") or {}
+        node_ids = [node.get("id") for node in graph_results.get("nodes", [])]
+        self.semantic_cache.store(retrieval["query_embedding"], result, node_ids, KNOWLEDGE_BASE_VERSION)
+    
+    def _build_prompt(self, user_query: str, integrated_context: str) -> str:
+        """Format the prompt template with the retrieved context and question."""
+        return self.prompt_template.format(
+            context=integrated_context,
+            question=user_query
+        )
+    
+    def _use_deepseek(self) -> bool:
+        """Check if DeepSeek should be used (supports multiple model names)."""
+        deepseek_models = ["deepseek-chat", "deepseek-v3.1", "deepseek-v3"]
+        return self.modelarts_client.is_available() and (
+            LLM_MODEL.lower() in deepseek_models or 
+            LLM_MODEL.lower().startswith("deepseek")
+        )
+    
+    def _select_route(self, retrieval: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Choose model, max_tokens and timeout for the answer (None when routing is disabled).
+        
+        Args:
+            retrieval: Output of _retrieve_context
+        
+        Returns:
+            Route dictionary from the LLM router, also stored as ``retrieval["llm_route"]``
+        """
+        if self.router is None:
+            return None
+        input_tokens = count_tokens(self.system_prompt) + count_tokens(
+            self._build_prompt(retrieval["user_query"], retrieval["integrated_context"])
+        )
+        route = self.router.select(retrieval["task_type"], input_tokens)
+        retrieval["llm_route"] = {
+            "route": route["route"],
+            "matched": route["matched"],
+            "degraded": route["degraded"],
+            "task_type": retrieval["task_type"],
+            "input_tokens": input_tokens,
+            "model": route.get("model"),
+            "max_tokens": route.get("max_tokens"),
+            "timeout": route.get("timeout")
+        }
+        logger.info(
+            f"LLM route: {route['route']} ({route.get('model')}, max_tokens={route.get('max_tokens')}, "
+            f"timeout={route.get('timeout')}s) for {retrieval['task_type']}, {input_tokens} input tokens"
+            + (f", degraded from {route['matched']}" if route["degraded"] else "")
+        )
+        return route
+    
+    def _model_order(self, route: Optional[Dict[str, Any]]) -> List[str]:
+        """
+        Models to try in order ("qwen" / "deepseek"), limited to those currently available.
+        
+        Qwen goes first when QWEN_ENABLED, with or without a "primary" route;
+        a "qwen" route also puts Qwen first otherwise. DeepSeek remains as the
+        fallback.
+        """
+        use_qwen = QWEN_ENABLED or (route is not None and route.get("model") == "qwen")
+        available = {
+            "qwen": use_qwen and self.modelarts_client.is_qwen_available(),
+            "deepseek": self._use_deepseek()
+        }
+        return [model for model in ("qwen", "deepseek") if available[model]]
+    
+    def _record_route(self, route: Optional[Dict[str, Any]], latency: float, success: bool):
+        if self.router is not None and route is not None:
+            self.router.record(route["route"], latency, success)
+    
+    def get_routing_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-route request counts and latency percentiles against the SLO."""
+        return self.router.stats() if self.router is not None else {}
+    
+    def _generate_response(
+        self,
+        user_query: str,
+        integrated_context: str,
+        route: Optional[Dict[str, Any]] = None,
+        timeout: float = None
+    ) -> Tuple[Optional[str], str, Optional[Dict[str, int]]]:
+        """
+        Generate the answer with DeepSeek/Qwen API via ModelArts or direct API.
+        
+        Args:
+            user_query: User's medical query
+            integrated_context: Retrieved context
+            route: Route from _select_route (model, max_tokens, timeout), None for defaults
+            timeout: Seconds allowed for the LLM call (default: the route's timeout)
+        
+        Returns:
+            Tuple of (response text or None, name of the LLM used, token usage or None)
+        """
+        response_text = None
+        llm_used = "unknown"
+        usage = None
+        max_tokens = route.get("max_tokens") if route else None
+        if timeout is None and route:
+            timeout = route.get("timeout")
+        
+        # Check available models
+        available_models = self.modelarts_client.get_available_models()
+        logger.info(f"Available LLM models: {[m['name'] for m in available_models]}")
+        
+        full_prompt = self._build_prompt(user_query, integrated_context)
+        started = time.perf_counter()
+        for model in self._model_order(route):
+            if model == "qwen":
+                logger.info(f"Using Qwen3-32B")
+                api_response = self.modelarts_client.invoke_qwen(
+                    full_prompt, max_tokens=max_tokens, system_prompt=self.system_prompt, timeout=timeout
+                )
+                llm_name = "qwen3-32b"
+            else:
+                # DeepSeek API (direct or ModelArts) - includes Qwen fallback if configured
+                logger.info(f"Using DeepSeek API: {LLM_MODEL}")
+                api_response = self.modelarts_client.invoke_deepseek(
+                    full_prompt, max_tokens=max_tokens, system_prompt=self.system_prompt, timeout=timeout
+                )
+                llm_name = LLM_MODEL.lower()
+            if api_response:
+                response_text = self.modelarts_client.extract_response_text(api_response)
+                usage = self.modelarts_client.extract_usage(api_response)
+                llm_used = llm_name
+            if response_text:
+                break
+        
+        self._record_route(route, time.perf_counter() - started, bool(response_text))
+        return response_text, llm_used, usage
+    
+    async def _generate_response_async(
+        self,
+        user_query: str,
+        integrated_context: str,
+        route: Optional[Dict[str, Any]] = None,
+        timeout: float = None
+    ) -> Tuple[Optional[str], str, Optional[Dict[str, int]]]:
+        """Async counterpart of _generate_response using the async LLM client."""
+        response_text = None
+        llm_used = "unknown"
+        usage = None
+        max_tokens = route.get("max_tokens") if route else None
+        if timeout is None and route:
+            timeout = route.get("timeout")
+        full_prompt = self._build_prompt(user_query, integrated_context)
+        
+        started = time.perf_counter()
+        for model in self._model_order(route):
+            if model == "qwen":
+                logger.info(f"Using Qwen3-32B")
+                api_response = await self.async_modelarts_client.invoke_qwen(
+                    full_prompt, max_tokens=max_tokens, system_prompt=self.system_prompt, timeout=timeout
+                )
+                llm_name = "qwen3-32b"
+            else:
+                logger.info(f"Using DeepSeek API: {LLM_MODEL}")
+                api_response = await self.async_modelarts_client.invoke_deepseek(
+                    full_prompt, max_tokens=max_tokens, system_prompt=self.system_prompt, timeout=timeout
+                )
+                llm_name = LLM_MODEL.lower()
+            if api_response:
+                response_text = self.modelarts_client.extract_response_text(api_response)
+                usage = self.modelarts_client.extract_usage(api_response)
+                llm_used = llm_name
+            if response_text:
+                break
+        
+        self._record_route(route, time.perf_counter() - started, bool(response_text))
+        return response_text, llm_used, usage
+    
+    def _no_llm_result(self, retrieval: Dict[str, Any]) -> Dict[str, Any]:
+        """Result returned when no LLM produced an answer."""
+        return {
+            "response": "[Error] No LLM available. Please configure DEEPSEEK_API_KEY in .env file.",
+            "sources": [],
+            "context": retrieval["integrated_context"],
+            "metadata": retrieval["processed_input"]
+        }
+    
+    def _build_result(
+        self,
+        retrieval: Dict[str, Any],
+        response_text: str,
+        llm_used: str,
+        usage: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """Prepare sources, GraphRAG metadata and token usage for a generated answer."""
+        processed_input = retrieval["processed_input"]
+        integrated_context = retrieval["integrated_context"]
+        execution_result = retrieval["execution_result"]
+        graph_results = retrieval["graph_results"]
+        vector_results = retrieval["vector_results"]
+        
+        sources = []
+        graphrag_metadata = {}
+        
+        if not AGENTIC_RAG_ENABLED:
+            # GraphRAG was used - extract detailed information
+            graphrag_metadata = {
+                "method": "GraphRAG",
+                "enabled": GRAPH_RAG_ENABLED,
+                "max_depth": GRAPH_MAX_DEPTH if GRAPH_RAG_ENABLED else 1,
+                "nodes_found": len(graph_results.get("nodes", [])),
+                "edges_found": len(graph_results.get("edges", [])),
+                "initial_matches": len(graph_results.get("nodes", [])) if graph_results else 0,
+                "graph_traversal_depth": graph_results.get("depth", 0) if graph_results else 0,
+                "traversal_mode": graph_results.get("traversal_mode", GRAPH_TRAVERSAL_MODE) if graph_results else GRAPH_TRAVERSAL_MODE,
+                "seed_retrieval": graph_results.get("retrieval_mode", "dense") if graph_results else "dense",
+                "retrieval_method": "Vector Search + Graph Traversal"
+            }
             
-            return {
-                "response": response_text,
-                "sources": sources,
-                "context": integrated_context[:1000] + "..." if len(integrated_context) > 1000 else integrated_context,
-                "metadata": enhanced_metadata,
-                "execution_trace": execution_result if AGENTIC_RAG_ENABLED else None,
-                "graphrag_info": graphrag_metadata  # Explicit GraphRAG info
+            # Use GraphRAG Q&A pairs as sources with similarity scores
+            sources = []
+            for idx, result in enumerate(vector_results[:5], 1):  # Top 5 Q&A pairs
+                similarity = result.get('similarity', 0.0)
+                question = result.get('question', '')
+                answer_text = result.get('response', '')
+                
+                source_text = f"[{idx}] Similarity: {similarity:.3f}\n"
+                source_text += f"Q: {question[:200]}...\n" if len(question) > 200 else f"Q: {question}\n"
+                source_text += f"A: {answer_text[:300]}..." if len(answer_text) > 300 else f"A: {answer_text}"
+                
+                sources.append(source_text)
+        else:
+            # Agentic RAG was used
+            graphrag_metadata = {
+                "method": "Agentic RAG",
+                "enabled": AGENTIC_RAG_ENABLED,
+                "iterations": execution_result.get("iterations", 0) if execution_result else 0
             }
-        
-        except Exception as e:
-            logger.error(f"Error processing query: {str(e)}", exc_info=True)
-            # Return user-friendly error message without exposing internal details
-            error_message = "An error occurred while processing your query. Please try again."
-            if logger.level <= logging.DEBUG:
-                error_message += f" (Error: {str(e)})"
             
-            return {
-                "response": error_message,
-                "sources": [],
-                "context": "",
-                "metadata": {"error": True},
-                "execution_trace": None
+            # For agentic RAG, extract sources from execution trace if available
+            if execution_result:
+                # Try to extract sources from iteration history
+                iteration_history = execution_result.get("plan", {}).get("steps", [])
+                if iteration_history:
+                    sources = [
+                        f"Step {step.get('step', '')}: {step.get('description', '')}"
+                        for step in iteration_history
+                    ]
+                else:
+                    sources = ["Agentic reasoning completed"]
+        
+        # Add GraphRAG metadata to processed_input metadata
+        context_stats = graph_results.get("context_stats", {}) if graph_results else {}
+        enhanced_metadata = {
+            **processed_input,
+            "graphrag": graphrag_metadata,
+            "retrieval_stats": {
+                "sources_count": len(sources),
+                "context_length": len(integrated_context),
+                "context_tokens": context_stats.get("context_tokens", count_tokens(integrated_context)),
+                "context_token_budget": PROMPT_CONTEXT_TOKEN_BUDGET,
+                "context_nodes_included": context_stats.get("nodes_included"),
+                "context_nodes_truncated": context_stats.get("nodes_truncated"),
+                "system_prompt_tokens": count_tokens(self.system_prompt),
+                "prompt_tokens_estimate": count_tokens(self.system_prompt) + count_tokens(
+                    self._build_prompt(retrieval["user_query"], integrated_context)
+                )
             }
-
+        }
+        
+        # Add LLM info to metadata
+        enhanced_metadata["llm_used"] = llm_used
+        if usage:
+            # cached_prompt_tokens: prompt prefix served from the provider's prefix/KV cache
+            enhanced_metadata["llm_usage"] = usage
+        if retrieval.get("llm_route"):
+            enhanced_metadata["llm_route"] = retrieval["llm_route"]
+        if retrieval.get("deadline_info"):
+            enhanced_metadata["deadline"] = retrieval["deadline_info"]
+        
+        return {
+            "response": response_text,
+            "sources": sources,
+            "context": integrated_context[:1000] + "..." if len(integrated_context) > 1000 else integrated_context,
+            "metadata": enhanced_metadata,
+            "execution_trace": execution_result if AGENTIC_RAG_ENABLED else None,
+            "graphrag_info": graphrag_metadata  # Explicit GraphRAG info
+        }
+    
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        """User-friendly error result that does not expose internal details."""
+        logger.error(f"Error processing query: {str(e)}", exc_info=True)
+        error_message = "An error occurred while processing your query. Please try again."
+        if logger.level <= logging.DEBUG:
+            error_message += f" (Error: {str(e)})"
+        
+        return {
+            "response": error_message,
+            "sources": [],
+            "context": "",
+            "metadata": {"error": True},
+            "execution_trace": None
+        }
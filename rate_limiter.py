@@ -0,0 +1,222 @@
+"""
+Rate Limiter Module
+Process-wide token-bucket rate limiting per model and Retry-After aware
+exponential backoff for LLM calls.
+Part of the Intelligence Layer client (ModelArts).
+"""
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header value.
+    
+    Args:
+        value: Header value (delay in seconds or an HTTP date)
+    
+    Returns:
+        Delay in seconds, or None if absent or unparseable
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, retry_after: Optional[float] = None) -> float:
+    """
+    Delay before retry number ``attempt`` (0-based).
+    
+    Exponential backoff with full jitter, capped at max_delay. A server
+    supplied Retry-After is honoured as the minimum wait.
+    """
+    delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    
+    Tokens refill continuously at ``rate`` per second up to ``burst``.
+    The bucket can be paused (e.g. after a 429 with Retry-After) so that every
+    caller waits instead of sending requests that would be rejected.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        """
+        Initialize token bucket.
+        
+        Args:
+            rate: Sustained requests per second
+            burst: Maximum tokens (requests allowed back-to-back)
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._waits = 0
+        self._rejections = 0
+    
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Take one token, waiting for a refill if necessary.
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+        
+        Returns:
+            True if a token was taken, False if the timeout would be exceeded
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+        while True:
+            wait = self._try_take(deadline, waited)
+            if wait is None:
+                return False
+            if wait == 0:
+                return True
+            waited = True
+            time.sleep(wait)
+    
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """Like acquire, but waits with asyncio.sleep instead of blocking the thread."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+        while True:
+            wait = self._try_take(deadline, waited)
+            if wait is None:
+                return False
+            if wait == 0:
+                return True
+            waited = True
+            await asyncio.sleep(wait)
+    
+    def _try_take(self, deadline: Optional[float], waited: bool) -> Optional[float]:
+        """Take a token if available: 0 when taken, seconds to sleep otherwise, None past the deadline."""
+        if self.rate <= 0:
+            return 0  # Unlimited
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self._paused_until and self._tokens >= 1:
+                self._tokens -= 1
+                if waited:
+                    self._waits += 1
+                return 0
+            wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                self._rejections += 1
+                return None
+            return min(wait, 1.0)
+    
+    def pause(self, seconds: float):
+        """Block all acquisitions for the given number of seconds."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return bucket configuration and counters for monitoring."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2),
+                "paused_for": round(max(0.0, self._paused_until - now), 2),
+                "waits": self._waits,
+                "rejections": self._rejections
+            }
+
+
+class RateLimiter:
+    """Registry of one token bucket per model."""
+    
+    def __init__(self, default_rate: float, default_burst: int, rates: Optional[Dict[str, float]] = None):
+        """
+        Initialize rate limiter.
+        
+        Args:
+            default_rate: Requests per second for models without an explicit rate
+            default_burst: Bucket size for every model
+            rates: Optional per-model requests per second
+        """
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.rates = dict(rates or {})
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+    
+    def bucket(self, model: str) -> TokenBucket:
+        """Return the bucket for a model, creating it on first use."""
+        with self._lock:
+            bucket = self._buckets.get(model)
+            if bucket is None:
+                bucket = TokenBucket(self.rates.get(model, self.default_rate), self.default_burst)
+                self._buckets[model] = bucket
+            return bucket
+    
+    def acquire(self, model: str, timeout: Optional[float] = None) -> bool:
+        """Take a token from the model's bucket (see TokenBucket.acquire)."""
+        return self.bucket(model).acquire(timeout)
+    
+    async def acquire_async(self, model: str, timeout: Optional[float] = None) -> bool:
+        """Take a token from the model's bucket without blocking the event loop."""
+        return await self.bucket(model).acquire_async(timeout)
+    
+    def pause(self, model: str, seconds: float):
+        """Hold off all requests to a model, e.g. for a server-sent Retry-After."""
+        logger.warning(f"Rate limit: pausing {model} for {seconds:.1f}s")
+        self.bucket(model).pause(seconds)
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-model bucket statistics."""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {model: bucket.stats() for model, bucket in buckets.items()}
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter(default_rate: float, default_burst: int, rates: Optional[Dict[str, float]] = None) -> RateLimiter:
+    """
+    Return the process-wide rate limiter, creating it on first call.
+    
+    Every client in the process (sync, async, all Streamlit sessions) shares
+    the same buckets, so the configured rate is the total sent to the endpoint.
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(default_rate, default_burst, rates)
+        return _shared_limiter
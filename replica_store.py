@@ -0,0 +1,416 @@
+"""
+Local Knowledge-Base Replica
+Read replica of the Milvus knowledge base kept under VECTORSTORE_DIR as
+memory-mapped columnar files with an HNSW index over the vectors, so
+retrieval is served in process and Milvus is only used for sync, writes
+and fallback.
+Part of the Data & Memory Layer (Access Layer).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from vector_store import VectorStore, VECTOR_FIELD, ALL_FIELDS
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Fields stored as UTF-8 text columns (metadata and related_nodes JSON-encoded)
+_TEXT_FIELDS = ("question", "response", "metadata", "related_nodes")
+_JSON_FIELDS = ("metadata", "related_nodes")
+# Maximum ids per source lookup while syncing
+SYNC_BATCH_SIZE = 500
+# Retry interval for the sync thread while the source is unreachable
+SYNC_RETRY_SECONDS = 60
+
+
+class _Columns:
+    """Memory-mapped replica columns plus the id -> row mapping and vector index."""
+    
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, norms: np.ndarray, texts: Dict[str, tuple], hnsw=None):
+        self.ids = ids  # (n,) node ids
+        self.vectors = vectors  # (n, dim) float32
+        self.norms = norms  # (n,) float32 vector norms (0 replaced by 1)
+        self.texts = texts  # field -> (uint8 bytes, (n + 1,) int64 offsets)
+        self.hnsw = hnsw  # hnswlib.Index labelled by row number, or None for brute force
+        self.index = {node_id: row for row, node_id in enumerate(ids.tolist())}
+    
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+    
+    def text(self, field: str, row: int) -> str:
+        data, offsets = self.texts[field]
+        return bytes(data[offsets[row]:offsets[row + 1]]).decode("utf-8")
+    
+    def row(self, row: int, output_fields: List[str]) -> Dict[str, Any]:
+        selected = {"id": self.ids[row].item()}
+        for field in output_fields:
+            if field == VECTOR_FIELD:
+                selected[field] = self.vectors[row]
+            elif field in _JSON_FIELDS:
+                selected[field] = json.loads(self.text(field, row) or "null")
+            elif field in _TEXT_FIELDS:
+                selected[field] = self.text(field, row)
+        return selected
+
+
+class ReplicaVectorStore(VectorStore):
+    """
+    Local read replica in front of a source store (Milvus).
+    
+    Reads are served from the replica once it holds rows and from the
+    source until then; ids the replica does not have yet are looked up in
+    the source. Writes go to the source and reach the replica with the sync
+    that follows a flush (only the inserted ids) or the periodic one. A
+    replica persisted by an earlier run is loaded at startup, so retrieval
+    keeps working (on possibly stale data) while Milvus is down.
+    """
+    
+    name = "replica"
+    
+    def __init__(
+        self,
+        source: VectorStore,
+        replica_dir: str,
+        version: str = "1",
+        sync_interval_seconds: float = 3600,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        hnsw_ef_search: int = 64
+    ):
+        """
+        Initialize replica, load it from disk and start the background sync.
+        
+        Args:
+            source: Store the replica is synced from (and writes go to)
+            replica_dir: Directory for the columnar files
+            version: Knowledge-base version; a persisted replica of another version is rebuilt
+            sync_interval_seconds: Interval for incremental syncs (0 syncs only at startup)
+            hnsw_m: HNSW graph degree
+            hnsw_ef_construction: HNSW build-time candidate list size
+            hnsw_ef_search: HNSW query-time candidate list size
+        """
+        self.source = source
+        self.replica_dir = replica_dir
+        self.version = version
+        self.sync_interval_seconds = sync_interval_seconds
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self._columns: Optional[_Columns] = None
+        self._synced_at = 0.0
+        self._sync_lock = threading.Lock()
+        # Ids inserted since the last flush-triggered sync; a full id scan is needed for rows without ids
+        self._pending_lock = threading.Lock()
+        self._pending_ids = set()
+        self._pending_scan = False
+        self._flush_sync_running = False
+        self._stats = {"local_searches": 0, "local_lookups": 0, "source_searches": 0, "source_lookups": 0, "syncs": 0, "rows_synced": 0}
+        
+        if not HNSWLIB_AVAILABLE:
+            logger.warning("hnswlib not installed; replica searches use exact brute force")
+        self.load()
+        threading.Thread(target=self._sync_loop, name="replica-sync", daemon=True).start()
+    
+    @property
+    def ready(self) -> bool:
+        return self._columns is not None
+    
+    @property
+    def available(self) -> bool:
+        return self._columns is not None or self.source.available
+    
+    # ------------------ Reads ------------------
+    
+    def search(self, query_embedding, limit, output_fields, timeout=None):
+        columns = self._columns
+        if columns is None or not columns.count:
+            self._stats["source_searches"] += 1
+            return self.source.search(query_embedding, limit, output_fields, timeout=timeout)
+        
+        self._stats["local_searches"] += 1
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query) or 1.0
+        limit = min(limit, columns.count)
+        hits = None
+        if columns.hnsw is not None:
+            try:
+                labels, distances = columns.hnsw.knn_query(query, k=limit)
+                # hnswlib cosine distance is 1 - cosine similarity
+                hits = [(int(row), 1.0 - float(distance)) for row, distance in zip(labels[0], distances[0])]
+            except RuntimeError as e:
+                logger.warning(f"HNSW search failed ({e}), using brute force")
+        if hits is None:
+            scores = (columns.vectors @ (query / query_norm)) / columns.norms
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            hits = [(int(row), float(scores[row])) for row in top]
+        return [(columns.ids[row].item(), similarity, columns.row(row, output_fields)) for row, similarity in hits]
+    
+    def query_by_ids(self, node_ids, output_fields, timeout=None):
+        columns = self._columns
+        if columns is None or not columns.count:
+            self._stats["source_lookups"] += 1
+            return self.source.query_by_ids(node_ids, output_fields, timeout=timeout)
+        
+        self._stats["local_lookups"] += 1
+        rows = [columns.row(columns.index[node_id], output_fields) for node_id in node_ids if node_id in columns.index]
+        # Rows inserted since the last sync are only in the source
+        missing = [node_id for node_id in node_ids if node_id not in columns.index]
+        if missing and self.source.available:
+            self._stats["source_lookups"] += 1
+            try:
+                rows.extend(self.source.query_by_ids(missing, output_fields, timeout=timeout))
+            except Exception as e:
+                logger.warning(f"Source lookup of {len(missing)} ids missing from the local replica failed: {e}")
+        return rows
+    
+    def iterate_rows(self, output_fields):
+        columns = self._columns
+        if columns is None:
+            yield from self.source.iterate_rows(output_fields)
+            return
+        for row in range(columns.count):
+            yield columns.row(row, output_fields)
+    
+    # ------------------ Writes (source only) ------------------
+    
+    def insert(self, rows):
+        keys = self.source.insert(rows)
+        ids = list(keys) if keys is not None else [row["id"] for row in rows if row.get("id") is not None]
+        with self._pending_lock:
+            self._pending_ids.update(ids)
+            # Rows whose keys are unknown can only be found by scanning the source ids
+            self._pending_scan = self._pending_scan or len(ids) < len(rows)
+        return keys
+    
+    def flush(self):
+        """Flush the source and sync the inserted rows into the replica in the background."""
+        self.source.flush()
+        with self._pending_lock:
+            # Debounce: a running flush sync picks up whatever is pending when it finishes
+            if self._flush_sync_running or not (self._pending_ids or self._pending_scan):
+                return
+            self._flush_sync_running = True
+        threading.Thread(target=self._sync_pending, name="replica-sync-flush", daemon=True).start()
+    
+    def _sync_pending(self):
+        """Sync inserted ids (or scan the source once for auto-id rows) until nothing is pending."""
+        try:
+            while True:
+                with self._pending_lock:
+                    node_ids, scan = list(self._pending_ids), self._pending_scan
+                    self._pending_ids, self._pending_scan = set(), False
+                    if not node_ids and not scan:
+                        self._flush_sync_running = False
+                        return
+                self.sync(None if scan else node_ids)
+        except Exception:
+            with self._pending_lock:
+                self._flush_sync_running = False
+            raise
+    
+    # ------------------ Sync ------------------
+    
+    def _sync_loop(self):
+        """Sync when the replica is due (at once if none is loaded), then every sync interval."""
+        while True:
+            if self._columns is None or self.sync_interval_seconds <= 0:
+                wait = 0.0
+            else:
+                wait = self._synced_at + self.sync_interval_seconds - time.time()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            if not self.source.available:
+                time.sleep(SYNC_RETRY_SECONDS)
+                continue
+            
+            synced_at = self._synced_at
+            self.sync()
+            if self._synced_at == synced_at or self._columns is None:
+                time.sleep(SYNC_RETRY_SECONDS)  # Sync failed
+            elif self.sync_interval_seconds <= 0:
+                return
+    
+    def sync(self, node_ids: List[Any] = None) -> int:
+        """
+        Copy rows from the source: everything when the replica is empty,
+        otherwise only ids not in the replica yet (knowledge-base rows are
+        immutable; re-ingestion bumps KNOWLEDGE_BASE_VERSION and triggers a
+        full rebuild). An empty source leaves the replica unloaded, so reads
+        keep going to the source.
+        
+        Args:
+            node_ids: Ids to copy if missing (None scans every source id)
+        
+        Returns:
+            Number of rows added
+        """
+        with self._sync_lock:
+            started = time.perf_counter()
+            base = self._columns if self._columns is not None and self._columns.count else None
+            try:
+                if base is None:
+                    rows = list(self.source.iterate_rows(list(ALL_FIELDS)))
+                else:
+                    if node_ids is None:
+                        node_ids = [row["id"] for row in self.source.iterate_rows(["id"])]
+                    new_ids = list(dict.fromkeys(node_id for node_id in node_ids if node_id not in base.index))
+                    rows = []
+                    for i in range(0, len(new_ids), SYNC_BATCH_SIZE):
+                        rows.extend(self.source.query_by_ids(new_ids[i:i + SYNC_BATCH_SIZE], list(ALL_FIELDS)))
+                self._synced_at = time.time()
+                self._stats["syncs"] += 1
+                if not rows:
+                    return 0
+                self._save(rows, base)
+            except Exception as e:
+                logger.error(f"Error syncing local replica: {str(e)}")
+                return 0
+            
+            self._stats["rows_synced"] += len(rows)
+            self.load()
+            logger.info(
+                f"✅ Local replica synced: +{len(rows)} rows ({self._columns.count if self._columns else 0} total) "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+            return len(rows)
+    
+    # ------------------ Persistence ------------------
+    
+    def load(self) -> bool:
+        """
+        Memory-map the persisted replica.
+        
+        Returns:
+            True if a replica of the current version was loaded
+        """
+        meta_path = os.path.join(self.replica_dir, "meta.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != self.version:
+                logger.info(f"Local replica is for knowledge base version {meta.get('version')}, rebuilding")
+                return False
+            if not meta.get("rows"):
+                logger.info(f"Local replica in {self.replica_dir} is empty, rebuilding")
+                return False
+            def load(name):
+                return np.load(os.path.join(self.replica_dir, f"{name}.npy"), mmap_mode="r")
+            
+            texts = {field: (load(field), load(f"{field}.offsets")) for field in _TEXT_FIELDS}
+            vectors, norms = load("vectors"), load("norms")
+            hnsw = None
+            hnsw_path = os.path.join(self.replica_dir, "hnsw.bin")
+            if HNSWLIB_AVAILABLE and meta.get("hnsw") and os.path.exists(hnsw_path):
+                hnsw = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+                hnsw.load_index(hnsw_path, max_elements=len(vectors))
+                hnsw.set_ef(max(self.hnsw_ef_search, 1))
+            columns = _Columns(load("ids"), vectors, norms, texts, hnsw)
+        except (OSError, ValueError, RuntimeError) as e:
+            logger.info(f"No usable local replica in {self.replica_dir}: {e}")
+            return False
+        
+        self._columns = columns
+        self._synced_at = max(self._synced_at, meta.get("synced_at", 0.0))
+        logger.info(
+            f"✅ Local replica loaded: {columns.count} rows, "
+            f"{'HNSW' if hnsw is not None else 'brute-force'} search (memory-mapped from {self.replica_dir})"
+        )
+        return True
+    
+    def _save(self, rows: List[Dict[str, Any]], base: Optional[_Columns]):
+        """Write base columns plus rows (at least one); files are replaced atomically one by one, metadata last."""
+        os.makedirs(self.replica_dir, exist_ok=True)
+        meta_path = os.path.join(self.replica_dir, "meta.json")
+        # A missing meta.json marks a half-written replica as unusable until the write completes
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        
+        new_ids = np.asarray([row["id"] for row in rows])
+        if new_ids.dtype.kind not in "iU":
+            new_ids = new_ids.astype(str)
+        ids = np.concatenate([base.ids, new_ids]) if base is not None else new_ids
+        if ids.dtype.kind not in "iU":
+            ids = ids.astype(str)
+        dim = base.vectors.shape[1] if base is not None else len(rows[0][VECTOR_FIELD])
+        new_vectors = np.asarray([row[VECTOR_FIELD] for row in rows], dtype=np.float32).reshape(len(rows), dim)
+        vectors = np.vstack([base.vectors, new_vectors]) if base is not None else new_vectors
+        norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+        norms[norms == 0] = 1.0
+        
+        arrays = {"ids": ids, "vectors": vectors, "norms": norms}
+        for field in _TEXT_FIELDS:
+            encoded = [
+                (json.dumps(row.get(field), ensure_ascii=False, default=str) if field in _JSON_FIELDS else row.get(field) or "").encode("utf-8")
+                for row in rows
+            ]
+            lengths = np.fromiter((len(item) for item in encoded), dtype=np.int64, count=len(encoded))
+            new_data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            if base is not None:
+                data, offsets = base.texts[field]
+                arrays[field] = np.concatenate([data, new_data])
+                arrays[f"{field}.offsets"] = np.concatenate([offsets, offsets[-1] + np.cumsum(lengths)])
+            else:
+                arrays[field] = new_data
+                arrays[f"{field}.offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        
+        for name, array in arrays.items():
+            path = os.path.join(self.replica_dir, f"{name}.npy")
+            tmp_path = os.path.join(self.replica_dir, f"{name}.tmp.npy")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+        
+        hnsw = self._build_hnsw(vectors, base, len(rows)) if HNSWLIB_AVAILABLE else False
+        meta = {
+            "version": self.version,
+            "synced_at": self._synced_at,
+            "rows": int(len(ids)),
+            "dim": int(dim),
+            "hnsw": hnsw
+        }
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+    
+    def _build_hnsw(self, vectors: np.ndarray, base: Optional[_Columns], added: int) -> bool:
+        """Write hnsw.bin: the base index extended with the added rows, or a new index."""
+        path = os.path.join(self.replica_dir, "hnsw.bin")
+        total = len(vectors)
+        index = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+        if base is not None and base.hnsw is not None and os.path.exists(path):
+            index.load_index(path, max_elements=total)
+            start = total - added
+        else:
+            index.init_index(max_elements=total, ef_construction=self.hnsw_ef_construction, M=self.hnsw_m)
+            start = 0
+        if start < total:
+            index.add_items(np.asarray(vectors[start:]), np.arange(start, total))
+        tmp_path = os.path.join(self.replica_dir, "hnsw.tmp.bin")
+        index.save_index(tmp_path)
+        os.replace(tmp_path, path)
+        return True
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return replica size, age, search backend and local/source request counters."""
+        columns = self._columns
+        stats = dict(self._stats)
+        stats["backend"] = self.name
+        stats["ready"] = columns is not None
+        stats["rows"] = columns.count if columns is not None else 0
+        stats["hnsw"] = columns is not None and columns.hnsw is not None
+        stats["source_available"] = self.source.available
+        stats["age_seconds"] = round(time.time() - self._synced_at, 1) if self._synced_at else None
+        return stats
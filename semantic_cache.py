@@ -0,0 +1,155 @@
+"""
+Semantic Answer Cache
+Serves previous answers for paraphrased questions by comparing query
+embeddings against an in-process vector index.
+Part of the Application Server (ECS) layer.
+"""
+import copy
+import logging
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Cache of (query embedding, answer, retrieved node ids) entries.
+    
+    Vectors are L2-normalized into a preallocated matrix so a lookup is a
+    single matrix-vector product (cosine similarity) over the live slots.
+    Entries are only served when the similarity passes the threshold, the
+    entry is younger than the TTL and its knowledge-base version matches.
+    """
+    
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 5000,
+        ttl_seconds: float = 86400
+    ):
+        """
+        Initialize semantic cache.
+        
+        Args:
+            similarity_threshold: Minimum cosine similarity for a hit
+            max_entries: Maximum cached answers (least recently used evicted first)
+            ttl_seconds: Time-to-live for entries
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        
+        self._vectors = None  # (max_entries, dim) float32, allocated on first insert
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "stale": 0}
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def lookup(self, query_embedding: List[float], kb_version: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Find a cached answer for a semantically equivalent query.
+        
+        Args:
+            query_embedding: Query vector embedding
+            kb_version: Current knowledge-base version
+        
+        Returns:
+            Tuple of (copy of the cached result, similarity), or None on a miss
+        """
+        query = self._normalize(query_embedding)
+        now = time.time()
+        with self._lock:
+            if self._vectors is None or query.shape[0] != self._vectors.shape[1]:
+                self._stats["misses"] += 1
+                return None
+            
+            similarities = self._vectors @ query
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            entry = self._entries[slot]
+            
+            if entry is None or similarity < self.similarity_threshold:
+                self._stats["misses"] += 1
+                return None
+            if entry["kb_version"] != kb_version or now - entry["created_at"] > self.ttl_seconds:
+                self._release(slot)
+                self._stats["stale"] += 1
+                self._stats["misses"] += 1
+                return None
+            
+            self._last_used[slot] = now
+            self._stats["hits"] += 1
+            return copy.deepcopy(entry["result"]), similarity
+    
+    def store(self, query_embedding: List[float], result: Dict[str, Any], node_ids: List[Any], kb_version: str):
+        """
+        Store an answer for a query.
+        
+        Args:
+            query_embedding: Query vector embedding
+            result: Pipeline result to serve on future hits
+            node_ids: Ids of the knowledge-base nodes the answer was grounded on
+            kb_version: Knowledge-base version the answer was produced against
+        """
+        vector = self._normalize(query_embedding)
+        now = time.time()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            elif vector.shape[0] != self._vectors.shape[1]:
+                logger.warning("Semantic cache: embedding dimension changed, clearing cache")
+                self._clear_locked()
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._stats["evictions"] += 1
+            
+            self._vectors[slot] = vector
+            self._entries[slot] = {
+                "result": copy.deepcopy(result),
+                "node_ids": list(node_ids),
+                "kb_version": kb_version,
+                "created_at": now
+            }
+            self._last_used[slot] = now
+            self._stats["stores"] += 1
+    
+    def invalidate(self):
+        """Drop all entries (e.g. after the knowledge base was reloaded)."""
+        with self._lock:
+            self._clear_locked()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+            stats["entries"] = self.max_entries - len(self._free_slots)
+            return stats
+    
+    def _release(self, slot: int):
+        self._entries[slot] = None
+        self._vectors[slot] = 0.0
+        self._last_used[slot] = 0.0
+        self._free_slots.append(slot)
+    
+    def _clear_locked(self):
+        self._vectors = None
+        self._entries = [None] * self.max_entries
+        self._last_used[:] = 0.0
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
@@ -0,0 +1,209 @@
+"""
+Request Coalescing (singleflight)
+Concurrent identical requests wait on one in-flight execution and share
+its result instead of each running the full pipeline.
+Part of the Application Server (ECS) layer.
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, Tuple, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight execution and the callers waiting on it."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _LeaderCancelled(Exception):
+    """Set on an async flight whose leader was cancelled; a follower takes over."""
+
+
+class _Stream:
+    """One in-flight streaming execution; events are buffered for late joiners."""
+    
+    def __init__(self):
+        self.events = []
+        self.finished = False
+        self.error = None
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent executions per key.
+    
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running wait and receive the same result (or error).
+    The key is released as soon as the execution finishes, so later requests
+    run again.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, _Stream] = {}
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "coalesced": 0}
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once per key among concurrent callers.
+        
+        Args:
+            key: Deduplication key
+            fn: Function to execute
+        
+        Returns:
+            Tuple of (result, shared) where shared is True for callers that
+            received another caller's result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            self._count(leader)
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+    
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Async counterpart of do for coroutines running on one event loop.
+        
+        If the leader is cancelled, its followers are not: the first of them
+        to resume becomes the new leader and runs its own fn.
+        
+        Args:
+            key: Deduplication key
+            fn: Coroutine function to execute
+        
+        Returns:
+            Tuple of (result, shared)
+        """
+        while True:
+            with self._lock:
+                future = self._async_calls.get(key)
+                leader = future is None or future.get_loop() is not asyncio.get_running_loop()
+                if leader:
+                    future = asyncio.get_running_loop().create_future()
+                    self._async_calls[key] = future
+                self._count(leader)
+            
+            if leader:
+                break
+            try:
+                # shield: a cancelled follower must not cancel the shared execution
+                return await asyncio.shield(future), True
+            except _LeaderCancelled:
+                continue
+        
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            if not future.done():
+                future.set_exception(_LeaderCancelled())
+                future.exception()  # Mark retrieved when there are no followers
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                future.exception()  # Mark retrieved; followers (if any) still see it
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                if self._async_calls.get(key) is future:
+                    del self._async_calls[key]
+    
+    def stream(self, key: str, fn: Callable[[], Iterator[Any]]) -> Iterator[Tuple[Any, bool]]:
+        """
+        Share one streaming execution among concurrent callers.
+        
+        The generator runs in a background thread and every caller replays
+        the buffered events from the start, so a late joiner still sees the
+        whole stream and an abandoned consumer does not stall the others.
+        
+        Args:
+            key: Deduplication key
+            fn: Function returning the event iterator
+        
+        Yields:
+            Tuples of (event, shared)
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Stream()
+                self._streams[key] = flight
+            self._count(leader)
+        
+        if leader:
+            threading.Thread(
+                target=self._produce, args=(key, flight, fn), name="singleflight-stream", daemon=True
+            ).start()
+        
+        index = 0
+        while True:
+            with flight.cond:
+                while index >= len(flight.events) and not flight.finished:
+                    flight.cond.wait()
+                if index < len(flight.events):
+                    event = flight.events[index]
+                    index += 1
+                elif flight.error is not None:
+                    raise flight.error
+                else:
+                    return
+            yield event, not leader
+    
+    def _produce(self, key: str, flight: _Stream, fn: Callable[[], Iterator[Any]]):
+        try:
+            for event in fn():
+                with flight.cond:
+                    flight.events.append(event)
+                    flight.cond.notify_all()
+        except Exception as e:
+            logger.error(f"Coalesced stream failed: {e}")
+            flight.error = e
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+            with flight.cond:
+                flight.finished = True
+                flight.cond.notify_all()
+    
+    def _count(self, leader: bool):
+        self._stats["executions" if leader else "coalesced"] += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """Return executions, coalesced callers and currently in-flight keys."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._async_calls) + len(self._streams)
+            return stats
@@ -0,0 +1,194 @@
+"""
+Sparse Keyword Index
+In-process BM25 inverted index over question/response text, used for
+hybrid retrieval when the Milvus server cannot run BM25 itself, and the
+weighted reciprocal-rank fusion that merges dense and sparse hits.
+Part of the Data & Memory Layer (Access Layer).
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, List, Tuple, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Latin words keep inner dots, dashes and slashes so drug names, doses and lab
+# values ("5.6", "hba1c", "co-amoxiclav", "mg/dl") stay one token
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+# CJK text has no spaces; runs are indexed as character bigrams
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i in is it its my of on or "
+    "should that the their there these this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text into BM25 terms (words, numbers and CJK bigrams)."""
+    text = (text or "").lower()
+    tokens = [token for token in _WORD_RE.findall(text) if token not in _STOPWORDS]
+    for run in _CJK_RE.findall(text):
+        tokens.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+    return tokens
+
+
+def weighted_rrf(ranked_lists: Sequence[Sequence[Any]], weights: Sequence[float], k: int = 60) -> List[Tuple[Any, float]]:
+    """
+    Fuse ranked id lists by weighted reciprocal rank.
+    
+    Each list contributes ``weight / (k + rank)`` (rank starting at 1) to the
+    ids it contains.
+    
+    Args:
+        ranked_lists: Id lists, best first
+        weights: One weight per list
+        k: RRF smoothing constant
+    
+    Returns:
+        List of (id, fused score), best first (ties keep first-seen order)
+    """
+    scores = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        for rank, doc_id in enumerate(ranked, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Thread-safe BM25 inverted index keyed by node id.
+    
+    Searches return nothing until the index is built, so callers can fall
+    back to dense-only retrieval while the export is running.
+    """
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize an empty index.
+        
+        Args:
+            k1: Term-frequency saturation
+            b: Document-length normalisation
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Any, int]] = {}  # term -> {node id: term frequency}
+        self._doc_terms: Dict[Any, Tuple[str, ...]] = {}  # node id -> distinct terms (for removal)
+        self._doc_len: Dict[Any, int] = {}
+        self._total_len = 0
+        self._ready = False
+        self._built_at = None
+        self._lock = threading.Lock()
+        self._stats = {"searches": 0, "empty_searches": 0}
+    
+    @property
+    def ready(self) -> bool:
+        return self._ready
+    
+    def build(self, store) -> bool:
+        """
+        Index the question and response of every row in the vector store.
+        
+        Args:
+            store: VectorStore to export
+        
+        Returns:
+            True if the index was built
+        """
+        start = time.time()
+        try:
+            rows = [
+                (row["id"], f"{row.get('question') or ''} {row.get('response') or ''}")
+                for row in store.iterate_rows(["id", "question", "response"])
+            ]
+        except Exception as e:
+            logger.error(f"Error building BM25 index: {str(e)}")
+            return False
+        
+        with self._lock:
+            self._postings, self._doc_terms, self._doc_len, self._total_len = {}, {}, {}, 0
+            for doc_id, text in rows:
+                self._add(doc_id, text)
+            self._ready = True
+            self._built_at = time.time()
+        logger.info(f"✅ BM25 index built: {len(rows)} documents, {len(self._postings)} terms in {time.time() - start:.1f}s")
+        return True
+    
+    def add(self, doc_id: Any, text: str):
+        """Index (or re-index) one document."""
+        with self._lock:
+            self._remove(doc_id)
+            self._add(doc_id, text)
+    
+    def remove(self, doc_id: Any):
+        """Drop one document from the index."""
+        with self._lock:
+            self._remove(doc_id)
+    
+    def _add(self, doc_id: Any, text: str):
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        length = sum(counts.values())
+        self._doc_terms[doc_id] = tuple(counts)
+        self._doc_len[doc_id] = length
+        self._total_len += length
+    
+    def _remove(self, doc_id: Any):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id, 0)
+    
+    def search(self, query: str, limit: int) -> List[Tuple[Any, float]]:
+        """
+        Rank documents against a query by BM25.
+        
+        Args:
+            query: Query text
+            limit: Maximum number of hits
+        
+        Returns:
+            List of (node id, BM25 score), best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            self._stats["searches"] += 1
+            doc_count = len(self._doc_len)
+            if not terms or not doc_count:
+                self._stats["empty_searches"] += 1
+                return []
+            avg_len = self._total_len / doc_count
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            if not scores:
+                self._stats["empty_searches"] += 1
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return index size, readiness and search counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["ready"] = self._ready
+            stats["documents"] = len(self._doc_len)
+            stats["terms"] = len(self._postings)
+            stats["age_seconds"] = round(time.time() - self._built_at, 1) if self._built_at else None
+            return stats
@@ -0,0 +1,39 @@
+"""Shared fixtures for the unit tests (modules live at the repository root)."""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    """Poll condition until it holds or the timeout passes (background sync threads)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def make_row(node_id, vector, question: str = "", related_nodes=None):
+    """Knowledge-graph row in the shape every VectorStore accepts."""
+    return {
+        "id": node_id,
+        "question": question or f"question {node_id}",
+        "response": f"response {node_id}",
+        "combined_embedding": list(vector),
+        "related_nodes": list(related_nodes or []),
+        "metadata": {"source": "test"}
+    }
+
+
+@pytest.fixture
+def rows():
+    """Twenty rows with orthogonal-ish 8-d vectors and a ring of related nodes."""
+    return [
+        make_row(f"n{i}", [1.0 if j == i % 8 else 0.1 * (i // 8) for j in range(8)], related_nodes=[f"n{(i + 1) % 20}"])
+        for i in range(20)
+    ]
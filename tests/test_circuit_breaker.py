@@ -0,0 +1,105 @@
+"""Tests for the per-model circuit breaker (circuit_breaker.py)."""
+import time
+
+import pytest
+import requests
+
+import modelarts_client
+from circuit_breaker import CircuitBreaker, CircuitState
+from modelarts_client import ModelArtsClient
+
+
+def open_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker("model", min_calls=2, open_seconds=0.05, **kwargs)
+    breaker.record_failure(0.1)
+    breaker.record_failure(0.1)
+    return breaker
+
+
+def test_opens_on_error_rate():
+    breaker = CircuitBreaker("model", failure_rate_threshold=0.5, min_calls=4)
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure(0.1)
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.record_failure(0.1)
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+
+def test_opens_on_slow_calls():
+    breaker = CircuitBreaker("model", slow_call_seconds=1.0, slow_call_rate_threshold=0.5, min_calls=2)
+    breaker.record_success(2.0)
+    breaker.record_success(2.0)
+
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # One probe at a time
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_failure(0.1)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_cancelled_probe_releases_its_slot():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+
+    breaker.record_cancelled()
+
+    # Neither success nor failure: still half-open, and the next probe is admitted at once
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_snapshot_reports_transitions():
+    snapshot = open_breaker().snapshot()
+
+    assert snapshot["state"] == "open"
+    assert snapshot["window_calls"] == 2
+    assert snapshot["error_rate"] == 1.0
+    assert snapshot["transitions"][-1]["to"] == "open"
+
+
+class DownSession:
+    """Session whose every request fails with a connection error."""
+
+    def __init__(self):
+        self.posts = 0
+
+    def post(self, *args, **kwargs):
+        self.posts += 1
+        raise requests.exceptions.ConnectionError("down")
+
+
+def test_client_records_one_outcome_per_call_not_per_retry(monkeypatch):
+    monkeypatch.setattr(modelarts_client, "LLM_CB_ENABLED", True)
+    monkeypatch.setattr(modelarts_client, "LLM_RETRY_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(modelarts_client, "LLM_RETRY_BASE_DELAY", 0.0)
+    client = ModelArtsClient()
+    client.session = DownSession()
+    client.rate_limiter = None
+    model = client.model_name
+    client.circuit_breakers[model] = CircuitBreaker(model, min_calls=5)
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client._send(model, {}, time.monotonic() + 5)
+
+    assert client.session.posts == 6
+    snapshot = client.get_circuit_states()[model]
+    assert snapshot["window_calls"] == 2
+    assert snapshot["state"] == "closed"
@@ -0,0 +1,51 @@
+"""Tests for the graph node and adjacency cache (graph_cache.py)."""
+import time
+
+import numpy as np
+
+from graph_cache import GraphCache
+
+
+def test_graph_cache_merges_fields_per_node():
+    cache = GraphCache()
+    cache.put_many({"a": {"id": "a", "related_nodes": ["b"]}})
+
+    found, missing = cache.get_many(["a", "b"], ["id", "related_nodes"])
+    assert found == {"a": {"id": "a", "related_nodes": ["b"]}}
+    assert missing == ["b"]
+
+    # Payload fields are not cached yet
+    assert cache.get_many(["a"], ["id", "question"]) == ({}, ["a"])
+    cache.put_many({"a": {"id": "a", "question": "q"}})
+    found, _ = cache.get_many(["a"], ["id", "question", "related_nodes"])
+    assert found["a"] == {"id": "a", "question": "q", "related_nodes": ["b"]}
+
+    stats = cache.stats()
+    assert stats["adjacency"]["hits"] == 1
+    assert stats["payload"]["misses"] == 1
+
+
+def test_graph_cache_ttl_and_memory_bound():
+    cache = GraphCache(ttl_seconds=0.05)
+    cache.put_many({"a": {"id": "a", "related_nodes": []}})
+    time.sleep(0.06)
+    assert cache.get_many(["a"], ["related_nodes"]) == ({}, ["a"])
+    assert cache.stats()["expired"] == 1
+
+    vector = np.zeros(256, dtype=np.float32)
+    cache = GraphCache(max_bytes=3000)
+    cache.put_many({node_id: {"combined_embedding": vector} for node_id in ("a", "b", "c")})
+    assert cache.stats()["bytes"] <= 3000
+    assert cache.stats()["evictions"] >= 1
+    # Oldest entries go first
+    assert cache.get_many(["c"], ["combined_embedding"])[1] == []
+
+
+def test_graph_cache_invalidate():
+    cache = GraphCache()
+    cache.put_many({"a": {"question": "q"}, "b": {"question": "q"}})
+
+    cache.invalidate(["a"])
+    assert cache.get_many(["a", "b"], ["question"])[1] == ["a"]
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,95 @@
+"""Tests for the CSR adjacency snapshot (graph_snapshot.py)."""
+from graph_snapshot import AdjacencySnapshot, _build_csr
+from vector_store import NumpyVectorStore
+
+from conftest import make_row
+
+
+def neighbors_of(csr, node_id):
+    row = csr.index[node_id]
+    return csr.ids[csr.indices[csr.offsets[row]:csr.offsets[row + 1]]].tolist()
+
+
+def test_build_csr_from_adjacency():
+    csr = _build_csr(["a", "b"], {"a": ["b", "c"], "b": []})
+
+    assert csr.ids.tolist() == ["a", "b", "c"]
+    assert csr.offsets.tolist() == [0, 2, 2, 2]
+    assert neighbors_of(csr, "a") == ["b", "c"]
+    # "c" is only known as a neighbour
+    assert csr.loaded.tolist() == [True, True, False]
+    assert csr.node_count == 2
+    assert csr.edge_count == 2
+
+
+def test_build_csr_appends_to_base_without_changing_existing_rows():
+    base = _build_csr(["a", "b"], {"a": ["b"], "b": ["a"]})
+    csr = _build_csr(["d"], {"d": ["a", "e"]}, base)
+
+    assert csr.ids.tolist() == ["a", "b", "d", "e"]
+    assert neighbors_of(csr, "a") == ["b"]
+    assert neighbors_of(csr, "b") == ["a"]
+    assert neighbors_of(csr, "d") == ["a", "e"]
+    assert csr.loaded.tolist() == [True, True, True, False]
+    # The base arrays are not modified
+    assert base.ids.tolist() == ["a", "b"]
+    assert base.offsets.tolist() == [0, 1, 2]
+
+
+def test_build_csr_merges_rows_first_seen_as_neighbours():
+    base = _build_csr(["a", "c"], {"a": ["b"], "c": ["a", "b"]})
+    assert not base.loaded[base.index["b"]]
+
+    # "b" is now loaded: its row sits between two unchanged base rows
+    csr = _build_csr(["b"], {"b": ["c", "x"]}, base)
+
+    assert csr.ids.tolist()[:3] == base.ids.tolist()
+    assert neighbors_of(csr, "a") == ["b"]
+    assert neighbors_of(csr, "b") == ["c", "x"]
+    assert neighbors_of(csr, "c") == ["a", "b"]
+    assert csr.loaded[csr.index["b"]]
+    assert not csr.loaded[csr.index["x"]]
+    assert csr.edge_count == 5
+
+
+def test_build_csr_integer_ids():
+    csr = _build_csr([1, 2], {1: [2, 3], 2: [1]})
+
+    assert csr.ids.dtype.kind == "i"
+    assert neighbors_of(csr, 1) == [2, 3]
+
+
+def test_neighbors_limit_and_misses(tmp_path):
+    snapshot = AdjacencySnapshot(str(tmp_path))
+    assert snapshot.neighbors("a") is None
+
+    snapshot._install(_build_csr(["a"], {"a": ["b", "c", "d"]}))
+
+    assert snapshot.neighbors("a") == ["b", "c", "d"]
+    assert snapshot.neighbors("a", limit=2) == ["b", "c"]
+    # Known only as a neighbour, or unknown: the caller asks the store
+    assert snapshot.neighbors("b") is None
+    assert snapshot.neighbors("zz") is None
+    assert snapshot.stats()["misses"] == 3
+
+
+def test_build_refresh_and_reload(tmp_path):
+    store = NumpyVectorStore.from_rows([
+        make_row("a", [1.0, 0.0], related_nodes=["b"]),
+        make_row("b", [0.0, 1.0], related_nodes=["a", "c"])
+    ])
+    snapshot = AdjacencySnapshot(str(tmp_path), version="1")
+    assert snapshot.build(store)
+    assert snapshot.neighbors("b") == ["a", "c"]
+    assert snapshot.neighbors("c") is None
+
+    store.insert([make_row("c", [1.0, 1.0], related_nodes=["a"])])
+    assert snapshot.refresh(store) == 1
+    assert snapshot.refresh(store) == 0
+    assert snapshot.neighbors("c") == ["a"]
+    assert snapshot.neighbors("b") == ["a", "c"]
+
+    reloaded = AdjacencySnapshot(str(tmp_path), version="1")
+    assert reloaded.load()
+    assert reloaded.neighbors("c") == ["a"]
+    assert not AdjacencySnapshot(str(tmp_path), version="2").load()
@@ -0,0 +1,48 @@
+"""Tests for the exact-match LLM response cache (llm_cache.py)."""
+import time
+
+from llm_cache import ResponseCache
+from modelarts_client import ModelArtsClient
+
+
+def test_response_cache_key_normalizes_prompt_and_separates_models():
+    key = ResponseCache.make_key("deepseek", "What  is\nBP?", None, 0.1, 100)
+
+    assert key == ResponseCache.make_key("deepseek", " What is BP? ", None, 0.1, 100)
+    assert key != ResponseCache.make_key("qwen3-32b", "What is BP?", None, 0.1, 100)
+    assert key != ResponseCache.make_key("deepseek", "What is BP?", None, 0.2, 100)
+
+
+def test_response_cache_memory_and_disk_tiers(tmp_path):
+    cache = ResponseCache(str(tmp_path), memory_max_entries=1)
+    cache.put("k1", {"choices": [1]})
+    cache.put("k2", {"choices": [2]})
+
+    assert cache.get("k2") == {"choices": [2]}
+    # Evicted from memory, served from disk
+    assert cache.get("k1") == {"choices": [1]}
+    assert cache.stats()["disk_hits"] == 1
+    # A new instance reads the disk tier
+    assert ResponseCache(str(tmp_path)).get("k2") == {"choices": [2]}
+
+
+def test_response_cache_ttl():
+    cache = ResponseCache(None, ttl_seconds=0.05)
+    cache.put("k", {"choices": []})
+    time.sleep(0.06)
+
+    assert cache.get("k") is None
+
+
+def test_fallback_answer_is_cached_under_the_answering_model():
+    client = ModelArtsClient()
+    client.response_cache = ResponseCache(None)
+
+    def answered_by_qwen(prompt, temperature, max_tokens, system_prompt, deadline):
+        client._answered.model = client.qwen_model_name
+        return {"choices": [{"message": {"content": "answer"}}]}
+
+    client._cached_call(client.model_name, "q", 0.1, 100, None, answered_by_qwen)
+
+    assert client.response_cache.get(ResponseCache.make_key(client.model_name, "q", None, 0.1, 100)) is None
+    assert client.response_cache.get(ResponseCache.make_key(client.qwen_model_name, "q", None, 0.1, 100)) is not None
@@ -0,0 +1,44 @@
+"""Tests for the LLM routing policy (llm_router.py)."""
+from llm_router import DEFAULT_ROUTING_TABLE, LLMRouter, load_routing_table
+
+
+def test_first_matching_rule_wins():
+    router = LLMRouter(DEFAULT_ROUTING_TABLE, latency_slo=30)
+
+    assert router.select("simple_retrieval", 500)["route"] == "simple_short"
+    assert router.select("simple_retrieval", 5000)["route"] == "default"
+    assert router.select("comparative_analysis", 500)["route"] == "reasoning"
+    assert router.select("graph_rag", 500)["route"] == "graph_rag"
+
+
+def test_primary_routes_keep_the_unrouted_defaults():
+    for route in DEFAULT_ROUTING_TABLE:
+        if route["model"] == "primary":
+            assert "max_tokens" not in route and "timeout" not in route
+
+
+def test_route_degrades_while_over_the_slo():
+    router = LLMRouter(DEFAULT_ROUTING_TABLE, latency_slo=1.0, min_samples=3)
+    for _ in range(3):
+        router.record("graph_rag", 5.0)
+
+    route = router.select("graph_rag", 500)
+    assert route["route"] == "fast"
+    assert route["matched"] == "graph_rag"
+    assert route["degraded"]
+    assert router.stats()["graph_rag"]["slo_violations"] == 3
+
+
+def test_failures_do_not_count_towards_latency():
+    router = LLMRouter(DEFAULT_ROUTING_TABLE, latency_slo=1.0, min_samples=1)
+    router.record("graph_rag", 5.0, success=False)
+
+    assert not router.select("graph_rag", 500)["degraded"]
+    assert router.stats()["graph_rag"]["failures"] == 1
+
+
+def test_load_routing_table():
+    assert load_routing_table("") is DEFAULT_ROUTING_TABLE
+    assert load_routing_table("not json") is DEFAULT_ROUTING_TABLE
+    assert load_routing_table('[{"model": "qwen"}]') is DEFAULT_ROUTING_TABLE
+    assert load_routing_table('[{"name": "only", "model": "qwen"}]') == [{"name": "only", "model": "qwen"}]
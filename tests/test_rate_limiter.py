@@ -0,0 +1,56 @@
+"""Tests for token-bucket rate limiting and retry helpers (rate_limiter.py)."""
+import asyncio
+import time
+
+from rate_limiter import TokenBucket, backoff_delay, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_backoff_delay_is_capped_and_honours_retry_after():
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt, 0.5, 2.0) <= 2.0
+    assert backoff_delay(0, 0.5, 2.0, retry_after=5.0) == 5.0
+
+
+def test_burst_then_refill():
+    bucket = TokenBucket(rate=50, burst=2)
+
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+
+    started = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert time.monotonic() - started >= 0.01
+    assert bucket.stats()["waits"] == 1
+    assert bucket.stats()["rejections"] == 1
+
+
+def test_pause_blocks_until_it_ends():
+    bucket = TokenBucket(rate=1000, burst=5)
+    bucket.pause(0.05)
+
+    assert not bucket.acquire(timeout=0.01)
+    assert bucket.acquire(timeout=1)
+
+
+def test_zero_rate_is_unlimited():
+    bucket = TokenBucket(rate=0, burst=1)
+
+    assert all(bucket.acquire(timeout=0) for _ in range(100))
+
+
+def test_acquire_async():
+    bucket = TokenBucket(rate=50, burst=1)
+
+    async def take_two():
+        return await bucket.acquire_async(timeout=0), await bucket.acquire_async(timeout=1)
+
+    assert asyncio.run(take_two()) == (True, True)
@@ -0,0 +1,148 @@
+"""Tests for the local memory-mapped replica and its sync path (replica_store.py)."""
+import numpy as np
+import pytest
+
+import replica_store
+from replica_store import ReplicaVectorStore
+from vector_store import NumpyVectorStore, VECTOR_FIELD
+
+from conftest import make_row, wait_for
+
+
+class CountingStore(NumpyVectorStore):
+    """NumPy source that counts full id scans (the expensive Milvus operation)."""
+
+    def __init__(self):
+        super().__init__()
+        self.id_scans = 0
+
+    def iterate_rows(self, output_fields):
+        if list(output_fields) == ["id"]:
+            self.id_scans += 1
+        return super().iterate_rows(output_fields)
+
+
+class DownStore(NumpyVectorStore):
+    """Source that is unreachable."""
+
+    @property
+    def available(self):
+        return False
+
+
+@pytest.fixture(params=["brute_force", "hnsw"])
+def search_backend(request, monkeypatch):
+    if request.param == "hnsw":
+        pytest.importorskip("hnswlib")
+    else:
+        monkeypatch.setattr(replica_store, "HNSWLIB_AVAILABLE", False)
+    return request.param
+
+
+def make_replica(source, replica_dir, **kwargs) -> ReplicaVectorStore:
+    # sync_interval_seconds=0: the background thread only performs the initial sync
+    return ReplicaVectorStore(source, str(replica_dir), sync_interval_seconds=0, **kwargs)
+
+
+def test_initial_sync_and_local_search(tmp_path, rows, search_backend):
+    source = NumpyVectorStore.from_rows(rows)
+    replica = make_replica(source, tmp_path)
+    assert wait_for(lambda: replica.ready)
+
+    hits = replica.search(rows[5][VECTOR_FIELD], 3, ["id", "question", "related_nodes", "metadata"])
+    assert hits[0][0] == "n5"
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert hits[0][2] == {"id": "n5", "question": "question n5", "related_nodes": ["n6"], "metadata": {"source": "test"}}
+    assert replica.stats()["hnsw"] == (search_backend == "hnsw")
+    assert replica.stats()["local_searches"] == 1
+
+
+def test_empty_source_is_never_persisted(tmp_path):
+    source = CountingStore()
+    replica = make_replica(source, tmp_path)
+
+    assert replica.sync() == 0
+    assert not replica.ready
+    assert not (tmp_path / "meta.json").exists()
+    # Reads keep going to the source
+    assert replica.query_by_ids(["a"], ["id"]) == []
+    assert replica.stats()["source_lookups"] == 1
+
+    # The first insert takes the vector dimension from the new rows
+    replica.insert([make_row("a", [1.0, 0.0, 0.0])])
+    replica.flush()
+    assert wait_for(lambda: replica.ready)
+    assert replica.query_by_ids(["a"], ["id", "question"]) == [{"id": "a", "question": "question a"}]
+
+    replica.insert([make_row("b", [0.0, 1.0, 0.0])])
+    replica.flush()
+    assert wait_for(lambda: replica.stats()["rows"] == 2)
+    assert replica.search([0.0, 1.0, 0.0], 1, ["id"])[0][0] == "b"
+
+
+def test_flush_syncs_only_inserted_ids(tmp_path, rows):
+    source = CountingStore()
+    source.insert(rows)
+    replica = make_replica(source, tmp_path)
+    assert wait_for(lambda: replica.ready)
+
+    for i in range(3):
+        replica.insert([make_row(f"new{i}", [0.5] * 8)])
+        replica.flush()
+    assert wait_for(lambda: replica.stats()["rows"] == len(rows) + 3)
+
+    assert source.id_scans == 0
+    assert len(replica.query_by_ids(["new0", "new1", "new2"], ["id"])) == 3
+
+
+def test_incremental_sync_scans_for_new_ids(tmp_path, rows):
+    source = NumpyVectorStore.from_rows(rows[:10])
+    replica = make_replica(source, tmp_path)
+    assert wait_for(lambda: replica.ready)
+
+    source.insert(rows[10:])  # Written behind the replica's back
+    assert replica.sync() == 10
+    assert replica.sync() == 0
+    assert replica.stats()["rows"] == 20
+
+
+def test_ids_missing_locally_are_read_from_the_source(tmp_path, rows):
+    source = NumpyVectorStore.from_rows(rows[:10])
+    replica = make_replica(source, tmp_path)
+    assert wait_for(lambda: replica.ready)
+    source.insert(rows[10:11])
+
+    result = replica.query_by_ids(["n0", "n10", "unknown"], ["id", "related_nodes"])
+
+    assert result == [{"id": "n0", "related_nodes": ["n1"]}, {"id": "n10", "related_nodes": ["n11"]}]
+
+
+def test_reload_serves_reads_while_the_source_is_down(tmp_path, rows):
+    replica = make_replica(NumpyVectorStore.from_rows(rows), tmp_path)
+    assert wait_for(lambda: replica.ready)
+
+    offline = make_replica(DownStore(), tmp_path)
+
+    assert offline.ready and offline.available
+    assert len(list(offline.iterate_rows(["id"]))) == len(rows)
+    assert offline.search(rows[2][VECTOR_FIELD], 1, ["id"])[0][0] == "n2"
+    assert offline.query_by_ids(["n2", "unknown"], ["id"]) == [{"id": "n2"}]
+
+
+def test_other_version_is_rebuilt(tmp_path, rows):
+    replica = make_replica(NumpyVectorStore.from_rows(rows), tmp_path, version="1")
+    assert wait_for(lambda: replica.ready)
+
+    stale = make_replica(DownStore(), tmp_path, version="2")
+
+    assert not stale.ready
+    assert not stale.available
+
+
+def test_persisted_columns_match_the_source(tmp_path, rows):
+    replica = make_replica(NumpyVectorStore.from_rows(rows), tmp_path)
+    assert wait_for(lambda: replica.ready)
+
+    vectors = np.load(tmp_path / "vectors.npy")
+    assert vectors.shape == (len(rows), 8)
+    assert np.load(tmp_path / "ids.npy").tolist() == [row["id"] for row in rows]
@@ -0,0 +1,47 @@
+"""Tests for the semantic answer cache (semantic_cache.py)."""
+import time
+
+from semantic_cache import SemanticCache
+
+
+def test_semantic_cache_hit_above_threshold():
+    cache = SemanticCache(similarity_threshold=0.95, max_entries=4)
+    cache.store([1.0, 0.0, 0.0], {"response": "a"}, ["n1"], "1")
+
+    result, similarity = cache.lookup([0.99, 0.05, 0.0], "1")
+    assert result == {"response": "a"}
+    assert similarity > 0.95
+    assert cache.lookup([0.0, 1.0, 0.0], "1") is None
+
+
+def test_semantic_cache_returns_copies():
+    cache = SemanticCache()
+    cache.store([1.0, 0.0], {"response": "a", "metadata": {}}, [], "1")
+
+    cache.lookup([1.0, 0.0], "1")[0]["metadata"]["changed"] = True
+    assert cache.lookup([1.0, 0.0], "1")[0]["metadata"] == {}
+
+
+def test_semantic_cache_version_and_ttl():
+    cache = SemanticCache(ttl_seconds=0.05)
+    cache.store([1.0, 0.0], {"response": "a"}, [], "1")
+
+    assert cache.lookup([1.0, 0.0], "2") is None  # Stale version drops the entry
+    assert cache.lookup([1.0, 0.0], "1") is None
+    cache.store([1.0, 0.0], {"response": "a"}, [], "1")
+    time.sleep(0.06)
+    assert cache.lookup([1.0, 0.0], "1") is None
+    assert cache.stats()["stale"] == 2
+
+
+def test_semantic_cache_evicts_least_recently_used():
+    cache = SemanticCache(max_entries=2)
+    cache.store([1.0, 0.0, 0.0], {"response": "a"}, [], "1")
+    cache.store([0.0, 1.0, 0.0], {"response": "b"}, [], "1")
+    cache.lookup([1.0, 0.0, 0.0], "1")
+
+    cache.store([0.0, 0.0, 1.0], {"response": "c"}, [], "1")
+
+    assert cache.lookup([0.0, 1.0, 0.0], "1") is None
+    assert cache.lookup([1.0, 0.0, 0.0], "1")[0] == {"response": "a"}
+    assert cache.stats()["evictions"] == 1
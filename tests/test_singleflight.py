@@ -0,0 +1,113 @@
+"""Tests for request coalescing (singleflight.py)."""
+import asyncio
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+from conftest import wait_for
+
+
+def test_do_shares_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("q", work)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do("q", work)))
+    follower.start()
+    assert wait_for(lambda: flight.stats()["coalesced"] == 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False), ("answer", True)]
+    assert flight.stats()["in_flight"] == 0
+    # The key is released: a later call runs again
+    assert flight.do("q", lambda: "again") == ("again", False)
+
+
+def test_do_propagates_errors_and_releases_the_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("q", fail)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_do_async_coalesces():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("q", work) for _ in range(3)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert [shared for _, shared in results] == [False, True, True]
+
+
+def test_cancelled_leader_hands_over_to_a_follower():
+    flight = SingleFlight()
+    calls = []
+
+    def work(name):
+        async def run():
+            calls.append(name)
+            await asyncio.sleep(0.05)
+            return name
+        return run
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("q", work("leader")))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do_async("q", work(f"f{i}"))) for i in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    results = asyncio.run(main())
+
+    # Followers were not cancelled: one of them re-ran the work, the other shared it
+    assert calls == ["leader", "f0"]
+    assert results == [("f0", False), ("f0", True)]
+
+
+def test_stream_replays_events_to_late_joiners():
+    flight = SingleFlight()
+    gate = threading.Event()
+
+    def produce():
+        yield 1
+        gate.wait(5)
+        yield 2
+
+    first = flight.stream("q", produce)
+    assert next(first) == (1, False)
+    second = flight.stream("q", produce)
+    assert next(second) == (1, True)
+    gate.set()
+
+    assert list(first) == [(2, False)]
+    assert list(second) == [(2, True)]
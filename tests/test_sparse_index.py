@@ -0,0 +1,63 @@
+"""Tests for BM25 keyword retrieval and rank fusion (sparse_index.py)."""
+from sparse_index import BM25Index, tokenize, weighted_rrf
+from vector_store import NumpyVectorStore
+
+from conftest import make_row
+
+
+def test_tokenize_keeps_drug_names_and_values():
+    assert tokenize("What is the HbA1c target, 5.6 or 7%?") == ["hba1c", "target", "5.6", "7"]
+    assert tokenize("co-amoxiclav 625 mg/dl") == ["co-amoxiclav", "625", "mg/dl"]
+
+
+def test_tokenize_cjk_bigrams():
+    assert tokenize("发烧头痛") == ["发烧", "烧头", "头痛"]
+    assert tokenize("痛") == ["痛"]
+
+
+def test_weighted_rrf():
+    fused = weighted_rrf([["a", "b", "c"], ["c", "d"]], [1.0, 1.0], k=60)
+
+    assert [doc_id for doc_id, _ in fused][:2] == ["c", "a"]
+    assert dict(fused)["c"] == 1 / 63 + 1 / 61
+
+    # A heavier list wins ties in rank
+    fused = weighted_rrf([["a"], ["b"]], [1.0, 2.0], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["b", "a"]
+
+
+def test_search_before_build_returns_nothing():
+    index = BM25Index()
+
+    assert not index.ready
+    assert index.search("metformin", 5) == []
+
+
+def test_build_and_search():
+    store = NumpyVectorStore.from_rows([
+        make_row(1, [1.0], question="metformin dose for type 2 diabetes"),
+        make_row(2, [1.0], question="aspirin after myocardial infarction"),
+        make_row(3, [1.0], question="metformin and contrast media")
+    ])
+    index = BM25Index()
+
+    assert index.build(store)
+    hits = index.search("metformin diabetes", 5)
+    assert [doc_id for doc_id, _ in hits] == [1, 3]
+    assert index.search("aspirin", 1)[0][0] == 2
+    assert index.search("the of", 5) == []
+    assert index.stats()["documents"] == 3
+
+
+def test_add_replaces_and_remove_drops():
+    index = BM25Index()
+    index.add("a", "warfarin interaction")
+    index.add("b", "warfarin dosing")
+
+    index.add("a", "heparin bridging")
+    assert [doc_id for doc_id, _ in index.search("warfarin", 5)] == ["b"]
+    assert [doc_id for doc_id, _ in index.search("heparin", 5)] == ["a"]
+
+    index.remove("b")
+    assert index.search("warfarin", 5) == []
+    assert index.stats()["terms"] == 2
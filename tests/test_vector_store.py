@@ -0,0 +1,102 @@
+"""Tests for the VectorStore interface and the NumPy backend (vector_store.py)."""
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from vector_store import VectorStore, NumpyVectorStore, VECTOR_FIELD
+
+from conftest import make_row
+
+
+def test_incomplete_backend_fails_at_construction():
+    class SearchOnly(VectorStore):
+        def search(self, query_embedding, limit, output_fields, timeout=None):
+            return []
+
+    with pytest.raises(TypeError):
+        SearchOnly()
+
+
+def test_search_ranks_by_cosine(rows):
+    store = NumpyVectorStore.from_rows(rows)
+
+    hits = store.search(rows[3][VECTOR_FIELD], 3, ["id", "question"])
+    assert hits[0][0] == "n3"
+    assert hits[0][1] == pytest.approx(1.0)
+    assert [similarity for _, similarity, _ in hits] == sorted((s for _, s, _ in hits), reverse=True)
+    assert hits[0][2] == {"id": "n3", "question": "question n3"}
+    assert len(store.search(rows[0][VECTOR_FIELD], 100, ["id"])) == len(rows)
+
+
+def test_query_by_ids_omits_unknown(rows):
+    store = NumpyVectorStore.from_rows(rows)
+
+    result = store.query_by_ids(["n2", "missing", "n5"], ["id", "related_nodes"])
+    assert result == [{"id": "n2", "related_nodes": ["n3"]}, {"id": "n5", "related_nodes": ["n6"]}]
+
+
+def test_insert_replaces_by_id_and_returns_keys():
+    store = NumpyVectorStore()
+
+    assert store.insert([make_row("a", [1.0, 0.0]), make_row("b", [0.0, 1.0])]) == ["a", "b"]
+    store.insert([make_row("a", [0.0, 1.0], question="updated")])
+
+    assert len(store) == 2
+    assert store.query_by_ids(["a"], ["question"]) == [{"id": "a", "question": "updated"}]
+    assert store.search([0.0, 1.0], 2, ["id"])[0][1] == pytest.approx(1.0)
+
+
+def test_rows_without_id_get_the_next_integer_id():
+    store = NumpyVectorStore()
+    store.insert([make_row(7, [1.0, 0.0]), make_row("a", [0.0, 1.0])])
+
+    auto_rows = [make_row(None, [1.0, 1.0], question="auto"), make_row(None, [0.5, 1.0], question="auto")]
+    for row in auto_rows:
+        del row["id"]
+    keys = store.insert(auto_rows)
+
+    assert keys == [8, 9]
+    assert "id" not in auto_rows[0]
+    assert store.query_by_ids([8, 9], ["question"]) == [{"id": 8, "question": "auto"}, {"id": 9, "question": "auto"}]
+
+
+def test_concurrent_inserts_keep_every_batch():
+    store = NumpyVectorStore()
+    batches = [[make_row(f"t{t}-{i}", [float(t), float(i)]) for i in range(20)] for t in range(8)]
+
+    threads = [threading.Thread(target=store.insert, args=(batch,)) for batch in batches]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Interleave the threads inside insert
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert len(store) == 160
+    assert len(store.query_by_ids([row["id"] for batch in batches for row in batch], ["id"])) == 160
+
+
+def test_empty_store_is_available_and_can_be_seeded(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+
+    assert store.available
+    assert len(store) == 0
+    assert store.search([1.0, 0.0], 5, ["id"]) == []
+
+    store.insert([make_row("a", [1.0, 0.0])])
+    store.flush()
+    reloaded = NumpyVectorStore(str(tmp_path))
+    assert len(reloaded) == 1
+    assert reloaded.iterate_rows(["id"]).__next__() == {"id": "a"}
+
+
+def test_unreadable_files_make_the_store_unavailable(tmp_path):
+    (tmp_path / "rows.jsonl").write_text('{"id": "a"}\n')
+    np.save(tmp_path / "embeddings.npy", np.zeros((2, 3), dtype=np.float32))
+
+    assert not NumpyVectorStore(str(tmp_path)).available
@@ -0,0 +1,467 @@
+"""
+Vector Store Backends
+Storage interface behind GraphRAG retrieval (vector search, batched lookup
+by id, full scans and inserts), implemented on Milvus and as an in-process
+NumPy brute-force store loaded from local files.
+Part of the Data & Memory Layer (Access Layer).
+"""
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Iterator, Tuple
+
+import numpy as np
+
+try:
+    from pymilvus import connections, Collection, utility, DataType
+    MILVUS_AVAILABLE = True
+except ImportError:
+    MILVUS_AVAILABLE = False
+try:
+    from pymilvus import AnnSearchRequest, RRFRanker
+    HYBRID_SEARCH_AVAILABLE = True
+except ImportError:
+    HYBRID_SEARCH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Vector field searched for every query
+VECTOR_FIELD = "combined_embedding"
+# Every field of a knowledge-graph row
+ALL_FIELDS = ("id", "question", "response", VECTOR_FIELD, "related_nodes", "metadata")
+# Rows fetched per Milvus query while exporting
+EXPORT_BATCH_SIZE = 1000
+
+
+class VectorStore(ABC):
+    """
+    Storage operations GraphRAG retrieval needs.
+    
+    Rows are dictionaries with the fields in ALL_FIELDS; ``output_fields``
+    selects which of them are returned. Backends must implement every
+    abstract method; hybrid search is optional (see supports_hybrid).
+    """
+    
+    name = "base"
+    
+    @property
+    @abstractmethod
+    def available(self) -> bool:
+        """True if the store can serve requests."""
+    
+    @abstractmethod
+    def search(
+        self, query_embedding: List[float], limit: int, output_fields: List[str], timeout: float = None
+    ) -> List[Tuple[Any, float, Dict[str, Any]]]:
+        """
+        Nearest neighbours of the query on VECTOR_FIELD by cosine.
+        
+        Args:
+            query_embedding: Query vector
+            limit: Maximum number of hits
+            output_fields: Fields returned for each hit
+            timeout: Seconds allowed for the request (None waits indefinitely)
+        
+        Returns:
+            List of (node id, similarity, row), best first
+        """
+    
+    @abstractmethod
+    def query_by_ids(self, node_ids: List[Any], output_fields: List[str], timeout: float = None) -> List[Dict[str, Any]]:
+        """Rows for one batch of node ids (unknown ids are omitted)."""
+    
+    @abstractmethod
+    def iterate_rows(self, output_fields: List[str]) -> Iterator[Dict[str, Any]]:
+        """Yield every row in the store."""
+    
+    @abstractmethod
+    def insert(self, rows: List[Dict[str, Any]]) -> List[Any]:
+        """Add rows to the store (visible to search after flush); returns their primary keys in row order."""
+    
+    @abstractmethod
+    def flush(self):
+        """Make inserted rows durable and searchable."""
+    
+    def supports_hybrid(self, sparse_field: str = None) -> bool:
+        """True if the store can run dense + BM25 retrieval as one request."""
+        return False
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the backend name and availability."""
+        return {"backend": self.name, "available": self.available}
+    
+    def hybrid_search(
+        self,
+        query_embedding: List[float],
+        query_text: str,
+        sparse_field: str,
+        limit: int,
+        candidates: int,
+        rrf_k: int,
+        output_fields: List[str],
+        timeout: float = None
+    ) -> List[Tuple[Any, Dict[str, Any]]]:
+        """Dense and BM25 rankings fused by RRF in one request; returns (node id, row), best first."""
+        raise NotImplementedError
+
+
+class MilvusVectorStore(VectorStore):
+    """Milvus collection (local server or Milvus Cloud) as the vector store."""
+    
+    name = "milvus"
+    
+    def __init__(
+        self,
+        milvus_host: str,
+        milvus_port: str,
+        collection_name: str,
+        milvus_api_key: str = None,
+        milvus_user: str = None,
+        milvus_password: str = None,
+        use_cloud: bool = False
+    ):
+        """
+        Initialize Milvus store and connect.
+        
+        Args:
+            milvus_host: Milvus server host (or cloud endpoint)
+            milvus_port: Milvus server port
+            collection_name: Name of the collection to use
+            milvus_api_key: API key for Milvus Cloud (if using cloud)
+            milvus_user: Username for authentication (if using username/password)
+            milvus_password: Password for authentication (if using username/password)
+            use_cloud: Whether using Milvus Cloud cluster
+        """
+        self.milvus_host = milvus_host
+        self.milvus_port = milvus_port
+        self.collection_name = collection_name
+        self.milvus_api_key = milvus_api_key
+        self.milvus_user = milvus_user
+        self.milvus_password = milvus_password
+        self.use_cloud = use_cloud
+        self.collection = None
+        
+        self._connect()
+    
+    def _connect(self):
+        """Connect to Milvus server (local or cloud)."""
+        if not MILVUS_AVAILABLE:
+            logger.warning("Milvus not available. Skipping connection.")
+            return
+        
+        try:
+            # Prepare connection parameters
+            # For serverless Milvus, ensure port is integer
+            port = int(self.milvus_port) if isinstance(self.milvus_port, str) else self.milvus_port
+            
+            connection_params = {
+                "alias": "default",
+                "host": self.milvus_host,
+                "port": port
+            }
+            
+            # Add authentication for cloud cluster
+            if self.use_cloud:
+                if self.milvus_api_key:
+                    # Use API key authentication (preferred for Milvus Cloud)
+                    connection_params["token"] = self.milvus_api_key
+                    logger.info("Using API key authentication for Milvus Cloud")
+                elif self.milvus_user and self.milvus_password:
+                    # Use username/password authentication
+                    connection_params["user"] = self.milvus_user
+                    connection_params["password"] = self.milvus_password
+                    logger.info("Using username/password authentication")
+                else:
+                    logger.warning("Milvus Cloud enabled but no authentication provided")
+            
+            # Check if API key is provided for cloud
+            if self.use_cloud and not self.milvus_api_key:
+                logger.error("MILVUS_API_KEY is required for Milvus Cloud. Please set it in .env file")
+                return
+            
+            # For serverless, add secure=True
+            if self.use_cloud and "serverless" in self.milvus_host.lower():
+                connection_params["secure"] = True
+            
+            connections.connect(**connection_params)
+            logger.info(f"✅ Connected to Milvus at {self.milvus_host}:{port}")
+            
+            # Load collection if it exists
+            if utility.has_collection(self.collection_name):
+                self.collection = Collection(self.collection_name)
+                self.collection.load()
+                logger.info(f"Loaded collection: {self.collection_name}")
+            else:
+                logger.warning(f"Collection {self.collection_name} does not exist yet.")
+        except Exception as e:
+            logger.error(f"Error connecting to Milvus: {str(e)}")
+            # Fallback: collection will be None, will use fallback retrieval
+    
+    @property
+    def available(self) -> bool:
+        return self.collection is not None
+    
+    def search(self, query_embedding, limit, output_fields, timeout=None):
+        results = self.collection.search(
+            data=[query_embedding],
+            anns_field=VECTOR_FIELD,
+            param={"metric_type": "COSINE", "params": {"nprobe": 10}},
+            limit=limit,
+            output_fields=output_fields,
+            timeout=timeout
+        )
+        # Convert distance to similarity
+        return [(hit.id, 1 - hit.distance, hit.entity) for hits in results for hit in hits]
+    
+    def query_by_ids(self, node_ids, output_fields, timeout=None):
+        return self.collection.query(
+            expr=f"id in {json.dumps(list(node_ids))}", output_fields=output_fields, timeout=timeout
+        ) or []
+    
+    def iterate_rows(self, output_fields):
+        """Yield every row of the collection in batches (query_iterator when available)."""
+        expr = self._all_rows_expr()
+        if hasattr(self.collection, "query_iterator"):
+            iterator = self.collection.query_iterator(batch_size=EXPORT_BATCH_SIZE, expr=expr, output_fields=output_fields)
+            try:
+                while True:
+                    batch = iterator.next()
+                    if not batch:
+                        break
+                    yield from batch
+            finally:
+                iterator.close()
+            return
+        
+        offset = 0
+        while True:
+            batch = self.collection.query(expr=expr, output_fields=output_fields, offset=offset, limit=EXPORT_BATCH_SIZE)
+            if not batch:
+                break
+            yield from batch
+            if len(batch) < EXPORT_BATCH_SIZE:
+                break
+            offset += len(batch)
+    
+    def _all_rows_expr(self) -> str:
+        """Filter matching every row (Milvus requires an expression for full scans)."""
+        if MILVUS_AVAILABLE and self.collection.schema.primary_field.dtype == DataType.VARCHAR:
+            return 'id != ""'
+        return "id >= 0"
+    
+    def insert(self, rows):
+        # primary_keys also covers ids generated by auto_id collections
+        return list(self.collection.insert(rows).primary_keys)
+    
+    def flush(self):
+        self.collection.flush()
+    
+    def supports_hybrid(self, sparse_field=None):
+        """True if the collection has ``sparse_field`` produced by a BM25 function."""
+        if not (HYBRID_SEARCH_AVAILABLE and self.collection is not None and sparse_field):
+            return False
+        try:
+            for function in getattr(self.collection.schema, "functions", None) or []:
+                if sparse_field in function.output_field_names and "BM25" in str(function.type).upper():
+                    return True
+        except Exception as e:
+            logger.warning(f"Could not inspect collection functions: {str(e)}")
+        return False
+    
+    def hybrid_search(self, query_embedding, query_text, sparse_field, limit, candidates, rrf_k, output_fields, timeout=None):
+        search_params = {"metric_type": "COSINE", "params": {"nprobe": 10}}
+        requests = [
+            AnnSearchRequest(data=[query_embedding], anns_field=VECTOR_FIELD, param=search_params, limit=candidates),
+            AnnSearchRequest(data=[query_text], anns_field=sparse_field, param={"metric_type": "BM25"}, limit=candidates)
+        ]
+        results = self.collection.hybrid_search(
+            requests, rerank=RRFRanker(rrf_k), limit=limit, output_fields=output_fields, timeout=timeout
+        )
+        return [(hit.id, hit.entity) for hits in results for hit in hits]
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process brute-force store for development, tests and profiling.
+    
+    Loads ``rows.jsonl`` (one row per line, without the vector) and
+    ``embeddings.npy`` (one vector per row, same order) from a directory.
+    Search is an exact cosine scan over the normalised matrix. Inserted rows
+    are searchable immediately and written back to the directory on flush.
+    A directory without the files starts an empty store that can be seeded
+    through insert.
+    """
+    
+    name = "numpy"
+    
+    def __init__(self, store_dir: str = None):
+        """
+        Initialize NumPy store.
+        
+        Args:
+            store_dir: Directory holding rows.jsonl and embeddings.npy (None for an empty in-memory store)
+        """
+        self.store_dir = store_dir
+        self._rows: List[Dict[str, Any]] = []
+        self._index: Dict[Any, int] = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._normalized = self._vectors
+        # Reentrant: insert holds it across the copy, update and _install
+        self._lock = threading.RLock()
+        # False only when store_dir holds files that could not be loaded
+        self._initialized = True
+        
+        if store_dir:
+            self._initialized = self.load() or not self._has_files()
+    
+    @property
+    def available(self) -> bool:
+        return self._initialized
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def _has_files(self) -> bool:
+        return any(os.path.exists(os.path.join(self.store_dir, name)) for name in ("rows.jsonl", "embeddings.npy"))
+    
+    def load(self) -> bool:
+        """Load rows and vectors from store_dir; returns False if the files are missing or inconsistent."""
+        rows_path = os.path.join(self.store_dir, "rows.jsonl")
+        vectors_path = os.path.join(self.store_dir, "embeddings.npy")
+        if not (os.path.exists(rows_path) and os.path.exists(vectors_path)):
+            logger.warning(f"NumPy vector store files not found in {self.store_dir}, starting empty")
+            return False
+        try:
+            with open(rows_path, "r", encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            vectors = np.load(vectors_path).astype(np.float32, copy=False)
+            if vectors.ndim != 2 or len(vectors) != len(rows):
+                raise ValueError(f"{len(rows)} rows but embeddings of shape {vectors.shape}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading NumPy vector store: {str(e)}")
+            return False
+        self._install(rows, vectors)
+        self._initialized = True
+        logger.info(f"✅ Loaded NumPy vector store: {len(rows)} rows, dim {vectors.shape[1]} from {self.store_dir}")
+        return True
+    
+    def save(self, store_dir: str = None):
+        """Write rows and vectors to store_dir (or the given directory)."""
+        store_dir = store_dir or self.store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        with self._lock:
+            rows, vectors = self._rows, self._vectors
+        with open(os.path.join(store_dir, "rows.jsonl"), "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        np.save(os.path.join(store_dir, "embeddings.npy"), vectors)
+    
+    @classmethod
+    def from_rows(cls, rows: Iterator[Dict[str, Any]], store_dir: str = None) -> "NumpyVectorStore":
+        """Build a store from rows that include the vector (e.g. another store's iterate_rows)."""
+        store = cls()
+        store.store_dir = store_dir
+        store.insert(list(rows))
+        return store
+    
+    def _install(self, rows: List[Dict[str, Any]], vectors: np.ndarray):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True) if len(vectors) else np.ones((0, 1), dtype=np.float32)
+        norms[norms == 0] = 1.0
+        with self._lock:
+            self._rows = rows
+            self._index = {row["id"]: i for i, row in enumerate(rows)}
+            self._vectors = vectors
+            self._normalized = vectors / norms
+    
+    def _select(self, i: int, output_fields: List[str]) -> Dict[str, Any]:
+        row = self._rows[i]
+        selected = {"id": row["id"]}
+        for field in output_fields:
+            if field == VECTOR_FIELD:
+                selected[field] = self._vectors[i]
+            elif field != "id":
+                selected[field] = row.get(field)
+        return selected
+    
+    def search(self, query_embedding, limit, output_fields, timeout=None):
+        with self._lock:
+            normalized = self._normalized
+            if not len(normalized):
+                return []
+            query = np.asarray(query_embedding, dtype=np.float32)
+            scores = normalized @ (query / (np.linalg.norm(query) or 1.0))
+            limit = min(limit, len(scores))
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._rows[i]["id"], float(scores[i]), self._select(i, output_fields)) for i in top]
+    
+    def query_by_ids(self, node_ids, output_fields, timeout=None):
+        with self._lock:
+            return [self._select(self._index[node_id], output_fields) for node_id in node_ids if node_id in self._index]
+    
+    def iterate_rows(self, output_fields):
+        with self._lock:
+            count = len(self._rows)
+        for i in range(count):
+            with self._lock:
+                row = self._select(i, output_fields)
+            yield row
+    
+    def insert(self, rows):
+        """
+        Add (or replace, by id) rows; each row must carry its vector.
+        
+        Rows without an id get the next integer id (largest integer id + 1),
+        like an auto_id Milvus collection.
+        """
+        keys = []
+        with self._lock:
+            all_rows = list(self._rows)
+            vectors = list(self._vectors) if len(self._vectors) else []
+            index = dict(self._index)
+            next_id = max((key for key in index if type(key) is int), default=-1) + 1
+            for row in rows:
+                key = row.get("id")
+                if key is None:
+                    key, next_id = next_id, next_id + 1
+                vector = np.asarray(row[VECTOR_FIELD], dtype=np.float32)
+                stored = {field: value for field, value in row.items() if field != VECTOR_FIELD}
+                stored["id"] = key
+                if key in index:
+                    all_rows[index[key]] = stored
+                    vectors[index[key]] = vector
+                else:
+                    index[key] = len(all_rows)
+                    all_rows.append(stored)
+                    vectors.append(vector)
+                keys.append(key)
+            self._install(all_rows, np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32))
+        return keys
+    
+    def flush(self):
+        if self.store_dir:
+            self.save()
+
+
+if __name__ == '__main__':
+    # Export the configured Milvus collection for VECTOR_STORE_BACKEND=numpy:
+    #   python vector_store.py [target_dir]
+    import sys
+    from config import (
+        MILVUS_HOST, MILVUS_PORT, MILVUS_COLLECTION_NAME, MILVUS_API_KEY,
+        MILVUS_USER, MILVUS_PASSWORD, MILVUS_USE_CLOUD, NUMPY_STORE_DIR
+    )
+    
+    source = MilvusVectorStore(
+        MILVUS_HOST, MILVUS_PORT, MILVUS_COLLECTION_NAME,
+        milvus_api_key=MILVUS_API_KEY, milvus_user=MILVUS_USER,
+        milvus_password=MILVUS_PASSWORD, use_cloud=MILVUS_USE_CLOUD
+    )
+    if not source.available:
+        sys.exit("Milvus collection not available")
+    target_dir = sys.argv[1] if len(sys.argv) > 1 else NUMPY_STORE_DIR
+    store = NumpyVectorStore.from_rows(source.iterate_rows(list(ALL_FIELDS)), target_dir)
+    store.save()
+    logger.info(f"✅ Exported {len(store)} rows to {target_dir}")